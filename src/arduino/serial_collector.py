@@ -0,0 +1,370 @@
+"""
+    Asynchronous multi-port collector for the Arduino sensor boards.
+
+    Replaces the one-port, one-row-per-flush loop of Arduino_ExportCSV.py
+    for sites with many boards. Every serial port is read by its own thread
+    (pyserial readline is blocking) that pairs the "Temperatura:" and
+    "Humidade:" lines into readings and hands them to the asyncio event loop
+    through a bounded queue; readings arriving while the queue is full are
+    dropped and counted. A single writer task buffers the rows and writes
+    them in batches, when FLUSH_ROWS rows are pending or FLUSH_INTERVAL
+    seconds have passed, to one dados_<port>_<timestamp>_<n>.csv file per
+    port, rotated every ROTATE_ROWS rows. The files use the columns of
+    Arduino_ExportCSV.py, so the training loader picks them up unchanged.
+    With --downsample-seconds / --tolerance, every port drops repeated
+    readings before they are written (utils/downsampling.py, the same
+    Downsampler the training loader uses) and counts them as skipped.
+
+    Classes:
+        FrameParser: Turns the line stream of one board into readings
+        RotatingCSVWriter: Batched, rotated CSV output of one port
+        SerialCollector: Reader threads, bounded queue and writer task
+        FakeBoard: Pseudo-terminal that emits frames like
+                   Arduino_ExportCSV.ino, for tests without hardware
+
+    Counters (SerialCollector.stats()):
+        lines, readings, written, skipped, dropped, parse_errors, flushes, rows_per_s
+
+    Usage:
+        python src/arduino/serial_collector.py --ports /dev/ttyUSB0 /dev/ttyUSB1 --output data/
+        python src/arduino/serial_collector.py --simulate 8 --interval 0.01 --duration 10 --output /tmp/dados/
+"""
+
+import argparse
+import asyncio
+import csv
+import logging
+import os
+import random
+import re
+import select
+import threading
+import sys
+import time
+from datetime import datetime
+import numpy as np
+import serial
+from Arduino_ExportCSV import humidade_limite, baud_rate
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.downsampling import Downsampler
+from utils.irrigation_rules import IrrigationRules
+
+# Setup logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+CSV_HEADER = ['temperatura', 'humidade', 'data', 'rega_necessaria_min']
+
+# CONFIGURATIONS
+FLUSH_ROWS = 500
+FLUSH_INTERVAL = 5.0
+ROTATE_ROWS = 100_000
+QUEUE_SIZE = 10_000
+STATS_INTERVAL = 30.0
+
+
+# Same labels as Arduino_ExportCSV.py, computed for a whole batch at once
+RULES = IrrigationRules(humidity_limit=humidade_limite)
+
+
+class FrameParser:
+    def __init__(self):
+        self.temperatura = None
+        self.parse_errors = 0
+
+    def feed(self, linha):
+        """Returns: (temperatura, humidade) when linha completes a reading, else None"""
+        if linha.startswith("Temperatura:"):
+            try:
+                self.temperatura = float(linha.split(":")[1].replace("°C", "").strip())
+            except ValueError:
+                self.temperatura = None
+                self.parse_errors += 1
+        elif linha.startswith("Humidade:") and self.temperatura is not None:
+            try:
+                humidade = float(linha.split(":")[1].replace("%", "").strip())
+            except ValueError:
+                self.parse_errors += 1
+                return None
+            return self.temperatura, humidade
+        return None
+
+
+class RotatingCSVWriter:
+    def __init__(self, output_path, port_name, rotate_rows=ROTATE_ROWS):
+        self.output_path = output_path
+        self.port_name = port_name
+        self.rotate_rows = rotate_rows
+        self.sequence = 0
+        self.csvfile = None
+        self.rows_in_file = 0
+
+    def _open(self):
+        stamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        path = os.path.join(self.output_path, f"dados_{self.port_name}_{stamp}_{self.sequence:03d}.csv")
+        self.sequence += 1
+        self.csvfile = open(path, 'w', newline='')
+        self.writer = csv.writer(self.csvfile)
+        self.writer.writerow(CSV_HEADER)
+        self.rows_in_file = 0
+        logger.info(f"Writing {path}")
+
+    def write_rows(self, rows):
+        # One flush per batch instead of one per row
+        start = 0
+        while start < len(rows):
+            if self.csvfile is None or self.rows_in_file >= self.rotate_rows:
+                self.close()
+                self._open()
+            end = start + self.rotate_rows - self.rows_in_file
+            self.writer.writerows(rows[start:end])
+            self.rows_in_file += len(rows[start:end])
+            start = end
+        self.csvfile.flush()
+
+    def close(self):
+        if self.csvfile is not None:
+            self.csvfile.close()
+            self.csvfile = None
+
+
+class SerialCollector:
+    def __init__(self, ports, output_path, baud_rate=baud_rate, flush_rows=FLUSH_ROWS,
+                 flush_interval=FLUSH_INTERVAL, rotate_rows=ROTATE_ROWS, queue_size=QUEUE_SIZE,
+                 stats_interval=STATS_INTERVAL, downsample_seconds=0, tolerance=None):
+        self.ports = ports
+        self.output_path = output_path
+        self.baud_rate = baud_rate
+        self.flush_rows = flush_rows
+        self.flush_interval = flush_interval
+        self.rotate_rows = rotate_rows
+        self.queue_size = queue_size
+        self.stats_interval = stats_interval
+        # Port path -> short name used in the file names
+        self.names = {port: re.sub(r'\W+', '_', os.path.basename(port)) or 'port' for port in ports}
+        self.parsers = {port: FrameParser() for port in ports}
+        # One Downsampler per port: each board is its own series
+        self.downsamplers = None
+        if downsample_seconds or tolerance is not None:
+            self.downsamplers = {port: Downsampler(downsample_seconds, tolerance) for port in ports}
+        self.lines = {port: 0 for port in ports}
+        self.readings = 0
+        self.written = 0
+        self.skipped = 0
+        self.dropped = 0
+        self.flushes = 0
+        self.started = None
+        self._stop = threading.Event()
+
+    def stats(self):
+        elapsed = time.perf_counter() - self.started if self.started else 0.0
+        return {
+            'lines': sum(self.lines.values()),
+            'readings': self.readings,
+            'written': self.written,
+            'skipped': self.skipped,
+            'dropped': self.dropped,
+            'parse_errors': sum(p.parse_errors for p in self.parsers.values()),
+            'flushes': self.flushes,
+            'rows_per_s': self.written / elapsed if elapsed else 0.0
+        }
+
+    def _read_port(self, port, loop, queue):
+        """Reader thread: blocking readline, readings handed to the event loop."""
+        try:
+            ser = serial.serial_for_url(port, self.baud_rate, timeout=0.5)
+        except serial.SerialException as e:
+            logger.error(f"Error opening port {port}: {e}")
+            return
+        parser = self.parsers[port]
+        try:
+            while not self._stop.is_set():
+                raw = ser.readline()
+                if not raw:
+                    continue
+                self.lines[port] += 1
+                reading = parser.feed(raw.decode('utf-8', errors='replace').strip())
+                if reading is not None:
+                    loop.call_soon_threadsafe(self._offer, queue, (port, *reading, datetime.now()))
+        except serial.SerialException as e:
+            logger.error(f"Port {port} failed: {e}")
+        finally:
+            ser.close()
+
+    def _offer(self, queue, row):
+        self.readings += 1
+        try:
+            queue.put_nowait(row)
+        except asyncio.QueueFull:
+            self.dropped += 1
+
+    def _flush(self, buffers, writers):
+        for port, rows in buffers.items():
+            if rows:
+                _, temperatura, humidade, data = zip(*rows)
+                labels = RULES.label(np.array(temperatura), np.array(humidade)).tolist()
+                rows_out = [
+                    [round(t, 1), round(h, 1), d, label]
+                    for t, h, d, label in zip(temperatura, humidade, data, labels)
+                ]
+                if self.downsamplers is not None:
+                    # Decided on the values as written
+                    written_t, written_h, _, _ = zip(*rows_out)
+                    keep = self.downsamplers[port].mask(data, written_t, written_h, labels)
+                    self.skipped += len(rows_out) - int(keep.sum())
+                    rows_out = [row for row, kept in zip(rows_out, keep) if kept]
+                if rows_out:
+                    writers[port].write_rows(rows_out)
+                self.written += len(rows_out)
+                rows.clear()
+        self.flushes += 1
+
+    async def _write(self, queue, buffers, writers):
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.flush_interval
+        pending = 0
+        while True:
+            try:
+                row = await asyncio.wait_for(queue.get(), max(0.0, deadline - loop.time()))
+                buffers[row[0]].append(row)
+                pending += 1
+                # Take whatever else is already queued without waiting again
+                while pending < self.flush_rows and not queue.empty():
+                    row = queue.get_nowait()
+                    buffers[row[0]].append(row)
+                    pending += 1
+            except asyncio.TimeoutError:
+                pass
+            if pending >= self.flush_rows or loop.time() >= deadline:
+                if pending:
+                    self._flush(buffers, writers)
+                pending = 0
+                deadline = loop.time() + self.flush_interval
+
+    async def _report(self):
+        while True:
+            await asyncio.sleep(self.stats_interval)
+            logger.info(f"Collector: {self.stats()}")
+
+    async def run(self, duration=None):
+        os.makedirs(self.output_path, exist_ok=True)
+        loop = asyncio.get_running_loop()
+        queue = asyncio.Queue(maxsize=self.queue_size)
+        buffers = {port: [] for port in self.ports}
+        writers = {port: RotatingCSVWriter(self.output_path, self.names[port], self.rotate_rows) for port in self.ports}
+        readers = [
+            threading.Thread(target=self._read_port, args=(port, loop, queue), name=f"serial-{self.names[port]}", daemon=True)
+            for port in self.ports
+        ]
+        self.started = time.perf_counter()
+        self._stop.clear()
+        for reader in readers:
+            reader.start()
+        tasks = [asyncio.create_task(self._write(queue, buffers, writers)), asyncio.create_task(self._report())]
+        logger.info(f"Reading {len(self.ports)} ports... Press Ctrl+C to stop.")
+        try:
+            if duration is None:
+                await asyncio.gather(*tasks)
+            else:
+                await asyncio.sleep(duration)
+        finally:
+            for task in tasks:
+                task.cancel()
+            self._stop.set()
+            for reader in readers:
+                await asyncio.to_thread(reader.join)
+            # Write out everything still queued or buffered
+            while not queue.empty():
+                row = queue.get_nowait()
+                buffers[row[0]].append(row)
+            self._flush(buffers, writers)
+            for writer in writers.values():
+                writer.close()
+            logger.info(f"Collector stopped: {self.stats()}")
+
+
+class FakeBoard:
+    """Pseudo-terminal standing in for an Arduino running Arduino_ExportCSV.ino."""
+
+    def __init__(self, interval=2.0, seed=None):
+        self.interval = interval
+        self.random = random.Random(seed)
+        import tty  # POSIX only
+        self.master, self.slave = os.openpty()
+        tty.setraw(self.slave)
+        self.port = os.ttyname(self.slave)
+        self.frames = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._emit, name="fake-board", daemon=True)
+
+    def _emit(self):
+        while not self._stop.is_set():
+            temp = self.random.uniform(10, 42)
+            hum = self.random.uniform(10, 95)
+            # Wait while the reader lags behind, so stop() never blocks
+            if not select.select([], [self.master], [], 0.1)[1]:
+                continue
+            try:
+                os.write(self.master, f"Temperatura: {temp:.2f} °C\r\nHumidade: {hum:.2f} %\r\n".encode())
+            except OSError:
+                break
+            self.frames += 1
+            if self.interval:
+                time.sleep(self.interval)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+        os.close(self.master)
+        os.close(self.slave)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Collect readings from several Arduino boards into rotated dados_*.csv files")
+    parser.add_argument("--ports", nargs="*", default=[], help="Serial ports (or pyserial URLs) to read")
+    parser.add_argument("--output", default="data/", help="Directory of the dados_*.csv files")
+    parser.add_argument("--baud", type=int, default=baud_rate)
+    parser.add_argument("--flush-rows", type=int, default=FLUSH_ROWS, help="Pending rows that trigger a write")
+    parser.add_argument("--flush-interval", type=float, default=FLUSH_INTERVAL, help="Seconds between writes")
+    parser.add_argument("--rotate-rows", type=int, default=ROTATE_ROWS, help="Rows per output file")
+    parser.add_argument("--queue-size", type=int, default=QUEUE_SIZE, help="Readings buffered before dropping")
+    parser.add_argument("--stats-interval", type=float, default=STATS_INTERVAL)
+    parser.add_argument("--downsample-seconds", type=int, default=0,
+                        help="Keep the first reading of every time bucket of this length, per port")
+    parser.add_argument("--tolerance", type=float,
+                        help="Keep a reading only when it moves to another band of this width (0 drops exact repeats)")
+    parser.add_argument("--simulate", type=int, default=0, help="Add N fake boards on pseudo-terminals")
+    parser.add_argument("--interval", type=float, default=2.0, help="Seconds between frames of a fake board")
+    parser.add_argument("--duration", type=float, help="Stop after this many seconds")
+    args = parser.parse_args()
+
+    boards = [FakeBoard(args.interval, seed=i).start() for i in range(args.simulate)]
+    ports = args.ports + [board.port for board in boards]
+    if not ports:
+        parser.error("no ports given (use --ports or --simulate)")
+
+    collector = SerialCollector(
+        ports, args.output, baud_rate=args.baud, flush_rows=args.flush_rows,
+        flush_interval=args.flush_interval, rotate_rows=args.rotate_rows,
+        queue_size=args.queue_size, stats_interval=args.stats_interval,
+        downsample_seconds=args.downsample_seconds, tolerance=args.tolerance
+    )
+    try:
+        asyncio.run(collector.run(args.duration))
+    except KeyboardInterrupt:
+        print("\nInterrupted. CSV files saved and serial ports closed.")
+    finally:
+        for board in boards:
+            board.stop()
+        if boards:
+            print(f"Fake boards sent {sum(b.frames for b in boards)} frames")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+"""
+    Benchmark of the versioned artifact store against the joblib pickles.
+
+    For every model of Config.MODELS, fitted on synthetic readings with a
+    fitted imputer and scaler (so the NumPy preprocessing is exercised):
+        - pickle: joblib.load of model + imputer + scaler, then predict
+        - bundle: ArtifactStore.load (memory-mapped tables), then predict
+    Loading is timed in a fresh interpreter, the way a worker process or
+    a CLI invocation starts. The bundle predictions are checked against
+    imputer + scaler + model.predict.
+
+    Usage:
+        python src/benchmarks/bench_artifact_store.py
+        python src/benchmarks/bench_artifact_store.py --trees 500 --rows 50000
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import joblib
+import numpy as np
+
+SRC = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, SRC)
+
+from sklearn.impute import SimpleImputer
+from sklearn.preprocessing import StandardScaler
+from benchmarks.bench_tree_predictor import make_dataset
+from utils.artifact_store import ArtifactStore
+from utils.config import Config
+from utils.preprocessor import FEATURES
+
+LOAD_PICKLE = """
+import sys, time, warnings
+warnings.simplefilter("ignore")
+start = time.perf_counter()
+import joblib, numpy as np
+model, imputer, scaler = (joblib.load(sys.argv[1] + name) for name in ("model.pkl", "imputer.pkl", "scaler.pkl"))
+X = np.load(sys.argv[2])
+model.predict(scaler.transform(imputer.transform(X)))
+print(time.perf_counter() - start)
+"""
+
+LOAD_BUNDLE = """
+import sys, time
+start = time.perf_counter()
+sys.path.insert(0, {src!r})
+import numpy as np
+from utils.artifact_store import ArtifactStore
+bundle = ArtifactStore(sys.argv[1]).load()
+X = np.load(sys.argv[2])
+bundle.predict(X)
+print(time.perf_counter() - start)
+"""
+
+
+def cold(code, *args):
+    result = subprocess.run([sys.executable, "-c", code, *args], capture_output=True, text=True)
+    if result.returncode:
+        raise RuntimeError(result.stderr)
+    return float(result.stdout.split()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=20_000)
+    parser.add_argument("--trees", type=int, default=200, help="Random forest size")
+    parser.add_argument("--predict-rows", type=int, default=100)
+    args = parser.parse_args()
+
+    X, y = make_dataset(args.rows)
+    X[::50, 0] = np.nan
+    imputer = SimpleImputer(strategy='mean').fit(X)
+    scaler = StandardScaler().fit(imputer.transform(X))
+    X_fit = scaler.transform(imputer.transform(X))
+    X_new, _ = make_dataset(args.predict_rows, seed=7)
+    X_new[::10, 1] = np.nan
+
+    print(f"{'model':20} | {'pickle (s)':>10} | {'bundle (s)':>10} | {'speedup':>7} | {'pickle MB':>9} | max |diff|")
+    with tempfile.TemporaryDirectory() as path:
+        np.save(os.path.join(path, "X.npy"), X_new)
+        for name, model in Config().build_models().items():
+            if name == 'random_forest':
+                model.set_params(n_estimators=args.trees)
+            model.fit(X_fit, y)
+
+            pickle_path = os.path.join(path, name, "")
+            os.makedirs(pickle_path)
+            for file_name, item in (("model.pkl", model), ("imputer.pkl", imputer), ("scaler.pkl", scaler)):
+                joblib.dump(item, pickle_path + file_name)
+            store = ArtifactStore(os.path.join(path, name, "store"))
+            store.promote(store.save(model, name, imputer, scaler, FEATURES))
+
+            # DataPreprocessor frames are imputed and scaled in float64
+            expected = model.predict(scaler.transform(imputer.transform(X_new.astype(np.float64))))
+            diff = np.abs(store.load().predict(X_new) - expected).max()
+            assert diff <= 1e-4 * max(1.0, np.abs(expected).max()), f"{name} predictions differ by {diff}"
+
+            pickle_time = cold(LOAD_PICKLE, pickle_path, os.path.join(path, "X.npy"))
+            bundle_time = cold(LOAD_BUNDLE.format(src=SRC), store.path, os.path.join(path, "X.npy"))
+            size = os.path.getsize(pickle_path + "model.pkl") / 1e6
+            print(f"{name:20} | {pickle_time:10.3f} | {bundle_time:10.3f} | {pickle_time / bundle_time:6.1f}x | {size:9.1f} | {diff:.2e}")
+
+
+if __name__ == "__main__":
+    main()
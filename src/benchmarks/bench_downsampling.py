@@ -0,0 +1,139 @@
+"""
+    Row reduction and holdout RMSE of the downsampling settings.
+
+    Loads the logger files at full resolution (default: every *dados_*.csv
+    file of data/, 1dados_manipulados.csv included, or --rows synthetic
+    readings every --interval seconds), and holds out a fixed share of
+    --block-minutes time blocks (hash of the block, as in out-of-core
+    training), so repeated readings never straddle the split. For every
+    setting, each file is downsampled with Downsampler (as the loader does
+    with DOWNSAMPLE_SECONDS / DOWNSAMPLE_TOLERANCE), the models of
+    Config.MODELS are trained on the kept training rows behind a fitted
+    imputer and scaler, and scored on every holdout reading, since the
+    deployed model sees every reading. Reports the rows kept, the
+    reduction, the fit time and the holdout RMSE next to the
+    full-resolution run.
+
+    Every setting is also checked to keep exactly the same rows when the
+    files are processed in chunks, as in streaming mode.
+
+    Settings: 'none', 'tolerance=T', 'bucket=S' or both, comma separated.
+
+    Usage:
+        python src/benchmarks/bench_downsampling.py
+        python src/benchmarks/bench_downsampling.py --settings none tolerance=0 bucket=60,tolerance=0.5
+        python src/benchmarks/bench_downsampling.py --rows 1000000 --interval 2 --models random_forest xgboost
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+import warnings
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.synthetic import write_dataset
+from utils.config import Config
+from utils.data_loader import StreamingCSVLoader
+from utils.downsampling import Downsampler
+from utils.metrics import regression_metrics
+from utils.out_of_core import hash_split
+from utils.preprocessor import DataPreprocessor
+
+warnings.filterwarnings("ignore", message="X does not have valid feature names")
+
+DEFAULT_SETTINGS = ["none", "tolerance=0", "tolerance=0.2", "tolerance=0.5", "bucket=10", "bucket=60", "bucket=300",
+                    "bucket=300,tolerance=0.5"]
+
+
+def parse_setting(setting):
+    options = {}
+    if setting != "none":
+        for part in setting.split(","):
+            key, _, value = part.partition("=")
+            if key == "bucket":
+                options['bucket_seconds'] = int(value)
+            elif key == "tolerance":
+                options['tolerance'] = float(value)
+            else:
+                raise ValueError(f"Unknown setting {part!r} (use bucket=S and/or tolerance=T)")
+    return Downsampler(**options)
+
+
+def load_files(data_path, pattern):
+    """Returns: (X, y, timestamps) of every file, at full resolution."""
+    loader = StreamingCSVLoader(DataPreprocessor(), data_path, pattern=pattern)
+    files = [arrays for _, *arrays in loader.iter_file_arrays(timestamps=True)]
+    if not files:
+        raise FileNotFoundError(f"No files matching {pattern} in {data_path}")
+    return files, loader.preprocessor.feature_columns
+
+
+def file_mask(downsampler, X, y, t, columns, chunk_rows=None):
+    downsampler.reset()
+    temperatura, humidade = X[:, columns.index('temperatura')], X[:, columns.index('humidade')]
+    step = chunk_rows or max(len(y), 1)
+    return np.concatenate([downsampler.mask(t[i:i + step], temperatura[i:i + step], humidade[i:i + step], y[i:i + step])
+                           for i in range(0, len(y), step)])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--settings", nargs="+", default=DEFAULT_SETTINGS)
+    parser.add_argument("--data-path", default="data")
+    parser.add_argument("--pattern", default="*dados_*.csv")
+    parser.add_argument("--rows", type=int, help="Use this many synthetic readings instead of --data-path")
+    parser.add_argument("--interval", type=int, default=2, help="Seconds between synthetic readings")
+    parser.add_argument("--data-dir", help="Keep the synthetic files here and reuse them (default: temporary)")
+    parser.add_argument("--models", nargs="+", choices=list(Config.MODELS), help="Default: every model of Config.MODELS")
+    parser.add_argument("--block-minutes", type=int, default=60, help="Time blocks held out together")
+    parser.add_argument("--chunk-rows", type=int, default=997, help="Chunk size of the streaming check")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        if args.rows:
+            data_path = args.data_dir or tmp
+            write_dataset(data_path, args.rows, interval_s=args.interval)
+            files, columns = load_files(data_path, "dados_*.csv")
+        else:
+            files, columns = load_files(args.data_path, args.pattern)
+
+    X = np.concatenate([f[0] for f in files])
+    y = np.concatenate([f[1] for f in files])
+    t = np.concatenate([f[2] for f in files])
+    block_ns = np.int64(args.block_minutes * 60 * 1_000_000_000)
+    blocks = (t.astype(np.int64) // block_ns * block_ns).astype('datetime64[ns]')
+    test = hash_split(blocks, Config.TEST_SIZE, Config.RANDOM_STATE)
+    models = {name: model for name, model in Config().build_models().items() if not args.models or name in args.models}
+    print(f"{len(y):,} readings in {len(files)} files, {int(test.sum()):,} held out "
+          f"({args.block_minutes}-minute blocks)")
+
+    baseline = {}
+    print(f"{'setting':26} | {'rows kept':>10} | {'dropped':>7} | {'model':18} | {'fit (s)':>8} | {'RMSE':>8} | {'vs none':>8}")
+    for setting in args.settings:
+        downsampler = parse_setting(setting)
+        start = time.perf_counter()
+        keep = np.concatenate([file_mask(downsampler, *f, columns) for f in files])
+        mask_time = time.perf_counter() - start
+        chunked = np.concatenate([file_mask(parse_setting(setting), *f, columns, args.chunk_rows) for f in files])
+        assert np.array_equal(keep, chunked), f"{setting}: chunked downsampling keeps different rows"
+
+        train = ~test & keep
+        preprocessor = DataPreprocessor()
+        X_train, X_test = preprocessor.fit_transform(X[train], X[test])
+        for name, model in models.items():
+            start = time.perf_counter()
+            model.fit(X_train, y[train])
+            fit_time = time.perf_counter() - start
+            rmse = regression_metrics(y[test], model.predict(X_test))['rmse']
+            baseline.setdefault(name, rmse)
+            print(f"{setting:26} | {int(keep.sum()):10,} | {1 - keep.mean():7.1%} | {name:18} | "
+                  f"{fit_time:8.2f} | {rmse:8.4f} | {rmse - baseline[name]:+8.4f}")
+        print(f"{'':26} | downsampling {len(y) / max(mask_time, 1e-9):,.0f} rows/s")
+
+
+if __name__ == "__main__":
+    main()
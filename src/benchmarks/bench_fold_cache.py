@@ -0,0 +1,88 @@
+"""
+    Benchmark of the shared fold cache against per-model cross-validation.
+
+    For every model of Config.MODELS, on a pandas training frame:
+        - legacy: fit + model.score(X_train, y_train) +
+          cross_val_score(cv=CV_FOLDS), which slices the frame again for
+          every model and repredicts the whole training set
+        - cached: fit + the CV fold fits on the FoldCache arrays, which are
+          built once for all models; the out-of-fold predictions come with
+          the folds
+    Both run sequentially (n_jobs=1) so the difference is the data handling,
+    not the parallelism. The cached fold RMSE is checked against the legacy
+    one.
+
+    Usage:
+        python src/benchmarks/bench_fold_cache.py
+        python src/benchmarks/bench_fold_cache.py --rows 200000
+"""
+
+import argparse
+import os
+import sys
+import time
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sklearn.base import clone
+from sklearn.metrics import mean_squared_error
+from sklearn.model_selection import cross_val_score
+from benchmarks.bench_tree_predictor import make_dataset
+from utils.config import Config
+from utils.fold_cache import FoldCache
+from utils.preprocessor import FEATURES
+
+
+def single_threaded(model):
+    model = clone(model)
+    if 'n_jobs' in model.get_params():
+        model.set_params(n_jobs=1)
+    return model
+
+
+def legacy(model, X, y, cv):
+    start = time.perf_counter()
+    model = single_threaded(model)
+    model.fit(X, y)
+    model.score(X, y)
+    scores = cross_val_score(single_threaded(model), X, y, cv=cv, scoring='neg_mean_squared_error')
+    return time.perf_counter() - start, np.sqrt(-scores.mean())
+
+
+def cached(model, X, y, folds):
+    start = time.perf_counter()
+    single_threaded(model).fit(X, y)
+    fold_mse = []
+    for i in range(len(folds)):
+        X_fit, y_fit, X_val, y_val = folds.fold(i)
+        fold_mse.append(mean_squared_error(y_val, single_threaded(model).fit(X_fit, y_fit).predict(X_val)))
+    return time.perf_counter() - start, np.sqrt(np.mean(fold_mse))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=20_000)
+    args = parser.parse_args()
+
+    X, y = make_dataset(args.rows)
+    X = pd.DataFrame(X, columns=FEATURES)
+    y = pd.Series(y, name="rega_necessaria_min")
+    folds = FoldCache(X, y, n_splits=Config.CV_FOLDS)
+    print(f"{args.rows:,} rows | folds materialized once in {folds.build_time:.3f}s")
+
+    print(f"{'model':20} | {'legacy (s)':>10} | {'cached (s)':>10} | {'saving':>7} | CV RMSE legacy / cached")
+    total_legacy = total_cached = folds.build_time
+    for name, model in Config().build_models().items():
+        legacy_time, legacy_rmse = legacy(model, X, y, Config.CV_FOLDS)
+        cached_time, cached_rmse = cached(model, X, y, folds)
+        total_legacy += legacy_time
+        total_cached += cached_time
+        print(f"{name:20} | {legacy_time:10.3f} | {cached_time:10.3f} | {1 - cached_time / legacy_time:6.1%} | "
+              f"{legacy_rmse:.4f} / {cached_rmse:.4f}")
+    print(f"{'total':20} | {total_legacy - folds.build_time:10.3f} | {total_cached:10.3f} | {1 - total_cached / (total_legacy - folds.build_time):6.1%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""
+    Exactness check and benchmark of the vectorized irrigation rules against
+    the scalar calcular_tempo_rega of src/arduino/Arduino_ExportCSV.py.
+
+    The check covers a 0.05 grid over temperature [-20, 60] x humidity
+    [0, 100], every band edge and its float neighbours, +-inf and NaN, and
+    compares both tempo_rega and the final label (humidity limit applied).
+    The benchmark times a per-row loop over the scalar function against
+    IrrigationRules.label on random readings.
+
+    Usage:
+        python src/benchmarks/bench_irrigation_rules.py
+        python src/benchmarks/bench_irrigation_rules.py --sizes 100000 10000000
+"""
+
+import argparse
+import os
+import sys
+import time
+import numpy as np
+
+SRC_PATH = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, SRC_PATH)
+sys.path.insert(0, os.path.join(SRC_PATH, "arduino"))
+
+from utils.irrigation_rules import IrrigationRules, TEMPERATURE_BANDS, HUMIDITY_BANDS
+from Arduino_ExportCSV import calcular_tempo_rega, humidade_limite
+
+
+def scalar_label(temperatura, humidade):
+    # The logger's label: calcular_tempo_rega below the humidity limit, else 0
+    return calcular_tempo_rega(temperatura, humidade) if humidade < humidade_limite else 0
+
+
+def special_values(edges):
+    edges = np.asarray(edges, dtype=np.float64)
+    return np.concatenate([
+        edges, np.nextafter(edges, -np.inf), np.nextafter(edges, np.inf),
+        [-np.inf, np.inf, np.nan, 0.0, -0.0]
+    ])
+
+
+def check_exact(rules):
+    temperatura = np.concatenate([np.round(np.arange(-20, 60, 0.05), 2), special_values(TEMPERATURE_BANDS['edges'])])
+    humidade = np.concatenate([np.round(np.arange(0, 100, 0.05), 2), special_values(HUMIDITY_BANDS['edges'])])
+    t, h = (a.ravel() for a in np.meshgrid(temperatura, humidade))
+
+    expected_tempo = np.array([calcular_tempo_rega(a, b) for a, b in zip(t.tolist(), h.tolist())])
+    expected_label = np.array([scalar_label(a, b) for a, b in zip(t.tolist(), h.tolist())])
+    tempo_mismatch = int((rules.tempo_rega(t, h) != expected_tempo).sum())
+    label_mismatch = int((rules.label(t, h) != expected_label).sum())
+    print(f"Exactness: {len(t):,} readings | tempo_rega mismatches: {tempo_mismatch} | label mismatches: {label_mismatch}")
+    return tempo_mismatch == 0 and label_mismatch == 0
+
+
+def best_of(fn, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1_000, 100_000, 1_000_000])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--scalar-max", type=int, default=1_000_000,
+                        help="Largest size timed with the per-row scalar loop")
+    args = parser.parse_args()
+
+    rules = IrrigationRules(humidity_limit=humidade_limite)
+    exact = check_exact(rules)
+
+    rng = np.random.default_rng(42)
+    print(f"{'rows':>12} {'scalar (s)':>12} {'vectorized (s)':>15} {'speedup':>9}")
+    for size in args.sizes:
+        t = np.round(rng.uniform(5, 45, size), 1)
+        h = np.round(rng.uniform(10, 95, size), 1)
+        vectorized = best_of(lambda: rules.label(t, h), args.repeat)
+        if size <= args.scalar_max:
+            t_list, h_list = t.tolist(), h.tolist()
+            scalar = best_of(lambda: [scalar_label(a, b) for a, b in zip(t_list, h_list)], 1)
+            print(f"{size:>12,} {scalar:>12.4f} {vectorized:>15.4f} {scalar / vectorized:>8.1f}x")
+        else:
+            print(f"{size:>12,} {'-':>12} {vectorized:>15.4f} {'-':>9}")
+
+    if not exact:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+"""
+    Benchmark of the single-pass metrics against the previous evaluation.
+
+    On a synthetic holdout, with each model of Config.MODELS fitted on a
+    small training set:
+        - legacy: predict, clip, mean_squared_error, mean_absolute_error,
+          r2_score, plus model.score (which predicts a second time)
+        - fused: one predict, every metric from utils.metrics in one pass
+    and, on the metric computation alone, the fused pass against the four
+    sklearn calls. The metrics of both paths are checked to agree, as are
+    the streamed (chunked) ones. Finally the bootstrap intervals are timed.
+
+    Usage:
+        python src/benchmarks/bench_metrics.py
+        python src/benchmarks/bench_metrics.py --rows 1000000 --bootstrap 200
+"""
+
+import argparse
+import os
+import sys
+import time
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sklearn.base import clone
+from sklearn.metrics import mean_squared_error, mean_absolute_error, r2_score
+from benchmarks.bench_tree_predictor import make_dataset
+from utils.config import Config
+from utils.metrics import regression_metrics, bootstrap_ci
+from utils.preprocessor import FEATURES
+
+
+def legacy(model, X, y):
+    y_pred = np.maximum(0, model.predict(X))
+    return {
+        'score': model.score(X, y),
+        'rmse': np.sqrt(mean_squared_error(y, y_pred)),
+        'mae': mean_absolute_error(y, y_pred),
+        'r2': r2_score(y, y_pred)
+    }
+
+
+def fused(model, X, y):
+    return regression_metrics(y, model.predict(X))
+
+
+def timed(function, *args, repeat=3):
+    best = np.inf
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function(*args)
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def check(expected, actual):
+    for key in ('score', 'rmse', 'mae', 'r2'):
+        if not np.isclose(expected[key], actual[key], rtol=1e-6, atol=1e-9):
+            raise AssertionError(f"{key}: {expected[key]} != {actual[key]}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=200_000)
+    parser.add_argument("--train-rows", type=int, default=5_000)
+    parser.add_argument("--chunk", type=int, default=65_536)
+    parser.add_argument("--bootstrap", type=int, default=100)
+    args = parser.parse_args()
+
+    X_train, y_train = make_dataset(args.train_rows, seed=1)
+    X, y = make_dataset(args.rows)
+    X_train = pd.DataFrame(X_train, columns=FEATURES)
+    X = pd.DataFrame(X, columns=FEATURES)
+    y = pd.Series(y, name="rega_necessaria_min")
+
+    print(f"{args.rows:,} test rows")
+    print(f"{'model':20} | {'legacy (s)':>10} | {'fused (s)':>10} | {'speedup':>7}")
+    for name, model in Config().build_models().items():
+        model = clone(model).fit(X_train, y_train)
+        legacy_time, expected = timed(legacy, model, X, y)
+        fused_time, actual = timed(fused, model, X, y)
+        check(expected, actual)
+        print(f"{name:20} | {legacy_time:10.3f} | {fused_time:10.3f} | {legacy_time / fused_time:6.2f}x")
+
+    # Metric computation alone, on fixed predictions
+    y_true = y.to_numpy()
+    y_pred = y_true + np.random.default_rng(0).normal(0, 1, len(y_true))
+    sklearn_time, _ = timed(lambda: (mean_squared_error(y, np.maximum(0, y_pred)),
+                                     mean_absolute_error(y, np.maximum(0, y_pred)),
+                                     r2_score(y, np.maximum(0, y_pred)),
+                                     r2_score(y, y_pred)))
+    single_time, single = timed(regression_metrics, y_true, y_pred)
+    chunked_time, chunked = timed(regression_metrics, y_true, y_pred, args.chunk)
+    check(single, chunked)
+    print(f"metrics only: sklearn {sklearn_time * 1e3:.1f} ms | single pass {single_time * 1e3:.1f} ms "
+          f"({sklearn_time / single_time:.1f}x) | chunks of {args.chunk:,} {chunked_time * 1e3:.1f} ms")
+
+    if args.bootstrap:
+        start = time.perf_counter()
+        ci = bootstrap_ci(y_true, y_pred, n_boot=args.bootstrap)
+        print(f"bootstrap ({args.bootstrap} replicates): {time.perf_counter() - start:.2f}s | "
+              f"RMSE {single['rmse']:.4f} in [{ci['rmse'][0]:.4f}, {ci['rmse'][1]:.4f}]")
+
+
+if __name__ == "__main__":
+    main()
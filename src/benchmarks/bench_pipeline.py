@@ -0,0 +1,89 @@
+"""
+    Benchmark of CompiledPipeline.predict_raw against the DataFrame path.
+
+    For every model of Config.MODELS, fitted behind a fitted imputer and
+    scaler on synthetic readings:
+        - legacy: DataFrame of the raw readings, DataPreprocessor.preprocess,
+          df[features], imputer.transform, scaler.transform, model.predict
+          (what inferencia.py and the first service did per request)
+        - pipeline: predict_raw(timestamps, temperatura, humidade) with the
+          imputer and scaler folded into the model, and the estimator above
+          Config.COMPILED_MAX_ROWS rows, as the inference service runs it
+    The pipeline predictions are checked against the legacy ones on the
+    benchmark readings and on readings with missing values.
+
+    Usage:
+        python src/benchmarks/bench_pipeline.py
+        python src/benchmarks/bench_pipeline.py --batch-sizes 1 100 10000 100000
+"""
+
+import argparse
+import os
+import sys
+import warnings
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pandas as pd
+from benchmarks.bench_tree_predictor import time_per_call
+from utils.config import Config
+from utils.preprocessor import FEATURES, DataPreprocessor, build_feature_matrix
+
+warnings.filterwarnings("ignore", message="X does not have valid feature names")
+
+
+def make_readings(n_rows, seed=42):
+    rng = np.random.default_rng(seed)
+    timestamps = np.datetime64('2025-05-01T00:00:00', 's') + rng.integers(0, 60 * 86400, n_rows).astype('timedelta64[s]')
+    temperatura = np.round(rng.uniform(5, 45, n_rows), 1).astype(np.float32)
+    humidade = np.round(rng.uniform(10, 95, n_rows), 1).astype(np.float32)
+    y = np.maximum(0, 1 + (temperatura - 20) * 0.8 - (humidade - 50) * 0.2 + rng.normal(0, 1, n_rows))
+    return (timestamps, temperatura, humidade), y
+
+
+def legacy_predict(preprocessor, model, readings):
+    timestamps, temperatura, humidade = readings
+    df = preprocessor.preprocess(pd.DataFrame({'data': timestamps, 'temperatura': temperatura, 'humidade': humidade}))
+    X = preprocessor.imputer.transform(df[preprocessor.feature_columns])
+    return model.predict(preprocessor.scaler.transform(X))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--train-rows', type=int, default=20_000)
+    parser.add_argument('--batch-sizes', type=int, nargs='+', default=[1, 100, 10_000])
+    args = parser.parse_args()
+
+    readings, y = make_readings(args.train_rows)
+    X = pd.DataFrame(build_feature_matrix(*readings), columns=FEATURES)
+    X.iloc[::50, 0] = np.nan
+    preprocessor = DataPreprocessor()
+    preprocessor.feature_columns = FEATURES
+    X_fit, _ = preprocessor.fit_transform(X, X.iloc[:1])
+
+    new_readings, _ = make_readings(max(args.batch_sizes), seed=7)
+    missing = tuple(np.array(column) for column in new_readings)
+    missing[1][::7] = np.nan
+    missing[2][::11] = np.nan
+
+    print(f"{'model':20} | {'batch':>7} | {'legacy (ms)':>11} | {'pipeline (ms)':>13} | {'speedup':>7}")
+    for name, model in Config().build_models().items():
+        model.fit(X_fit, y)
+        pipeline = preprocessor.compile(model)
+        for check in (new_readings, missing):
+            expected = legacy_predict(preprocessor, model, check)
+            # Folded model, then the estimator path used above max_compiled_rows
+            for max_compiled_rows in (None, 0):
+                diff = np.abs(pipeline.predict_raw(*check, max_compiled_rows=max_compiled_rows) - expected).max()
+                assert diff <= 1e-4 * max(1.0, np.abs(expected).max()), f"{name} predictions differ by {diff}"
+
+        for batch_size in args.batch_sizes:
+            batch = tuple(column[:batch_size] for column in new_readings)
+            legacy_time = time_per_call(lambda b: legacy_predict(preprocessor, model, b), batch)
+            pipeline_time = time_per_call(lambda b: pipeline.predict_raw(*b, max_compiled_rows=Config.COMPILED_MAX_ROWS), batch)
+            print(f"{name:20} | {batch_size:7,} | {legacy_time * 1e3:11.3f} | {pipeline_time * 1e3:13.3f} | {legacy_time / pipeline_time:6.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""
+    Benchmark of the evaluation figures on a large synthetic holdout.
+
+    Compares, for --rows test points and 4 models:
+        - legacy: every point scattered and a seaborn boxplot over the
+          concatenated residual frame, rendered in the calling process
+        - inline: ModelEvaluator.plot_results with PLOT_MAX_POINTS sampling
+          and exact box statistics, rendered in the calling process
+        - background: the same figures submitted to a one-worker Reporter;
+          the time reported is what the caller is blocked for, and the time
+          until close() returns is shown separately
+    Figures are written to a temporary directory.
+
+    Usage:
+        python src/benchmarks/bench_reporting.py
+        python src/benchmarks/bench_reporting.py --rows 2000000 --mode hexbin
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.config import Config
+from utils.model_evaluator import ModelEvaluator
+from utils.reporting import Reporter
+
+NAMES = ['linear_regression', 'random_forest', 'xgboost', 'decision_tree']
+
+
+def legacy(results, y_test, path):
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+    import pandas as pd
+    import seaborn as sns
+
+    plt.figure(figsize=(10, 6))
+    for name, result in results.items():
+        plt.scatter(y_test, result['predictions'], label=name, alpha=0.5)
+    plt.savefig(os.path.join(path, "legacy_predictions.png"))
+    plt.figure(figsize=(10, 6))
+    residuals = pd.concat([pd.DataFrame({'Model': name, 'Error': y_test - result['predictions']})
+                           for name, result in results.items()])
+    sns.boxplot(data=residuals, x='Model', y='Error')
+    plt.savefig(os.path.join(path, "legacy_boxplot.png"))
+    plt.close('all')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=500_000)
+    parser.add_argument("--max-points", type=int, default=Config.PLOT_MAX_POINTS)
+    parser.add_argument("--mode", choices=["sample", "hexbin"], default=Config.PLOT_DENSE_MODE)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(42)
+    y_test = rng.gamma(2.0, 5.0, args.rows)
+    results = {name: {'predictions': np.maximum(0, y_test + rng.normal(0, 1 + i, args.rows))}
+               for i, name in enumerate(NAMES)}
+
+    with tempfile.TemporaryDirectory() as path:
+        path += os.sep
+        start = time.perf_counter()
+        legacy(results, y_test, path)
+        legacy_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        ModelEvaluator(Reporter(workers=0), args.max_points, args.mode).plot_results(results, y_test, path)
+        inline_time = time.perf_counter() - start
+
+        reporter = Reporter(workers=1)
+        start = time.perf_counter()
+        ModelEvaluator(reporter, args.max_points, args.mode).plot_results(results, y_test, path)
+        blocked_time = time.perf_counter() - start
+        saved = reporter.close()
+        background_time = time.perf_counter() - start
+
+    print(f"{args.rows:,} points x {len(NAMES)} models | mode {args.mode}, max {args.max_points:,} points")
+    print(f"legacy (all points, seaborn)  | {legacy_time:8.3f}s")
+    print(f"inline                        | {inline_time:8.3f}s ({legacy_time / inline_time:.1f}x)")
+    print(f"background, caller blocked    | {blocked_time:8.3f}s ({legacy_time / blocked_time:.1f}x)")
+    print(f"background, until close()     | {background_time:8.3f}s (includes worker start) | {len(saved)} figures")
+
+
+if __name__ == "__main__":
+    main()
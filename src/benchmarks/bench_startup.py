@@ -0,0 +1,97 @@
+"""
+    Cold-start benchmark of the main.py entry points.
+
+    Every measurement runs in a fresh interpreter (from the repository root,
+    so the saved models are found) and reports the median of --repeat runs:
+        - eager imports: the libraries main.py used to import at load time
+          (pandas, sklearn ensembles, XGBoost, matplotlib, seaborn, m2cgen)
+        - import main: loading the entry point itself
+        - predict: `main.py predict --reading ...` end to end, from the
+          first import to the printed prediction, with the saved model
+    and lists which of the heavy libraries the predict run imported.
+
+    As a guard, the script exits with status 1 when predict takes longer
+    than --max-seconds or imports a library it never needs (plotting,
+    m2cgen), so a module-level import creeping back is caught. sklearn and
+    the saved model's own library are needed to unpickle the artifacts
+    (and recent sklearn versions import pandas themselves).
+
+    Usage:
+        python src/benchmarks/bench_startup.py
+        python src/benchmarks/bench_startup.py --repeat 5 --max-seconds 2.5
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+SRC = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+ROOT = os.path.dirname(SRC)
+
+HEAVY = ['pandas', 'sklearn', 'sklearn.ensemble', 'xgboost', 'matplotlib', 'seaborn', 'm2cgen']
+NEVER_FOR_PREDICT = ['matplotlib', 'seaborn', 'm2cgen']
+
+EAGER = """
+import time
+start = time.perf_counter()
+import pandas, matplotlib.pyplot, seaborn, m2cgen, xgboost, sklearn.ensemble, sklearn.svm
+print(time.perf_counter() - start)
+"""
+
+PREDICT = """
+import contextlib, io, json, sys, time, warnings
+warnings.simplefilter("ignore")
+start = time.perf_counter()
+sys.path.insert(0, {src!r})
+sys.argv = ["main.py", "predict", "--reading", "2025-05-16 03:13:00", "29.8", "25.2"]
+import main
+imported = time.perf_counter() - start
+with contextlib.redirect_stdout(io.StringIO()):
+    main.main()
+print(json.dumps({{
+    "import": imported,
+    "predict": time.perf_counter() - start,
+    "modules": [m for m in {heavy!r} if m in sys.modules]
+}}))
+"""
+
+
+def run(code):
+    result = subprocess.run([sys.executable, "-c", code], cwd=ROOT, capture_output=True, text=True)
+    if result.returncode:
+        raise RuntimeError(result.stderr)
+    return result.stdout.strip().splitlines()[-1]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--max-seconds", type=float, default=3.0,
+                        help="Fail when the median predict cold start exceeds this")
+    args = parser.parse_args()
+
+    eager = statistics.median(float(run(EAGER)) for _ in range(args.repeat))
+    runs = [json.loads(run(PREDICT.format(src=SRC, heavy=HEAVY))) for _ in range(args.repeat)]
+    imported = statistics.median(r['import'] for r in runs)
+    predicted = statistics.median(r['predict'] for r in runs)
+    modules = runs[-1]['modules']
+
+    print(f"eager imports (previous main.py load) | {eager:.3f}s")
+    print(f"import main                           | {imported:.3f}s")
+    print(f"predict, end to end                   | {predicted:.3f}s")
+    print(f"heavy modules loaded by predict       | {', '.join(modules) or 'none'}")
+
+    failures = [f"{m} imported" for m in NEVER_FOR_PREDICT if m in modules]
+    if predicted > args.max_seconds:
+        failures.append(f"predict took {predicted:.3f}s (limit {args.max_seconds:.3f}s)")
+    if failures:
+        print("FAIL: " + "; ".join(failures))
+        sys.exit(1)
+    print("OK")
+
+
+if __name__ == "__main__":
+    main()
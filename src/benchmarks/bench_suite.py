@@ -0,0 +1,345 @@
+"""
+    Benchmark suite of the training and serving pipeline, stage by stage.
+
+    Synthetic logger files (benchmarks/synthetic.py, dados_*.csv schema) are
+    generated for every --rows scale, then each stage runs in a fresh
+    process, so its peak RSS is its own:
+        - ingest:     StreamingCSVLoader.load_arrays (CSV -> feature arrays)
+        - preprocess: DataPreprocessor.preprocess + prepare_features on the
+                      raw frame already in memory
+        - train:      ModelTrainer.train_models with cross-validation, on at
+                      most --train-rows rows
+        - evaluate:   ModelEvaluator.evaluate_models on at most --eval-rows
+                      rows, figures disabled
+        - inference:  InferenceModel loaded from a promoted bundle, then
+                      predict on raw readings in --batch-size batches, plus
+                      the latency of single-reading calls (inferencia.py)
+        - export:     export_model_to_arduino of the best model (by
+                      out-of-fold RMSE), written to a temporary directory
+    Selected stages pull in the stages they need the outputs of.
+
+    Every stage reports its wall time, rows/s, the process peak RSS and how
+    much the stage raised it (ru_maxrss; not available on Windows). Results
+    are written as JSON with --output. With --baseline, a previous JSON file
+    is compared per scale and stage, and the exit status is 1 when a wall
+    time or peak RSS grew by more than --threshold (wall times under
+    --min-wall seconds are not compared).
+
+    Usage:
+        python src/benchmarks/bench_suite.py --rows 1000 100000 --output baseline.json
+        python src/benchmarks/bench_suite.py --rows 1000 100000 --baseline baseline.json --threshold 0.2
+        python src/benchmarks/bench_suite.py --rows 10000000 --stages ingest preprocess inference --data-dir /tmp/bench/
+"""
+
+import argparse
+import contextlib
+import glob
+import io
+import json
+import multiprocessing
+import os
+import platform
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.synthetic import write_dataset
+from utils.config import Config
+
+STAGES = ('ingest', 'preprocess', 'train', 'evaluate', 'inference', 'export')
+REQUIRES = {'train': 'ingest', 'evaluate': 'train', 'inference': 'train', 'export': 'train'}
+COMPARED = ('wall_s', 'peak_rss_mb')
+
+
+def peak_rss_mb():
+    try:
+        import resource
+    except ImportError:  # Windows
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 2**20 if sys.platform == 'darwin' else peak / 2**10
+
+
+class StageTimer:
+    def __enter__(self):
+        self.rss_before = peak_rss_mb()
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.wall = time.perf_counter() - self.start
+        self.rss_peak = peak_rss_mb()
+
+
+def read_raw(data_dir, n_rows=None):
+    import pandas as pd
+    from utils.data_loader import CSV_DTYPES
+
+    paths = sorted(glob.glob(os.path.join(data_dir, "dados_*.csv")))
+    raw = pd.concat([pd.read_csv(path, dtype=CSV_DTYPES, parse_dates=['data']) for path in paths], ignore_index=True)
+    return raw if n_rows is None else raw.tail(n_rows)
+
+
+def load_arrays(ctx, n_rows=None, last=False):
+    X = np.load(os.path.join(ctx['work_dir'], "X.npy"), mmap_mode='r')
+    y = np.load(os.path.join(ctx['work_dir'], "y.npy"), mmap_mode='r')
+    rows = slice(-n_rows, None) if last else slice(n_rows)
+    return np.array(X[rows]), np.array(y[rows])
+
+
+def stage_ingest(ctx, timer):
+    from utils.data_loader import StreamingCSVLoader
+    from utils.preprocessor import DataPreprocessor
+
+    loader = StreamingCSVLoader(DataPreprocessor(), ctx['data_dir'], chunksize=Config.CHUNK_SIZE)
+    with timer:
+        X, y = loader.load_arrays()
+    np.save(os.path.join(ctx['work_dir'], "X.npy"), X)
+    np.save(os.path.join(ctx['work_dir'], "y.npy"), y)
+    return {'rows': len(y)}
+
+
+def stage_preprocess(ctx, timer):
+    from utils.preprocessor import DataPreprocessor
+
+    raw = read_raw(ctx['data_dir'])
+    preprocessor = DataPreprocessor()
+    with timer:
+        X, y = preprocessor.prepare_features(preprocessor.preprocess(raw))
+        X = X.to_numpy(dtype=np.float32)
+    return {'rows': len(raw)}
+
+
+def stage_train(ctx, timer):
+    import joblib
+    import pandas as pd
+    from utils.metrics import regression_metrics
+    from utils.model_trainer import ModelTrainer
+    from utils.preprocessor import FEATURES
+
+    X, y = load_arrays(ctx, ctx['train_rows'])
+    config = Config()
+    trainer = ModelTrainer(config)
+    trainer.models = config.build_models(ctx['models'])
+    X_train, _, y_train, _ = trainer.split_data(pd.DataFrame(X, columns=FEATURES), pd.Series(y))
+    with timer:
+        models = trainer.train_models(X_train, y_train)
+    best = min(models, key=lambda name: regression_metrics(y_train, trainer.oof_predictions[name])['rmse'])
+    joblib.dump({'models': models, 'best': best, 'X_train': X_train}, os.path.join(ctx['work_dir'], "models.joblib"))
+    return {'rows': len(X_train), 'best_model': best}
+
+
+def stage_evaluate(ctx, timer):
+    import joblib
+    import pandas as pd
+    from utils.model_evaluator import ModelEvaluator
+    from utils.preprocessor import FEATURES
+    from utils.reporting import Reporter
+
+    models = joblib.load(os.path.join(ctx['work_dir'], "models.joblib"))['models']
+    X, y = load_arrays(ctx, ctx['eval_rows'], last=True)
+    X = pd.DataFrame(X, columns=FEATURES)
+    evaluator = ModelEvaluator(Reporter(enabled=False))
+    with timer:
+        evaluator.evaluate_models(models, X, y)
+    return {'rows': len(y), 'models': len(models)}
+
+
+def stage_inference(ctx, timer):
+    import joblib
+    from utils.artifact_store import ArtifactStore
+    from utils.inference_service import InferenceModel
+    from utils.preprocessor import FEATURES
+
+    state = joblib.load(os.path.join(ctx['work_dir'], "models.joblib"))
+    store = ArtifactStore(os.path.join(ctx['work_dir'], "store"))
+    store.promote(store.save(state['models'][state['best']], state['best'], features=FEATURES))
+    raw = read_raw(ctx['data_dir'], ctx['eval_rows'])
+    readings = (raw['data'].to_numpy(), raw['temperatura'].to_numpy(), raw['humidade'].to_numpy())
+    batch_size = ctx['batch_size']
+
+    with timer:
+        model = InferenceModel(ctx['work_dir'], store_path=store.path)
+        for start in range(0, len(raw), batch_size):
+            model.predict(*(column[start:start + batch_size] for column in readings))
+
+    latencies = []
+    for i in range(min(len(raw), 200)):
+        start = time.perf_counter()
+        model.predict(*(column[i:i + 1] for column in readings))
+        latencies.append(time.perf_counter() - start)
+    return {
+        'rows': len(raw),
+        'model': state['best'],
+        'latency_ms_p50': float(np.percentile(latencies, 50) * 1e3),
+        'latency_ms_p99': float(np.percentile(latencies, 99) * 1e3)
+    }
+
+
+def stage_export(ctx, timer):
+    import joblib
+
+    state = joblib.load(os.path.join(ctx['work_dir'], "models.joblib"))
+    # export_model_to_arduino writes under src/arduino/modelo_arduino/ of the working directory
+    export_dir = os.path.join(ctx['work_dir'], "src", "arduino", "modelo_arduino")
+    os.makedirs(export_dir, exist_ok=True)
+    os.chdir(ctx['work_dir'])
+    from main import export_model_to_arduino
+
+    with timer:
+        export_model_to_arduino(Config(), state['models'][state['best']], state['best'], X_calib=state['X_train'])
+    size = sum(os.path.getsize(os.path.join(export_dir, name)) for name in os.listdir(export_dir))
+    return {'rows': None, 'model': state['best'], 'bytes': size}
+
+
+STAGE_FUNCTIONS = {
+    'ingest': stage_ingest,
+    'preprocess': stage_preprocess,
+    'train': stage_train,
+    'evaluate': stage_evaluate,
+    'inference': stage_inference,
+    'export': stage_export
+}
+
+
+def run_stage(name, ctx):
+    import logging
+    import warnings
+    warnings.simplefilter("ignore")
+    logging.disable(logging.INFO)
+
+    timer = StageTimer()
+    # The pipeline prints progress; only the measurements are reported
+    with contextlib.redirect_stdout(io.StringIO()):
+        info = STAGE_FUNCTIONS[name](ctx, timer)
+    result = {'wall_s': timer.wall, 'peak_rss_mb': timer.rss_peak, **info}
+    if timer.rss_peak is not None:
+        result['rss_growth_mb'] = timer.rss_peak - timer.rss_before
+    if info.get('rows'):
+        result['rows_per_s'] = info['rows'] / timer.wall
+    return result
+
+
+def run_isolated(name, ctx):
+    # A fresh interpreter per stage: peak RSS and imports are the stage's own
+    with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn")) as pool:
+        return pool.submit(run_stage, name, ctx).result()
+
+
+def with_requirements(stages):
+    selected = set(stages)
+    for stage in stages:
+        while stage in REQUIRES:
+            stage = REQUIRES[stage]
+            selected.add(stage)
+    return [stage for stage in STAGES if stage in selected]
+
+
+def compare(runs, baseline, threshold, min_wall):
+    """
+    Returns: (rows, stage, metric, baseline value, new value, relative change)
+    of every compared measurement, and the subset above the threshold.
+    """
+    changes, regressions = [], []
+    for rows, stages in runs.items():
+        for stage, result in stages.items():
+            base = baseline.get('runs', {}).get(rows, {}).get(stage)
+            if base is None:
+                continue
+            for metric in COMPARED:
+                old, new = base.get(metric), result.get(metric)
+                if not old or new is None:
+                    continue
+                change = new / old - 1
+                changes.append((rows, stage, metric, old, new, change))
+                if change > threshold and not (metric == 'wall_s' and max(old, new) < min_wall):
+                    regressions.append(changes[-1])
+    return changes, regressions
+
+
+def print_run(rows, stages, changes):
+    change_of = {(stage, metric): change for r, stage, metric, _, _, change in changes if r == rows}
+    print(f"\n{int(rows):,} rows")
+    print(f"{'stage':11} | {'rows':>10} | {'wall (s)':>9} | {'rows/s':>11} | {'peak RSS (MB)':>13} | {'growth (MB)':>11} | vs baseline")
+    for stage, result in stages.items():
+        rows_used = f"{result['rows']:,}" if result.get('rows') else "-"
+        rate = f"{result['rows_per_s']:,.0f}" if 'rows_per_s' in result else "-"
+        peak = f"{result['peak_rss_mb']:.0f}" if result.get('peak_rss_mb') is not None else "-"
+        growth = f"{result['rss_growth_mb']:.0f}" if 'rss_growth_mb' in result else "-"
+        versus = " ".join(f"{metric.split('_')[0]} {change_of[(stage, metric)]:+.0%}"
+                          for metric in COMPARED if (stage, metric) in change_of)
+        print(f"{stage:11} | {rows_used:>10} | {result['wall_s']:9.3f} | {rate:>11} | {peak:>13} | {growth:>11} | {versus}")
+        if 'latency_ms_p50' in result:
+            print(f"{'':11} | single reading: p50 {result['latency_ms_p50']:.3f} ms, p99 {result['latency_ms_p99']:.3f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, nargs="+", default=[1_000, 100_000], help="Dataset sizes (1k to 10M)")
+    parser.add_argument("--stages", nargs="+", choices=STAGES, default=list(STAGES))
+    parser.add_argument("--models", nargs="+", choices=list(Config.MODELS), help="Default: every model of Config.MODELS")
+    parser.add_argument("--train-rows", type=int, default=200_000, help="Rows used by the train stage at most")
+    parser.add_argument("--eval-rows", type=int, default=1_000_000, help="Rows used by evaluate/inference at most")
+    parser.add_argument("--batch-size", type=int, default=Config.MAX_BATCH_SIZE)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--data-dir", help="Keep the generated files here and reuse them (default: temporary)")
+    parser.add_argument("--output", help="Write the results as JSON")
+    parser.add_argument("--baseline", help="Previous JSON results to compare with")
+    parser.add_argument("--threshold", type=float, default=0.2, help="Allowed relative increase (0.2 = +20%%)")
+    parser.add_argument("--min-wall", type=float, default=0.05, help="Wall times below this are not compared (s)")
+    args = parser.parse_args()
+
+    stages = with_requirements(args.stages)
+    results = {
+        'created': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'seed': args.seed,
+        'options': {key: getattr(args, key) for key in ('models', 'train_rows', 'eval_rows', 'batch_size')},
+        'runs': {}
+    }
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for n_rows in args.rows:
+            data_dir = os.path.join(args.data_dir or tmp, f"rows_{n_rows}")
+            start = time.perf_counter()
+            write_dataset(data_dir, n_rows, args.seed)
+            print(f"{n_rows:,} rows generated in {data_dir} ({time.perf_counter() - start:.1f}s)")
+
+            with tempfile.TemporaryDirectory(dir=tmp) as work_dir:
+                ctx = {
+                    'data_dir': data_dir, 'work_dir': work_dir, 'models': args.models,
+                    'train_rows': args.train_rows, 'eval_rows': args.eval_rows, 'batch_size': args.batch_size
+                }
+                results['runs'][str(n_rows)] = {stage: run_isolated(stage, ctx) for stage in stages}
+
+    changes, regressions = compare(results['runs'], baseline, args.threshold, args.min_wall) if baseline else ([], [])
+    for rows, stages_run in results['runs'].items():
+        print_run(rows, stages_run, changes)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"\nResults written to {args.output}")
+    if baseline:
+        if baseline.get('options') != results['options']:
+            print(f"Note: the baseline was run with other options: {baseline.get('options')}")
+        for rows, stage, metric, old, new, change in regressions:
+            print(f"REGRESSION {int(rows):,} rows | {stage} | {metric}: {old:.3f} -> {new:.3f} ({change:+.0%})")
+        print(f"{len(changes)} measurements compared with {args.baseline}, {len(regressions)} above +{args.threshold:.0%}")
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""
+    Benchmark of the time-feature encoding against the original
+    DataPreprocessor.preprocess implementation.
+
+    For every size, times:
+        - legacy: the original preprocess (repeated .dt accessors, separate
+          np.sin/np.cos calls, in-place mutation)
+        - preprocess: the current DataPreprocessor.preprocess
+        - encoder: encode_time_features straight into a float32 matrix
+    and checks that the encodings match the legacy values.
+
+    Usage:
+        python src/benchmarks/bench_time_features.py
+        python src/benchmarks/bench_time_features.py --sizes 1000 100000 --repeat 5
+"""
+
+import argparse
+import os
+import sys
+import time
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.preprocessor import DataPreprocessor, encode_time_features, TIME_FEATURES
+
+
+def legacy_preprocess(df):
+    df['data'] = pd.to_datetime(df['data'])
+    df['ano'] = df['data'].dt.year
+    df['mes'] = df['data'].dt.month
+    df['dia'] = df['data'].dt.day
+    df['hora'] = df['data'].dt.hour
+    df['mes_sin'] = np.sin(2 * np.pi * df['data'].dt.month / 12)
+    df['mes_cos'] = np.cos(2 * np.pi * df['data'].dt.month / 12)
+    df['dia_sin'] = np.sin(2 * np.pi * df['data'].dt.day / 31)
+    df['dia_cos'] = np.cos(2 * np.pi * df['data'].dt.day / 31)
+    df['hora_sin'] = np.sin(2 * np.pi * df['data'].dt.hour / 24)
+    df['hora_cos'] = np.cos(2 * np.pi * df['data'].dt.hour / 24)
+    df['timestamp'] = df['data']
+    return df.drop(columns=['data'])
+
+
+def make_readings(n_rows, seed=42):
+    rng = np.random.default_rng(seed)
+    start = np.datetime64('2025-01-01T00:00:00', 'us')
+    offsets = np.cumsum(rng.integers(1_000_000, 600_000_000, n_rows))
+    return pd.DataFrame({
+        'temperatura': rng.uniform(5, 45, n_rows).astype(np.float32),
+        'humidade': rng.uniform(10, 95, n_rows).astype(np.float32),
+        'data': start + offsets.astype('timedelta64[us]'),
+        'rega_necessaria_min': rng.integers(0, 50, n_rows).astype(np.int16)
+    })
+
+
+def best_of(fn, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1_000, 100_000, 10_000_000])
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    preprocessor = DataPreprocessor()
+    print(f"{'rows':>10} | {'legacy':>10} | {'preprocess':>10} | {'encoder':>10} | {'speedup':>8}")
+    for n_rows in args.sizes:
+        df = make_readings(n_rows)
+        repeat = args.repeat if n_rows < 1_000_000 else 1
+
+        # The legacy version mutates its input, so it gets a fresh copy per run
+        legacy = best_of(lambda: legacy_preprocess(df.copy()), repeat)
+        current = best_of(lambda: preprocessor.preprocess(df), repeat)
+        encoder = best_of(lambda: encode_time_features(df['data']), repeat)
+
+        expected = legacy_preprocess(df.copy())[TIME_FEATURES].to_numpy(dtype=np.float32)
+        np.testing.assert_allclose(encode_time_features(df['data']), expected, atol=1e-6)
+
+        print(f"{n_rows:>10} | {legacy:>9.4f}s | {current:>9.4f}s | {encoder:>9.4f}s | {legacy / encoder:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
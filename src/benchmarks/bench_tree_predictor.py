@@ -0,0 +1,75 @@
+"""
+    Benchmark of the compiled NumPy tree predictor against model.predict.
+
+    Trains the tree models of Config.MODELS on synthetic readings, checks
+    that CompiledTreeEnsemble.predict matches model.predict within float
+    tolerance and times both for single-row and large batches.
+
+    Usage:
+        python src/benchmarks/bench_tree_predictor.py
+        python src/benchmarks/bench_tree_predictor.py --batch-sizes 1 1000 100000
+"""
+
+import argparse
+import os
+import sys
+import time
+import warnings
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sklearn.base import clone
+from utils.config import Config
+from utils.preprocessor import build_feature_matrix
+from utils.tree_predictor import compile_model
+
+warnings.filterwarnings("ignore", message="X does not have valid feature names")
+
+
+def make_dataset(n_rows, seed=42):
+    rng = np.random.default_rng(seed)
+    timestamps = np.datetime64('2025-05-01T00:00:00', 's') + rng.integers(0, 60 * 86400, n_rows).astype('timedelta64[s]')
+    temperatura = np.round(rng.uniform(5, 45, n_rows), 1)
+    humidade = np.round(rng.uniform(10, 95, n_rows), 1)
+    X = build_feature_matrix(timestamps, temperatura, humidade)
+    y = np.maximum(0, 1 + (temperatura - 20) * 0.8 - (humidade - 50) * 0.2 + rng.normal(0, 1, n_rows))
+    return X, y
+
+
+def time_per_call(fn, X, min_time=0.5):
+    calls, start = 0, time.perf_counter()
+    while True:
+        fn(X)
+        calls += 1
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time:
+            return elapsed / calls
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--train-rows', type=int, default=20_000)
+    parser.add_argument('--batch-sizes', type=int, nargs='+', default=[1, 100_000])
+    args = parser.parse_args()
+
+    X_train, y_train = make_dataset(args.train_rows)
+    X_test, _ = make_dataset(max(args.batch_sizes), seed=7)
+
+    print(f"{'model':15} | {'rows':>7} | {'predict':>11} | {'compiled':>11} | {'speedup':>7} | max |diff|")
+    for name, model in Config().build_models().items():
+        model = clone(model).fit(X_train, y_train)
+        compiled = compile_model(model)
+        if compiled is None:
+            continue
+        for batch_size in args.batch_sizes:
+            X = X_test[:batch_size]
+            diff = np.abs(compiled.predict(X) - model.predict(X)).max()
+            assert diff <= 1e-4 * max(1.0, np.abs(y_train).max()), f"{name} predictions differ by {diff}"
+            reference = time_per_call(model.predict, X)
+            fast = time_per_call(compiled.predict, X)
+            print(f"{name:15} | {batch_size:>7} | {reference * 1000:>8.3f} ms | {fast * 1000:>8.3f} ms | {reference / fast:>6.1f}x | {diff:.2e}")
+
+
+if __name__ == "__main__":
+    main()
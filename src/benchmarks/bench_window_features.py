@@ -0,0 +1,104 @@
+"""
+    Benchmark of the rolling window features (utils/window_features.py).
+
+    On synthetic readings with missing values, a missing timestamp, a gap
+    and a step back in time (a new series):
+        - batch: WindowFeatures.transform over the whole history
+        - chunked: transform over random chunks, continuing the state
+        - stream: WindowFeatures.update, one reading at a time, as on the
+          live serial feed
+    The chunked and stream results are checked to be bitwise identical to
+    the batch ones, and the batch ones are checked against a direct
+    recomputation of every sampled window.
+
+    Usage:
+        python src/benchmarks/bench_window_features.py
+        python src/benchmarks/bench_window_features.py --rows 1000000 --minutes 30
+"""
+
+import argparse
+import os
+import sys
+import time
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.synthetic import generate_readings
+from utils.window_features import WindowFeatures
+
+
+def make_history(n_rows, interval_s):
+    df = generate_readings(n_rows, interval_s=interval_s, missing_rate=0.02)
+    timestamps = df['data'].to_numpy().astype('datetime64[ns]')
+    timestamps[n_rows // 4:] += np.timedelta64(1800, 's')
+    timestamps[3 * n_rows // 4:] -= np.timedelta64(3, 'h')
+    timestamps[100] = np.datetime64('NaT')
+    return timestamps, df['temperatura'].to_numpy(), df['humidade'].to_numpy(), 3 * n_rows // 4
+
+
+def bitwise_equal(a, b):
+    return a.shape == b.shape and np.array_equal(a.view(np.uint32), b.view(np.uint32))
+
+
+def check_windows(features, timestamps, temperatura, humidade, series_start, minutes, step=97):
+    """Max deviation of mean/min/max/slope from a direct computation of every step-th window."""
+    seconds = timestamps.astype('datetime64[s]').astype(np.int64)
+    deviation = 0.0
+    for i in range(0, len(timestamps), step):
+        if np.isnat(timestamps[i]):
+            continue
+        rows = np.arange(series_start if i >= series_start else 0, i + 1)
+        rows = rows[~np.isnat(timestamps[rows]) & (seconds[rows] > seconds[i] - 60 * minutes)]
+        for k, values in enumerate((temperatura, humidade)):
+            window = values[rows].astype(np.float64)
+            present = ~np.isnan(window)
+            if present.sum() < 2:
+                continue
+            slope = np.polyfit(seconds[rows][present] - seconds[i], window[present], 1)[0] * 60
+            expected = (window[present].mean(), window[present].min(), window[present].max(), slope)
+            deviation = max(deviation, np.abs(features[i, 4 * k:4 * k + 4] - np.array(expected)).max())
+    return deviation
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=200_000)
+    parser.add_argument('--interval', type=int, default=2, help="Seconds between readings")
+    parser.add_argument('--minutes', type=int, default=10)
+    parser.add_argument('--chunks', type=int, default=50)
+    args = parser.parse_args()
+
+    timestamps, temperatura, humidade, series_start = make_history(args.rows, args.interval)
+    print(f"{args.rows:,} readings every {args.interval}s, {args.minutes}-minute windows")
+
+    start = time.perf_counter()
+    batch = WindowFeatures(args.minutes).transform(timestamps, temperatura, humidade)
+    batch_time = time.perf_counter() - start
+
+    rng = np.random.default_rng(0)
+    cuts = [0, *np.sort(rng.choice(np.arange(1, args.rows), args.chunks - 1, replace=False)), args.rows]
+    windows = WindowFeatures(args.minutes)
+    start = time.perf_counter()
+    chunked = np.concatenate([windows.transform(timestamps[a:b], temperatura[a:b], humidade[a:b])
+                              for a, b in zip(cuts[:-1], cuts[1:])])
+    chunked_time = time.perf_counter() - start
+
+    windows = WindowFeatures(args.minutes)
+    start = time.perf_counter()
+    stream = np.array([windows.update(*reading) for reading in zip(timestamps, temperatura, humidade)])
+    stream_time = time.perf_counter() - start
+
+    assert bitwise_equal(chunked, batch), "chunked transform differs from the batch transform"
+    assert bitwise_equal(stream, batch), "streaming updates differ from the batch transform"
+    deviation = check_windows(batch, timestamps, temperatura, humidade, series_start, args.minutes)
+    assert deviation < 1e-4, f"window statistics deviate by {deviation}"
+    print(f"Chunked and streaming features are bitwise identical; max deviation from direct windows {deviation:.2e}")
+
+    print(f"{'path':8} | {'time (s)':>9} | {'rows/s':>12}")
+    for name, elapsed in (("batch", batch_time), ("chunked", chunked_time), ("stream", stream_time)):
+        print(f"{name:8} | {elapsed:9.3f} | {args.rows / elapsed:12,.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""
+    Load test for the inference service (src/serve.py).
+
+    Opens --concurrency keep-alive connections, each sending POST /predict
+    requests of --batch-size readings back to back until --requests have been
+    sent in total, then reports p50/p99 latency and throughput.
+
+    Usage:
+        python src/serve.py &
+        python src/benchmarks/load_test.py --concurrency 64 --requests 20000
+        python src/benchmarks/load_test.py --unix-socket /tmp/rega.sock
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import time
+import numpy as np
+
+
+def make_body(batch_size):
+    readings = [{
+        "data": f"2025-05-{random.randint(1, 28):02d} {random.randint(0, 23):02d}:{random.randint(0, 59):02d}:00",
+        "temperatura": round(random.uniform(5, 45), 1),
+        "humidade": round(random.uniform(10, 95), 1)
+    } for _ in range(batch_size)]
+    return json.dumps(readings[0] if batch_size == 1 else readings).encode()
+
+
+async def client(args, counter, latencies):
+    if args.unix_socket:
+        reader, writer = await asyncio.open_unix_connection(args.unix_socket)
+    else:
+        reader, writer = await asyncio.open_connection(args.host, args.port)
+    body = make_body(args.batch_size)
+    request = (
+        f"POST /predict HTTP/1.1\r\nHost: {args.host}\r\n"
+        f"Content-Type: application/json\r\nContent-Length: {len(body)}\r\n\r\n"
+    ).encode() + body
+
+    while counter[0] < args.requests:
+        counter[0] += 1
+        start = time.perf_counter()
+        writer.write(request)
+        await writer.drain()
+        headers = {}
+        status = await reader.readline()
+        while True:
+            line = await reader.readline()
+            if line in (b"\r\n", b""):
+                break
+            key, _, value = line.decode().partition(":")
+            headers[key.strip().lower()] = value.strip()
+        await reader.readexactly(int(headers["content-length"]))
+        latencies.append(time.perf_counter() - start)
+        if b" 200 " not in status:
+            raise RuntimeError(f"Unexpected response: {status!r}")
+    writer.close()
+
+
+async def run(args):
+    counter, latencies = [0], []
+    start = time.perf_counter()
+    await asyncio.gather(*(client(args, counter, latencies) for _ in range(args.concurrency)))
+    elapsed = time.perf_counter() - start
+
+    latencies_ms = np.array(latencies) * 1000
+    print(f"requests:   {len(latencies)} x {args.batch_size} readings, concurrency {args.concurrency}")
+    print(f"latency:    p50 {np.percentile(latencies_ms, 50):.2f} ms | p99 {np.percentile(latencies_ms, 99):.2f} ms | max {latencies_ms.max():.2f} ms")
+    print(f"throughput: {len(latencies) / elapsed:.0f} requests/s | {len(latencies) * args.batch_size / elapsed:.0f} readings/s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--unix-socket")
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--batch-size", type=int, default=1, help="Readings per request")
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
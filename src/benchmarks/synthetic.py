@@ -0,0 +1,134 @@
+"""
+    Synthetic logger data in the dados_*.csv schema, from 1k to 10M+ rows.
+
+    Readings are taken every interval_s seconds (60 by default, so even 1k
+    rows cover the daily cycle) from a start date. The temperature follows
+    a daily and a seasonal cycle, the humidity moves against it, and both
+    drift with smooth noise, rounded to 0.1 like the HTU21D readings (with
+    interval_s=2, consecutive readings mostly repeat, as in the logger
+    files). With missing_rate, that share of the readings is left empty
+    (the logger files have none, and training does not impute), and
+    rega_necessaria_min is labeled with the irrigation rule
+    (IrrigationRules, equal to calcular_tempo_rega).
+
+    Data is generated and written chunk by chunk, so memory does not grow
+    with the row count. The rows depend only on the seed and their position,
+    so chunk sizes and file splits do not change the data.
+
+    Functions:
+        generate_readings(n_rows, seed=42, offset=0, ...):
+            Returns: DataFrame with temperatura, humidade, data, rega_necessaria_min
+        write_dataset(path, n_rows, seed=42, file_rows=1_000_000, ...):
+            Writes dados_synthetic_NNN.csv files (reused when already
+            generated with the same parameters; the dados_synthetic_*.csv
+            files of other parameters are deleted)
+            Returns: List of written file paths
+
+    Usage:
+        python src/benchmarks/synthetic.py --rows 10000000 --output /tmp/dados/
+"""
+
+import argparse
+import glob
+import json
+import os
+import sys
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.irrigation_rules import IrrigationRules
+
+START = np.datetime64('2025-05-01T00:00:00', 'us')
+KNOT_SECONDS = 600  # smooth noise knots every 10 minutes
+
+
+def _smooth_noise(seed, seconds, scale, stream):
+    # Linear interpolation between knots; knot values depend only on their
+    # index (one generator per block of 4096 knots), not on the chunking
+    first, last = int(seconds[0]) // KNOT_SECONDS, int(seconds[-1]) // KNOT_SECONDS + 1
+    blocks = range(first // 4096, last // 4096 + 1)
+    knots = np.concatenate([np.random.default_rng([seed, stream, block]).normal(0, scale, 4096) for block in blocks])
+    knots = knots[first - blocks[0] * 4096:last - blocks[0] * 4096 + 1]
+    return np.interp(seconds / KNOT_SECONDS, np.arange(first, last + 1), knots)
+
+
+def _uniform(seed, stream, rows):
+    # Uniform [0, 1) value per row index (splitmix64 finalizer)
+    x = rows.astype(np.uint64) + np.uint64((seed * 0x9E3779B9 + stream * 0x632BE59BD9B4E019) % (1 << 64))
+    x = (x ^ (x >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+    x = (x ^ (x >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+    x = x ^ (x >> np.uint64(31))
+    return (x >> np.uint64(11)) / float(1 << 53)
+
+
+def generate_readings(n_rows, seed=42, offset=0, interval_s=60, missing_rate=0.0, rules=None):
+    """Rows offset .. offset + n_rows - 1 of the synthetic series."""
+    rows = np.arange(offset, offset + n_rows, dtype=np.int64)
+    seconds = rows * interval_s
+    timestamps = START + (seconds * 1_000_000).astype('timedelta64[us]')
+    hour = (seconds % 86400) / 3600
+    day = seconds / 86400
+
+    daily = np.sin(2 * np.pi * (hour - 9) / 24)
+    seasonal = np.sin(2 * np.pi * (day + 120) / 365)
+    temperatura = 21 + 7 * daily + 8 * seasonal + _smooth_noise(seed, seconds, 1.5, stream=0)
+    humidade = np.clip(55 - 18 * daily - 10 * seasonal + _smooth_noise(seed, seconds, 6.0, stream=1), 5, 100)
+    temperatura = np.round(temperatura, 1).astype(np.float32)
+    humidade = np.round(humidade, 1).astype(np.float32)
+
+    if missing_rate:
+        # Sensor read failures; hashed row positions keep them chunk independent
+        for column, stream in ((temperatura, 2), (humidade, 3)):
+            column[_uniform(seed, stream, rows) < missing_rate] = np.nan
+
+    import pandas as pd
+    rules = rules or IrrigationRules()
+    return pd.DataFrame({
+        'temperatura': temperatura,
+        'humidade': humidade,
+        'data': timestamps,
+        'rega_necessaria_min': rules.label(temperatura, humidade)
+    })
+
+
+def write_dataset(path, n_rows, seed=42, file_rows=1_000_000, chunk_rows=250_000, **kwargs):
+    os.makedirs(path, exist_ok=True)
+    spec = {'rows': n_rows, 'seed': seed, 'file_rows': file_rows, **kwargs}
+    spec_file = os.path.join(path, "synthetic.json")
+    n_files = max(1, -(-n_rows // file_rows))
+    paths = [os.path.join(path, f"dados_synthetic_{i:03d}.csv") for i in range(n_files)]
+    if os.path.exists(spec_file) and all(os.path.exists(p) for p in paths):
+        with open(spec_file) as f:
+            if json.load(f) == spec:
+                return paths
+
+    # Files of a previous spec would still match the loader's dados_*.csv glob
+    for stale in glob.glob(os.path.join(path, "dados_synthetic_*.csv")):
+        os.remove(stale)
+    for i, p in enumerate(paths):
+        file_start = i * file_rows
+        file_end = min(n_rows, file_start + file_rows)
+        with open(p, "w", newline="") as f:
+            for start in range(file_start, file_end, chunk_rows):
+                chunk = generate_readings(min(chunk_rows, file_end - start), seed, offset=start, **kwargs)
+                chunk.to_csv(f, header=start == file_start, index=False, date_format='%Y-%m-%d %H:%M:%S.%f')
+    with open(spec_file, "w") as f:
+        json.dump(spec, f)
+    return paths
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--output", required=True, help="Directory of the generated files")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--file-rows", type=int, default=1_000_000, help="Rows per CSV file")
+    args = parser.parse_args()
+
+    paths = write_dataset(args.output, args.rows, args.seed, args.file_rows)
+    print(f"{args.rows:,} rows in {len(paths)} files under {args.output}")
+
+
+if __name__ == "__main__":
+    main()
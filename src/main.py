@@ -1,25 +1,56 @@
+import argparse
 import logging
-import pandas as pd
-import matplotlib.pyplot as plt
+import os
+import shutil
+import sys
 import numpy as np
+from utils import instrumentation
 from utils.config import Config
-from utils.preprocessor import DataPreprocessor
-from utils.model_trainer import ModelTrainer
-from utils.model_evaluator import ModelEvaluator
-import joblib
-import os
-import glob
-import m2cgen as m2c
 
 # Setup logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-def export_model_to_arduino(config, model, best_model_name):
+# Heavy libraries (pandas, sklearn, xgboost, matplotlib, seaborn, m2cgen) are
+# imported by the subcommand that needs them, so `predict` starts quickly
+COMMANDS = ('train', 'evaluate', 'export', 'predict', 'score', 'models')
+
+def export_model_to_arduino(config, model, best_model_name, X_test=None, X_calib=None, scaler=None):
         """
         Export the model to Arduino-compatible C++ code.
+        With the 'progmem' backend, tree ensembles are written as compact node
+        tables and, when X_test is given and gcc is available, checked against
+        the Python model with a host build.
+        With ARDUINO_LINEAR_MODE = 'fixed', linear regression is written as an
+        int16 fixed-point dot product calibrated on X_calib (raw features; a
+        fitted scaler is folded into the weights) and its deviation from the
+        float model is reported.
         """
-        if best_model_name == 'linear_regression':
+        from utils.arduino_export import (
+            export_tree_ensemble, footprint_report, verify_with_gcc,
+            export_linear_fixed_point, predict_fixed_point, accuracy_report, compile_and_run
+        )
+        if best_model_name == 'linear_regression' and config.ARDUINO_LINEAR_MODE == 'fixed':
+            export_name = config.MODELS_NAMES.get(best_model_name)
+            export_path = f"src/arduino/modelo_arduino/{export_name}.h"
+            params = export_linear_fixed_point(
+                model, export_name, export_path,
+                X_calib if X_calib is not None else X_test,
+                scaler=scaler,
+                weight_frac_bits=config.ARDUINO_WEIGHT_FRAC_BITS,
+                input_frac_bits=config.ARDUINO_INPUT_FRAC_BITS
+            )
+            logger.info(f"Fixed-point linear regression exported to {export_path}")
+
+            if X_test is not None:
+                accuracy = accuracy_report(model, params, X_test, scaler=scaler)
+                logger.info(f"Fixed-point vs float model on {len(X_test)} test rows: "
+                            f"max deviation {accuracy['max_abs']:.4f}, RMSE {accuracy['rmse']:.4f}")
+                if shutil.which("gcc"):
+                    host = compile_and_run(export_path, export_name, X_test)
+                    mismatch = float(np.abs(host - predict_fixed_point(params, X_test)).max())
+                    logger.info(f"Host build vs Python emulation: max deviation {mismatch:.2e}")
+        elif best_model_name == 'linear_regression':
             # Extract coefficients and intercept
             coef = model.coef_.flatten().tolist()
             intercept = model.intercept_.item() if np.ndim(model.intercept_) == 0 else model.intercept_[0]
@@ -65,7 +96,18 @@ def export_model_to_arduino(config, model, best_model_name):
                 f.write("}\n")
 
             logger.info(f"Linear regression model exported to {export_path}")
+        elif config.ARDUINO_TREE_BACKEND == 'progmem':
+            export_name = config.MODELS_NAMES.get(best_model_name)
+            export_path = f"src/arduino/modelo_arduino/{export_name}.h"
+            report = export_tree_ensemble(model, export_name, export_path, quantize=config.ARDUINO_QUANTIZE_THRESHOLDS)
+            logger.info(f"Model exported to {export_path}")
+            logger.info(footprint_report(report))
+
+            if X_test is not None and shutil.which("gcc"):
+                deviation = verify_with_gcc(export_path, export_name, X_test, model.predict(X_test))
+                logger.info(f"Host build matches the Python model on {len(X_test)} test rows (max deviation {deviation:.2e})")
         else:
+            import m2cgen as m2c
             # Dynamically construct export path based on best_model_name
             export_name = config.MODELS_NAMES.get(best_model_name)
             export_path = f"src/arduino/modelo_arduino/{export_name}.cpp"
@@ -73,72 +115,492 @@ def export_model_to_arduino(config, model, best_model_name):
                 f.write(m2c.export_to_c(model))
             logger.info(f"Model exported to {export_path}")
 
-def main():
+def save_artifacts(config, preprocessor, model, best_model_name, X_test=None, X_train=None, metrics=None, split='random',
+                   split_rows=None):
+    from utils.artifact_store import ArtifactStore
+
+    # Model, imputer, scaler, features and metrics are saved as one versioned bundle
+    store = ArtifactStore(config.ARTIFACT_STORE_PATH.lstrip('/\\'), keep=config.ARTIFACT_KEEP_VERSIONS)
+    with instrumentation.stage('save_bundle'):
+        # The split is recorded so evaluate / export --verify pick the same test rows,
+        # and the rules so serving rebuilds the same window features
+        split = {'scheme': split, 'test_size': config.TEST_SIZE, 'seed': config.RANDOM_STATE}
+        if split_rows is not None:
+            split['rows'] = split_rows
+        version = store.save(model, best_model_name, preprocessor.imputer, preprocessor.scaler,
+                             features=preprocessor.feature_columns, metrics=metrics, split=split,
+                             rules=build_rules(config) if config.WINDOW_MINUTES else None)
+        if config.ARTIFACT_AUTO_PROMOTE:
+            store.promote(version)
+    logger.info(f"Artifacts saved as version {version} in {store.path} (current: {store.current()})")
+
+    # Export the model as saved in the bundle
+    bundle = store.load(version)
+    # The sketch feeds raw readings, so the scaler is only folded in when fitted
+    scaler = bundle.scaler if hasattr(bundle.scaler, 'mean_') else None
+    if config.WINDOW_MINUTES:
+        logger.warning("The Arduino sketch only computes the instantaneous features; "
+                       "the exported model also expects the window features (WINDOW_MINUTES = 0 for the board)")
+    with instrumentation.stage('export'):
+        export_model_to_arduino(config, bundle.model, best_model_name, X_test, X_calib=X_train, scaler=scaler)
+
+def run_incremental(config, preprocessor, trainer, loader):
+    """
+    Updates the models with the rows that arrived since the last run (or
+    retrains them when due) and saves/exports the best one.
+    """
+    from utils.incremental_trainer import IncrementalTrainer
+    incremental = IncrementalTrainer(config, trainer, config.INCREMENTAL_PATH.lstrip('/\\'))
+    with instrumentation.stage('incremental'):
+        outcome = incremental.run(loader)
+    logger.info(f"Incremental training: {outcome['mode']} ({outcome['reason']}) with {outcome['rows']} rows")
+    log_downsampling(loader)
+    if outcome['mode'] == 'none':
+        return
+
+    for name, metrics in outcome['results'].items():
+        logger.info(f"{name:20} | Test RMSE: {metrics['rmse']:.4f}")
+    best_model_name = incremental.state['best_model']
+    logger.info(f"Best model: {best_model_name}")
+    # Test metrics of the updated model, on the split of the last full retrain
+    save_artifacts(config, preprocessor, incremental.models[best_model_name], best_model_name,
+                   outcome.get('X_test'), outcome.get('X_train'), metrics=outcome['results'].get(best_model_name),
+                   split='incremental', split_rows=outcome['split_rows'])
+
+def run_out_of_core(config, args, preprocessor, evaluator, loader):
+    """
+    Trains on data larger than memory: the rows are streamed from the loader
+    once per pass, split by timestamp hash and evaluated chunk by chunk, with
+    peak memory sized to the budget (utils/out_of_core.py).
+    """
+    from utils.out_of_core import OutOfCoreTrainer
+    trainer = OutOfCoreTrainer(config, loader, budget_mb=args.memory_budget)
+    with instrumentation.stage('train_models'):
+        trained_models = trainer.train_models()
+    instrumentation.record('rows_loaded', trainer.n_train + trainer.n_test)
+    log_downsampling(loader)
+    for name, timings in trainer.timings.items():
+        instrumentation.record('model_fit_seconds', timings['fit'], model=name)
+    with instrumentation.stage('evaluate'):
+        results = evaluator.evaluate_stream(trained_models, trainer.test_chunks())
+    for name, metrics in results.items():
+        instrumentation.record('model_test_rmse', metrics['rmse'], model=name)
+
+    best_model_name = min(results, key=lambda model: results[model]['rmse'])
+    log_results(config, results)
+    logger.info(f"Best model: {best_model_name} with SCORE: {results[best_model_name]['score'] * 100:.2f}%")
+
+    # The export is checked and calibrated on bounded samples of each side
+    metrics = {key: results[best_model_name][key] for key in ('score', 'rmse', 'mae', 'r2')}
+    X_test = trainer.test_sample[0] if trainer.test_sample is not None else None
+    save_artifacts(config, preprocessor, trained_models[best_model_name], best_model_name, X_test, trainer.train_sample[0], metrics,
+                   split='hash')
+
+def build_loader(config, preprocessor):
+    """
+    Streams every CSV file starting with 'dados_' in chunks, preprocessing
+    each chunk into compact feature arrays instead of concatenating the raw
+    files. Preprocessed features of unchanged files are reused from the
+    feature cache. With RELABEL, the target is recomputed from the current
+    irrigation rules. With WINDOW_MINUTES, every file is also given the
+    rolling window features (minutos_desde_rega follows the same rules). With DOWNSAMPLE_SECONDS / DOWNSAMPLE_TOLERANCE,
+    repeated readings are then dropped.
+    """
+    from utils.data_loader import StreamingCSVLoader
+    from utils.downsampling import Downsampler
+    from utils.feature_cache import FeatureCache
+    from utils.window_features import WindowFeatures
+
+    rules = build_rules(config)
+    windows = WindowFeatures(config.WINDOW_MINUTES, rules) if config.WINDOW_MINUTES else None
+    downsampler = Downsampler(config.DOWNSAMPLE_SECONDS, config.DOWNSAMPLE_TOLERANCE)
+    if not downsampler.enabled:
+        downsampler = None
+    cache_params = {}
+    if config.RELABEL or windows is not None:
+        cache_params['rules'] = rules.to_dict()
+    if windows is not None:
+        cache_params['window_minutes'] = windows.minutes
+    if downsampler is not None:
+        cache_params['downsampling'] = downsampler.to_dict()
+    cache = FeatureCache(config.CACHE_PATH.lstrip('/\\'), params=cache_params or None) if config.FEATURE_CACHE else None
+    loader = StreamingCSVLoader(preprocessor, config.DATA_PATH.lstrip('/\\'), chunksize=config.CHUNK_SIZE, cache=cache,
+                                rules=rules if config.RELABEL else None, windows=windows, downsampler=downsampler)
+    return loader, cache
+
+def build_rules(config):
+    """Irrigation rules of the labels and of minutos_desde_rega: IRRIGATION_RULES, or the default bands with HUMIDADE_LIMITE."""
+    from utils.irrigation_rules import IrrigationRules
+
+    if config.IRRIGATION_RULES:
+        return IrrigationRules.from_file(config.IRRIGATION_RULES)
+    return IrrigationRules(humidity_limit=config.HUMIDADE_LIMITE)
+
+def log_downsampling(loader):
+    downsampler = loader.downsampler
+    # Cached files were downsampled when they were processed
+    if downsampler is not None and downsampler.rows_in:
+        logger.info(f"Downsampling kept {downsampler.rows_out} of {downsampler.rows_in} rows read "
+                    f"({downsampler.reduction():.1%} dropped)")
+        instrumentation.record('rows_dropped', downsampler.rows_in - downsampler.rows_out)
+
+def load_dataset(config, preprocessor, loader, cache):
+    import pandas as pd
+
+    with instrumentation.stage('load_data'):
+        X, y = loader.load_arrays()
+    logger.info(f"Irrigation data loaded with {loader.n_rows} rows from {len(loader.files())} files")
+    instrumentation.record('rows_loaded', loader.n_rows)
+    log_downsampling(loader)
+    if cache is not None:
+        logger.info(f"Feature cache: {cache.hits} files reused, {cache.misses} files processed")
+
+    # Prepare feature set
+    X = pd.DataFrame(X, columns=preprocessor.feature_columns)
+    y = pd.Series(y, name="rega_necessaria_min")
+    logger.info(f"Features prepared: {X.columns.tolist()}")
+    return X, y
+
+def load_split(config, split=None):
+    """
+    Train/test split of the training run, as recorded in the model bundle:
+    the timestamp hash of out-of-core training (scheme 'hash'), the split
+    of the last full retrain of incremental training (scheme 'incremental':
+    train_test_split of the first split['rows'] rows of every file),
+    otherwise train_test_split with RANDOM_STATE and TEST_SIZE.
+    """
+    from utils.model_trainer import ModelTrainer
+    from utils.out_of_core import hash_split
+    from utils.preprocessor import DataPreprocessor
+
+    preprocessor = DataPreprocessor()
+    loader, cache = build_loader(config, preprocessor)
+    if split is not None and split['scheme'] == 'incremental':
+        rows = split['rows']
+        with instrumentation.stage('load_data'):
+            files = [(X[:rows.get(os.path.abspath(path), 0)], y[:rows.get(os.path.abspath(path), 0)])
+                     for path, X, y in loader.iter_file_arrays()]
+        if not files:
+            raise FileNotFoundError(f"No files matching {loader.pattern} in {loader.data_path}")
+        logger.info(f"Irrigation data loaded with {sum(len(y) for _, y in files)} rows of the last full retrain")
+        return ModelTrainer(config).split_data(np.concatenate([X for X, _ in files]), np.concatenate([y for _, y in files]))
+    if split is None or split['scheme'] != 'hash':
+        X, y = load_dataset(config, preprocessor, loader, cache)
+        return ModelTrainer(config).split_data(X, y)
+
+    sides = ([], [])
+    with instrumentation.stage('load_data'):
+        for X, y, t in loader.iter_arrays(timestamps=True):
+            test = hash_split(t, split['test_size'], split['seed'])
+            sides[0].append((X[~test], y[~test]))
+            sides[1].append((X[test], y[test]))
+    if not sides[0]:
+        raise FileNotFoundError(f"No files matching {loader.pattern} in {loader.data_path}")
+    logger.info(f"Irrigation data loaded with {loader.n_rows} rows from {len(loader.files())} files (timestamp hash split)")
+    # Arrays, as the out-of-core models were fitted on
+    X_train, X_test = (np.concatenate([X for X, _ in side]) for side in sides)
+    y_train, y_test = (np.concatenate([y for _, y in side]) for side in sides)
+    return X_train, X_test, y_train, y_test
+
+def load_best_model(config):
+    """
+    Returns: (model, model name, fitted scaler or None, split record) of
+    the current version of the artifact store, or of the legacy pickles
+    without one (split None: train_test_split).
+    """
+    from utils.artifact_store import ArtifactStore
+
+    store = ArtifactStore(config.ARTIFACT_STORE_PATH.lstrip('/\\'))
+    if store.current() is not None:
+        bundle = store.load()
+        logger.info(f"Model version {bundle.version}: {bundle.model_name}")
+        model, name, scaler, split = bundle.model, bundle.model_name, bundle.scaler, bundle.split
+    else:
+        import joblib
+        model_path = config.MODEL_PATH.lstrip('/\\')
+        model = joblib.load(f"{model_path}best_model.pkl")
+        scaler = joblib.load(f"{model_path}scaler.pkl")
+        class_name = type(model).__name__
+        names = [name for name, export_name in config.MODELS_NAMES.items() if export_name == class_name]
+        if not names:
+            raise ValueError(f"{model_path}best_model.pkl holds an unknown model type: {class_name}")
+        name, split = names[0], None
+    return model, name, scaler if hasattr(scaler, 'mean_') else None, split
+
+def log_results(config, results):
+    for name, metrics in results.items():
+        logger.info(f"{name:20} | SCORE: {metrics['score']:.4f} | RMSE: {metrics['rmse']:.4f} | MAE: {metrics['mae']:.4f} | R²: {metrics['r2']:.4f}")
+        if 'ci' in metrics:
+            ci = metrics['ci']
+            logger.info(f"{name:20} | {1 - config.BOOTSTRAP_ALPHA:.0%} CI RMSE: [{ci['rmse'][0]:.4f}, {ci['rmse'][1]:.4f}] | "
+                        f"MAE: [{ci['mae'][0]:.4f}, {ci['mae'][1]:.4f}] | R²: [{ci['r2'][0]:.4f}, {ci['r2'][1]:.4f}]")
+
+def train(config, args):
+    from utils.preprocessor import DataPreprocessor
+    from utils.model_trainer import ModelTrainer
+    from utils.model_evaluator import ModelEvaluator
+    from utils.reporting import Reporter
+
     # Initialize components
-    config = Config()
     preprocessor = DataPreprocessor()
     trainer = ModelTrainer(config)
-    evaluator = ModelEvaluator()
+    # Figures are rendered in the background while the models train
+    reporter = Reporter(enabled=config.PLOTS, workers=config.PLOT_WORKERS)
+    evaluator = ModelEvaluator(reporter, max_points=config.PLOT_MAX_POINTS, dense_mode=config.PLOT_DENSE_MODE)
+    try:
+        train_and_export(config, args, preprocessor, trainer, evaluator)
+    finally:
+        # Waits for the figures still being rendered
+        with instrumentation.stage('plots_wait'):
+            saved = reporter.close()
+        if saved:
+            logger.info(f"{len(saved)} figures saved: {', '.join(saved)}")
 
+def train_and_export(config, args, preprocessor, trainer, evaluator):
     # Ensure DATA_PATH does not start with a slash
     data_path = config.DATA_PATH.lstrip('/\\')
 
     # Load irrigation data
-    # Load and concatenate all matching files into a single DataFrame
-    # Find all CSV files starting with 'dados_' in the directory
-    csv_files = glob.glob(f"{data_path}dados_*.csv")
-    
-    irrigation_df = pd.concat([pd.read_csv(f) for f in csv_files], ignore_index=True)
-    logger.info(f"Irrigation data loaded with {len(irrigation_df)} rows from {len(csv_files)} files")
-    
-    # Preprocess data
-    df = preprocessor.preprocess(irrigation_df)
-    
+    loader, cache = build_loader(config, preprocessor)
+    if args.incremental:
+        run_incremental(config, preprocessor, trainer, loader)
+        return
+    if args.out_of_core or config.OUT_OF_CORE:
+        if args.tune:
+            raise ValueError("--tune needs the data in memory and cannot be combined with --out-of-core")
+        run_out_of_core(config, args, preprocessor, evaluator, loader)
+        return
+
+    X, y = load_dataset(config, preprocessor, loader, cache)
+
     # Correlation analysis
-    evaluator.plot_correlation_matrix(data_path, df)
-    
-    # Prepare feature set
-    X, y = preprocessor.prepare_features(df)
-    logger.info(f"Features prepared: {X.columns.tolist()}")
+    with instrumentation.stage('plots'):
+        evaluator.plot_correlation_matrix(data_path, X.assign(rega_necessaria_min=y))
     
     # Split and transform
-    X_train, X_test, y_train, y_test = trainer.split_data(X, y)
+    with instrumentation.stage('split'):
+        X_train, X_test, y_train, y_test = trainer.split_data(X, y)
     # X_train_scaled, X_test_scaled = preprocessor.fit_transform(X_train, X_test)
 
-    # Train and evaluate
-    trained_models = trainer.train_models(X_train, y_train)
-    results = evaluator.evaluate_models(trained_models, X_test, y_test)
+    # Optional hyperparameter search; resumes from models/tuning/ when interrupted
+    if args.tune:
+        from utils.tuner import HalvingTuner
+        tuner = HalvingTuner(config, trainer)
+        with instrumentation.stage('tune'):
+            trainer.models = tuner.tuned_models(tuner.search(X_train, y_train))
+
+    # Train (final fits and cross-validation folds) and evaluate
+    with instrumentation.stage('train_models'):
+        trained_models = trainer.train_models(X_train, y_train)
+    for name, timings in trainer.timings.items():
+        instrumentation.record('model_fit_seconds', timings['fit'], model=name)
+        instrumentation.record('model_cv_seconds', sum(timings['folds']), model=name)
+    with instrumentation.stage('evaluate'):
+        results = evaluator.evaluate_models(trained_models, X_test, y_test, bootstrap=config.BOOTSTRAP_SAMPLES, alpha=config.BOOTSTRAP_ALPHA)
+        oof_results = evaluator.evaluate_oof(trainer.oof_predictions, y_train)
+    for name, metrics in oof_results.items():
+        logger.info(f"{name:20} | CV pooled out-of-fold (clipped) RMSE: {metrics['rmse']:.4f} | MAE: {metrics['mae']:.4f} | "
+                    f"R²: {metrics['r2']:.4f}")
+    for name, metrics in results.items():
+        instrumentation.record('model_test_rmse', metrics['rmse'], model=name)
     
     # Find best model with minimum RMSE
     best_model_name = min(results, key=lambda model: results[model]['rmse'])
 
-    # Ensure MODEL_PATH does not start with a slash
-    model_path = config.MODEL_PATH.lstrip('/\\')
-    
     # Compare model performance
-    for name, metrics in results.items():
-        logger.info(f"{name:20} | SCORE: {metrics['score']:.4f} | RMSE: {metrics['rmse']:.4f} | MAE: {metrics['mae']:.4f} | R²: {metrics['r2']:.4f}")
-    
-    if best_model_name in ['random_forest', 'xgboost', 'decision_tree']:
-        # Feature importance analysis for tree-based models
-        evaluator.plot_feature_importance(data_path, trained_models, [best_model_name], X.columns)
+    log_results(config, results)
     
-    # Plot results
-    evaluator.plot_results(results, y_test)
+    with instrumentation.stage('plots'):
+        if best_model_name in ['random_forest', 'xgboost', 'decision_tree']:
+            # Feature importance analysis for tree-based models
+            evaluator.plot_feature_importance(data_path, trained_models, [best_model_name], X.columns)
+        
+        # Plot results
+        evaluator.plot_results(results, y_test, data_path)
 
     logger.info(f"Best model: {best_model_name} with SCORE: {results[best_model_name]['score'] * 100:.2f}%")
 
-    # Save artifacts
-    os.makedirs(model_path, exist_ok=True)
-    joblib.dump(trained_models[best_model_name], f"{model_path}best_model.pkl")
-    joblib.dump(preprocessor.scaler, f"{model_path}scaler.pkl")
-    joblib.dump(preprocessor.imputer, f"{model_path}imputer.pkl")
+    metrics = {key: results[best_model_name][key] for key in ('score', 'rmse', 'mae', 'r2')}
+    save_artifacts(config, preprocessor, trained_models[best_model_name], best_model_name, X_test, X_train, metrics)
+
+def evaluate(config, args):
+    """Scores the saved model on the test split, without training."""
+    from utils.model_evaluator import ModelEvaluator
+
+    with instrumentation.stage('load_model'):
+        model, name, _, split = load_best_model(config)
+    _, X_test, _, y_test = load_split(config, split)
+    with instrumentation.stage('evaluate'):
+        results = ModelEvaluator().evaluate_models({name: model}, X_test, y_test,
+                                                   bootstrap=args.bootstrap, alpha=config.BOOTSTRAP_ALPHA)
+    log_results(config, results)
+
+def export(config, args):
+    """Exports the saved model to the Arduino sketch, without training."""
+    with instrumentation.stage('load_model'):
+        model, name, scaler, split = load_best_model(config)
+    X_train = X_test = None
+    # The fixed-point export is calibrated on the training features
+    if args.verify or (name == 'linear_regression' and config.ARDUINO_LINEAR_MODE == 'fixed'):
+        X_train, X_test, _, _ = load_split(config, split)
+    with instrumentation.stage('export'):
+        export_model_to_arduino(config, model, name, X_test, X_calib=X_train, scaler=scaler)
 
-    logger.info(f"All artifacts saved to {model_path}")
+def read_readings(path):
+    """data,temperatura,humidade columns of a CSV file ('-' for stdin)."""
+    import csv
 
-    # Load the trained model
-    model = joblib.load('models/best_model.pkl')
-    export_model_to_arduino(config, model, best_model_name)
+    with (open(path, newline='') if path != '-' else sys.stdin) as f:
+        rows = list(csv.DictReader(f))
+    as_float = lambda values: np.array([float(v) if v not in ('', None) else np.nan for v in values])
+    return (np.array([row['data'] for row in rows]),
+            as_float(row['temperatura'] for row in rows),
+            as_float(row['humidade'] for row in rows))
+
+def predict(config, args):
+    """Irrigation time of new readings with the saved model, as CSV on stdout."""
+    from utils.inference_service import InferenceModel
+
+    if args.reading:
+        timestamps, temperatura, humidade = (np.array([args.reading[0]]),
+                                             np.array([float(args.reading[1])]),
+                                             np.array([float(args.reading[2])]))
+    else:
+        timestamps, temperatura, humidade = read_readings(args.input)
+    with instrumentation.stage('load_model'):
+        model = InferenceModel(config.MODEL_PATH.lstrip('/\\'), compiled_max_rows=config.COMPILED_MAX_ROWS,
+                               store_path=config.ARTIFACT_STORE_PATH.lstrip('/\\'))
+    if args.reading and model.pipeline.windowed:
+        raise ValueError("A model with window features needs a node's readings in time order: "
+                         "use --input, or the inference service, which keeps every node's windows")
+    with instrumentation.stage('predict'):
+        predictions = model.predict(timestamps, temperatura, humidade) if len(timestamps) else np.empty(0)
+
+    sys.stdout.write("data,rega_necessaria_min\n")
+    sys.stdout.writelines(f"{t},{p:.2f}\n" for t, p in zip(timestamps, predictions))
+
+def score(config, args):
+    """Scores a large reading file in chunks across worker processes (utils/batch_scoring.py)."""
+    from utils.batch_scoring import score_csv
+
+    with instrumentation.stage('score'):
+        stats = score_csv(args.input, args.output, config.MODEL_PATH.lstrip('/\\'),
+                          store_path=config.ARTIFACT_STORE_PATH.lstrip('/\\'), chunk_rows=args.chunk_rows,
+                          workers=args.workers, compiled_max_rows=config.COMPILED_MAX_ROWS)
+    instrumentation.record('rows_scored', stats['rows'])
+    peak = instrumentation.peak_rss_bytes()
+    peak = f", peak RSS {peak / 2**20:.0f} MB" if peak is not None else ""
+    logger.info(f"Scored {stats['rows']} rows in {stats['seconds']:.2f}s ({stats['rows_per_s']:,.0f} rows/s) "
+                f"with {stats['workers']} workers{peak}")
+
+def models(config, args):
+    """Lists, promotes or rolls back the versions of the artifact store."""
+    from utils.artifact_store import ArtifactStore
+
+    store = ArtifactStore(config.ARTIFACT_STORE_PATH.lstrip('/\\'), keep=config.ARTIFACT_KEEP_VERSIONS)
+    if args.action == 'promote':
+        if not args.version:
+            raise ValueError("models promote needs a version, see `main.py models list`")
+        logger.info(f"Current model: {store.promote(args.version)}")
+    elif args.action == 'rollback':
+        logger.info(f"Rolled back to {store.rollback()}")
+    else:
+        current = store.current()
+        for manifest in store.versions():
+            marker = '*' if manifest['version'] == current else ' '
+            metrics = ' | '.join(f"{key.upper()}: {value:.4f}" for key, value in manifest['metrics'].items())
+            print(f"{marker} {manifest['version']} | {manifest['created']} | {manifest['model_name']:20} | {metrics}")
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Train the irrigation models and export the best one to Arduino")
+    commands = parser.add_subparsers(dest="command")
+
+    # Instrumentation options, shared by every subcommand
+    instrument = argparse.ArgumentParser(add_help=False)
+    options = instrument.add_argument_group("instrumentation")
+    options.add_argument("--instrument", action="store_true",
+                         help="Log the time and memory of every stage as JSON lines, and a summary")
+    options.add_argument("--trace-memory", action="store_true",
+                         help="Also trace the peak Python allocations of every stage (slower)")
+    options.add_argument("--metrics-file", default=Config.METRICS_FILE,
+                         help="Write the stage metrics as Prometheus text (.prom) or JSON (.json)")
+    options.add_argument("--profile", nargs="+", metavar="STAGE", default=Config.PROFILE_STAGES,
+                         help="Profile these stages ('all' for every stage) into PROFILE_PATH")
+
+    train_parser = commands.add_parser("train", parents=[instrument], help="Train, evaluate and export the models (default)")
+    train_parser.add_argument("--incremental", action="store_true",
+                              help="Update the saved models with new rows only (full retrain when due)")
+    train_parser.add_argument("--tune", action="store_true",
+                              help="Search Config.TUNING_SPACES with successive halving before training")
+    train_parser.add_argument("--out-of-core", action="store_true",
+                              help="Stream the data instead of loading it (datasets larger than memory)")
+    train_parser.add_argument("--memory-budget", type=int, metavar="MB", default=Config.MEMORY_BUDGET_MB,
+                              help="Peak memory of --out-of-core training")
+    train_parser.set_defaults(handler=train)
+
+    evaluate_parser = commands.add_parser("evaluate", parents=[instrument], help="Score the saved model on the test split")
+    evaluate_parser.add_argument("--bootstrap", type=int, default=Config.BOOTSTRAP_SAMPLES,
+                                 help="Bootstrap replicates for confidence intervals")
+    evaluate_parser.set_defaults(handler=evaluate)
+
+    export_parser = commands.add_parser("export", parents=[instrument], help="Export the saved model to the Arduino sketch")
+    export_parser.add_argument("--verify", action="store_true",
+                               help="Load the test split to check the export against the model")
+    export_parser.set_defaults(handler=export)
+
+    predict_parser = commands.add_parser("predict", parents=[instrument], help="Predict irrigation times with the saved model")
+    inputs = predict_parser.add_mutually_exclusive_group(required=True)
+    inputs.add_argument("--input", help="CSV file with data,temperatura,humidade columns ('-' for stdin)")
+    inputs.add_argument("--reading", nargs=3, metavar=("DATA", "TEMPERATURA", "HUMIDADE"),
+                        help="A single reading")
+    predict_parser.set_defaults(handler=predict)
+
+    score_parser = commands.add_parser("score", parents=[instrument],
+                                       help="Score a large CSV of many nodes in chunks across worker processes")
+    score_parser.add_argument("--input", required=True,
+                              help="CSV file with data,temperatura,humidade (and any id) columns ('-' for stdin)")
+    score_parser.add_argument("--output", default="-", help="Predictions CSV file ('-' for stdout)")
+    score_parser.add_argument("--chunk-rows", type=int, default=Config.SCORE_CHUNK_ROWS, help="Rows read and scored at a time")
+    score_parser.add_argument("--workers", type=int, default=Config.SCORE_WORKERS, help="Worker processes (-1 = all cores)")
+    score_parser.set_defaults(handler=score)
+
+    models_parser = commands.add_parser("models", parents=[instrument], help="List, promote or roll back the saved model versions")
+    models_parser.add_argument("action", nargs="?", choices=["list", "promote", "rollback"], default="list")
+    models_parser.add_argument("version", nargs="?", help="Version to promote (e.g. v0003)")
+    models_parser.set_defaults(handler=models)
+
+    # Without a subcommand, train (the original behavior, including --tune/--incremental)
+    argv = sys.argv[1:] if argv is None else list(argv)
+    if not argv or argv[0] not in COMMANDS + ('-h', '--help'):
+        argv = ['train'] + argv
+    return parser.parse_args(argv)
+
+def configure_instrumentation(config, args):
+    """
+    Returns: The active Instrumentation, or None when every stage timer,
+    metrics file and profile is off (the stages then cost nothing).
+    """
+    trace_memory = config.INSTRUMENT_MEMORY or args.trace_memory
+    if not (config.INSTRUMENT or args.instrument or trace_memory or args.metrics_file or args.profile):
+        return None
+    return instrumentation.configure(trace_memory=trace_memory, profile=args.profile, profiler=config.PROFILER,
+                                     profile_path=config.PROFILE_PATH.lstrip('/\\'))
+
+def main():
+    args = parse_args()
+    config = Config()
+    instruments = configure_instrumentation(config, args)
+    try:
+        with instrumentation.stage(f"command:{args.command}"):
+            args.handler(config, args)
+    finally:
+        if instruments is not None:
+            instruments.summary()
+            if args.metrics_file:
+                # Config paths are relative to the project root; command-line paths are used as given
+                path = args.metrics_file.lstrip('/\\') if args.metrics_file == config.METRICS_FILE else args.metrics_file
+                logger.info(f"Stage metrics written to {instruments.write_metrics(path)}")
+            instruments.close()
     
 if __name__ == "__main__":
     main()
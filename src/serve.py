@@ -0,0 +1,35 @@
+import argparse
+import asyncio
+import logging
+from utils.config import Config
+from utils.inference_service import InferenceModel, InferenceService
+
+# Setup logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def main():
+    config = Config()
+    parser = argparse.ArgumentParser(description="Irrigation model inference service")
+    parser.add_argument("--host", default=config.SERVE_HOST)
+    parser.add_argument("--port", type=int, default=config.SERVE_PORT)
+    parser.add_argument("--unix-socket", help="Listen on a Unix socket instead of TCP")
+    parser.add_argument("--window-ms", type=float, default=config.BATCH_WINDOW_MS,
+                        help="Micro-batching window in milliseconds")
+    parser.add_argument("--max-batch", type=int, default=config.MAX_BATCH_SIZE,
+                        help="Maximum rows per model call")
+    args = parser.parse_args()
+
+    # Load model, imputer and scaler once for the lifetime of the service (current bundle if promoted)
+    model = InferenceModel(config.MODEL_PATH.lstrip('/\\'), compiled_max_rows=config.COMPILED_MAX_ROWS,
+                           store_path=config.ARTIFACT_STORE_PATH.lstrip('/\\'))
+    service = InferenceService(model, window_ms=args.window_ms, max_batch=args.max_batch)
+    try:
+        asyncio.run(service.serve(args.host, args.port, args.unix_socket))
+    except KeyboardInterrupt:
+        logger.info("Inference service stopped")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,449 @@
+"""
+    Compact Arduino code generation for tree ensembles and linear models.
+
+    Alternative to m2cgen's nested if/else: the ensemble is emitted as flat
+    PROGMEM node tables walked by a small iterative loop, so flash usage
+    grows with the node count instead of with generated code.
+
+    Layout (internal nodes only):
+        FEATURE[]    uint8 feature index
+        THRESHOLD[]  float (go left if x <= threshold), or int16 rank when
+                     quantized (go left if rank(x) <= threshold)
+        LEFT/RIGHT[] int16 (int32 for very large ensembles) child reference:
+                     >= 0 internal node, < 0 leaf -(index + 1) into LEAVES
+        LEAVES[]     shared table of the distinct leaf values
+        ROOTS[]      child reference of every tree root
+
+    Float thresholds are rounded down to float32, so x <= threshold gives the
+    same branch as the Python model for every float32 input. Quantized mode
+    halves the threshold table: SPLITS[] holds the distinct float thresholds
+    of every feature (sorted, SPLIT_START[] offsets), each input is ranked
+    once per prediction by binary search, and nodes compare int16 ranks,
+    which selects exactly the same branches. NaN inputs are not supported.
+
+    Functions:
+        export_tree_ensemble(model, export_name, export_path, quantize=False):
+            Writes the header
+            Returns: Footprint report (dict)
+
+        footprint_report(report):
+            Returns: Human readable summary of the flash/RAM footprint
+
+        verify_with_gcc(export_path, export_name, X, expected, tolerance=1e-4):
+            Compiles the header with a host-side harness (gcc), runs it on X
+            and compares the output with expected
+            Returns: Maximum absolute deviation
+
+        export_linear_fixed_point(model, export_name, export_path, X_calib, scaler=None,
+                                  weight_frac_bits=10, input_frac_bits=8):
+            Writes a LinearRegression header with the StandardScaler folded
+            into the weights and an int16 fixed-point dot product (int32
+            accumulator) instead of the variadic double dot()
+            Returns: Fixed-point parameters
+
+        predict_fixed_point(params, X):
+            Returns: Python mirror of the generated fixed-point predictions
+
+        accuracy_report(model, params, X_test, scaler=None):
+            Returns: Max and RMSE deviation of fixed-point vs float predictions
+
+    Usage:
+        report = export_tree_ensemble(model, "RandomForestRegressor", "src/arduino/modelo_arduino/RandomForestRegressor.h")
+        verify_with_gcc("src/arduino/modelo_arduino/RandomForestRegressor.h", "RandomForestRegressor", X_test, model.predict(X_test))
+"""
+
+import os
+import shutil
+import subprocess
+import tempfile
+import numpy as np
+from utils.tree_predictor import compile_model
+
+_PGM_COMPAT = """#include <stdint.h>
+#if defined(ARDUINO)
+#include <Arduino.h>
+#endif
+#ifndef PROGMEM
+#define PROGMEM
+#endif
+#ifndef pgm_read_byte
+#define pgm_read_byte(p) (*(const uint8_t *)(p))
+#define pgm_read_word(p) (*(const uint16_t *)(p))
+#define pgm_read_dword(p) (*(const uint32_t *)(p))
+#define pgm_read_float(p) (*(const float *)(p))
+#endif
+"""
+
+
+def _float32_at_most(values):
+    # Largest float32 <= value, so float32 comparisons match the float64 split
+    rounded = values.astype(np.float32)
+    too_big = rounded.astype(np.float64) > values
+    rounded[too_big] = np.nextafter(rounded[too_big], np.float32(-np.inf))
+    return rounded
+
+
+def _c_array(c_type, name, values, fmt, per_line=12):
+    items = [fmt(v) for v in values]
+    lines = [", ".join(items[i:i + per_line]) for i in range(0, len(items), per_line)]
+    body = ",\n        ".join(lines)
+    return f"    static const {c_type} {name}[{len(items)}] PROGMEM = {{\n        {body}\n    }};\n"
+
+
+def _float_literal(value):
+    return f"{float(value)!r}f" if np.isfinite(value) else "0.0f"
+
+
+def _ensemble_tables(compiled):
+    """
+    Converts CompiledTreeEnsemble node tables into internal-node tables with
+    signed child references into a shared leaf table.
+    """
+    internal = np.flatnonzero(~compiled.is_leaf)
+    leaves = np.flatnonzero(compiled.is_leaf)
+    leaf_values, leaf_index = np.unique(compiled.value[leaves].astype(np.float32), return_inverse=True)
+
+    reference = np.empty(len(compiled.left), dtype=np.int64)
+    reference[internal] = np.arange(len(internal))
+    reference[leaves] = -(leaf_index + 1)
+
+    return {
+        'feature': compiled.feature[internal],
+        'threshold': compiled.threshold[internal],
+        'left': reference[compiled.left[internal]],
+        'right': reference[compiled.right[internal]],
+        'roots': reference[compiled.roots],
+        'leaves': leaf_values
+    }
+
+
+def _split_ranks(tables, thresholds, n_features):
+    """
+    Per-feature sorted tables of the distinct thresholds. A node threshold
+    becomes its int16 rank k in that table: x <= t_k exactly when fewer than
+    k + 1 thresholds of the feature are below x.
+    Returns: (ranks per node, concatenated split values, start offset per feature)
+    """
+    ranks = np.empty(len(thresholds), dtype=np.int64)
+    splits, starts = [], [0]
+    for f in range(n_features):
+        mask = tables['feature'] == f
+        values, inverse = np.unique(thresholds[mask], return_inverse=True)
+        ranks[mask] = inverse
+        splits.append(values)
+        starts.append(starts[-1] + len(values))
+    if ranks.max(initial=0) > 32767:
+        raise ValueError("Too many distinct thresholds per feature for int16 ranks")
+    return ranks, np.concatenate(splits).astype(np.float32), np.asarray(starts)
+
+
+def export_tree_ensemble(model, export_name, export_path, quantize=False):
+    compiled = compile_model(model)
+    if compiled is None:
+        raise ValueError(f"{type(model).__name__} is not a supported tree ensemble")
+    n_features = int(getattr(model, 'n_features_in_', compiled.feature.max() + 1))
+    tables = _ensemble_tables(compiled)
+    n_internal, n_leaves = len(tables['feature']), len(tables['leaves'])
+
+    wide = max(n_internal, n_leaves) >= 32768
+    index_type, index_bytes, read_index = (
+        ('int32_t', 4, 'int32_t(pgm_read_dword({}))') if wide else ('int16_t', 2, 'int16_t(pgm_read_word({}))')
+    )
+    data = f"{export_name}Data"
+
+    arrays = [
+        _c_array('uint8_t', 'FEATURE', tables['feature'], lambda v: str(int(v))),
+        _c_array(index_type, 'LEFT', tables['left'], lambda v: str(int(v))),
+        _c_array(index_type, 'RIGHT', tables['right'], lambda v: str(int(v))),
+        _c_array(index_type, 'ROOTS', tables['roots'], lambda v: str(int(v))),
+        _c_array('float', 'LEAVES', tables['leaves'], _float_literal)
+    ]
+    thresholds = _float32_at_most(tables['threshold'])
+    if quantize:
+        ranks, splits, starts = _split_ranks(tables, thresholds, n_features)
+        start_type, start_bytes, read_start = (
+            ('uint16_t', 2, 'pgm_read_word({})') if starts[-1] < 65536 else ('uint32_t', 4, 'pgm_read_dword({})')
+        )
+        arrays.append(_c_array('int16_t', 'THRESHOLD', ranks, lambda v: str(int(v))))
+        arrays.append(_c_array('float', 'SPLITS', splits, _float_literal))
+        arrays.append(_c_array(start_type, 'SPLIT_START', starts, lambda v: str(int(v))))
+        threshold_bytes = 2
+        # Rank of every input among the thresholds of its feature (binary search)
+        prepare = (
+            f"                        int16_t q[{n_features}];\n"
+            f"                        for (uint8_t f = 0; f < {n_features}; f++) {{\n"
+            f"                            {start_type} first = {read_start.format(f'&{data}::SPLIT_START[f]')};\n"
+            f"                            {start_type} lo = first, hi = {read_start.format(f'&{data}::SPLIT_START[f + 1]')};\n"
+            f"                            while (lo < hi) {{\n"
+            f"                                {start_type} mid = lo + ((hi - lo) >> 1);\n"
+            f"                                if (pgm_read_float(&{data}::SPLITS[mid]) < x[f]) lo = mid + 1; else hi = mid;\n"
+            f"                            }}\n"
+            f"                            q[f] = int16_t(lo - first);\n"
+            f"                        }}\n"
+        )
+        compare = f"q[f] <= int16_t(pgm_read_word(&{data}::THRESHOLD[node]))"
+    else:
+        arrays.append(_c_array('float', 'THRESHOLD', thresholds, _float_literal))
+        threshold_bytes = 4
+        prepare = ""
+        compare = f"x[f] <= pgm_read_float(&{data}::THRESHOLD[node])"
+
+    with open(export_path, "w") as f:
+        f.write("#pragma once\n")
+        f.write(_PGM_COMPAT)
+        f.write(f"namespace {data} {{\n")
+        f.write("".join(arrays))
+        f.write("}\n")
+        f.write("namespace Eloquent {\n")
+        f.write("    namespace ML {\n")
+        f.write("        namespace Port {\n")
+        f.write(f"            class {export_name} {{\n")
+        f.write("                public:\n")
+        f.write("                    float predict(float *x) {\n")
+        f.write(prepare)
+        f.write("                        float sum = 0.0f;\n")
+        f.write(f"                        for (uint16_t t = 0; t < {compiled.n_trees}; t++) {{\n")
+        f.write(f"                            {index_type} node = {read_index.format(f'&{data}::ROOTS[t]')};\n")
+        f.write("                            while (node >= 0) {\n")
+        f.write(f"                                uint8_t f = pgm_read_byte(&{data}::FEATURE[node]);\n")
+        f.write(f"                                node = {compare}\n")
+        f.write(f"                                    ? {read_index.format(f'&{data}::LEFT[node]')}\n")
+        f.write(f"                                    : {read_index.format(f'&{data}::RIGHT[node]')};\n")
+        f.write("                            }\n")
+        f.write(f"                            sum += pgm_read_float(&{data}::LEAVES[-node - 1]);\n")
+        f.write("                        }\n")
+        f.write(f"                        return {_float_literal(compiled.base)} + {_float_literal(compiled.scale)} * sum;\n")
+        f.write("                    }\n")
+        f.write("            };\n")
+        f.write("        }\n")
+        f.write("    }\n")
+        f.write("}\n")
+
+    flash = {
+        'FEATURE': n_internal,
+        'THRESHOLD': n_internal * threshold_bytes,
+        'LEFT': n_internal * index_bytes,
+        'RIGHT': n_internal * index_bytes,
+        'ROOTS': compiled.n_trees * index_bytes,
+        'LEAVES': n_leaves * 4
+    }
+    if quantize:
+        flash['SPLITS'] = len(splits) * 4
+        flash['SPLIT_START'] = len(starts) * start_bytes
+    return {
+        'model': export_name,
+        'path': export_path,
+        'quantized': quantize,
+        'n_trees': compiled.n_trees,
+        'internal_nodes': n_internal,
+        'distinct_leaves': n_leaves,
+        'index_type': index_type,
+        'flash_bytes': flash,
+        'flash_total': sum(flash.values()),
+        # Stack of predict(): node index, sum, loop counters and the input ranks
+        'ram_bytes': index_bytes + 4 + 3 + ((2 * n_features + 3 * start_bytes) if quantize else 0)
+    }
+
+
+def footprint_report(report):
+    arrays = ", ".join(f"{name} {size} B" for name, size in report['flash_bytes'].items())
+    return (
+        f"{report['model']}: {report['n_trees']} trees, {report['internal_nodes']} internal nodes, "
+        f"{report['distinct_leaves']} distinct leaves ({report['index_type']} indices"
+        f"{', int16 threshold ranks' if report['quantized'] else ''}) | "
+        f"flash {report['flash_total'] / 1024:.1f} KB [{arrays}] + traversal code | "
+        f"RAM {report['ram_bytes']} B stack, tables stay in flash"
+    )
+
+
+def fold_linear_model(model, X_calib, scaler=None):
+    """
+    Folds a fitted StandardScaler into the coefficients and centers every
+    input on an offset (the scaler mean, else the calibration mean):
+        y = sum(w_i * (x_i - offset_i)) + intercept
+    Returns: (weights, offsets, intercept) in the raw input space
+    """
+    coef = np.asarray(model.coef_, dtype=np.float64).ravel()
+    intercept = float(np.ravel(model.intercept_)[0])
+    if scaler is not None:
+        # w . (x - mean) / scale + b
+        weights = coef / scaler.scale_
+        offsets = np.asarray(scaler.mean_, dtype=np.float64)
+    else:
+        weights = coef
+        offsets = np.asarray(X_calib, dtype=np.float64).mean(axis=0)
+        intercept += float(weights @ offsets)
+    return weights, offsets, intercept
+
+
+def quantize_linear_model(model, X_calib, scaler=None, weight_frac_bits=10, input_frac_bits=8):
+    """
+    int16 weights in Q(15 - weight_frac_bits).weight_frac_bits and int16
+    centered inputs in Q(15 - input_frac_bits).input_frac_bits, accumulated in
+    int32. Raises ValueError when a weight or a calibration input does not
+    fit in int16, or when the int32 accumulator could overflow.
+    Returns: Dictionary with the fixed-point parameters
+    """
+    weights, offsets, intercept = fold_linear_model(model, X_calib, scaler)
+    q_weights = np.round(weights * (1 << weight_frac_bits))
+    if np.abs(q_weights).max() > 32767:
+        raise ValueError(f"Weights up to {np.abs(weights).max():.3f} overflow int16 with {weight_frac_bits} fractional bits")
+
+    deviation = np.abs(np.asarray(X_calib, dtype=np.float64) - offsets).max(axis=0)
+    max_input = np.ceil(deviation * (1 << input_frac_bits)) + 1
+    if max_input.max() > 32767:
+        feature = int(np.argmax(max_input))
+        raise ValueError(f"Input {feature} deviates up to {deviation[feature]:.3f} from its offset and overflows int16 with {input_frac_bits} fractional bits")
+    if float(np.abs(q_weights) @ max_input) >= 2 ** 31:
+        raise ValueError("The int32 accumulator could overflow; use fewer fractional bits")
+
+    return {
+        'weights': q_weights.astype(np.int16),
+        'offsets': offsets.astype(np.float32),
+        'intercept': np.float32(intercept),
+        'weight_frac_bits': weight_frac_bits,
+        'input_frac_bits': input_frac_bits
+    }
+
+
+def predict_fixed_point(params, X):
+    """Python mirror of the generated code, float32 and int32 arithmetic included."""
+    X = np.asarray(X, dtype=np.float32)
+    scaled = (X - params['offsets']) * np.float32(1 << params['input_frac_bits'])
+    rounded = np.where(scaled >= 0, np.floor(scaled + np.float32(0.5)), np.ceil(scaled - np.float32(0.5)))
+    q_inputs = np.clip(rounded, -32767, 32767).astype(np.int32)
+    acc = q_inputs @ params['weights'].astype(np.int32)
+    out_scale = np.float32(2.0 ** -(params['weight_frac_bits'] + params['input_frac_bits']))
+    return acc.astype(np.float32) * out_scale + params['intercept']
+
+
+def export_linear_fixed_point(model, export_name, export_path, X_calib, scaler=None,
+                              weight_frac_bits=10, input_frac_bits=8):
+    """
+    Writes a fixed-point LinearRegression header with a plain int16 array
+    dot product. predict(float *x) quantizes the raw readings and keeps the
+    float interface of the exported float model; predict_q(const int16_t *xq)
+    takes already quantized inputs.
+    Returns: Fixed-point parameters (see quantize_linear_model)
+    """
+    params = quantize_linear_model(model, X_calib, scaler, weight_frac_bits, input_frac_bits)
+    n = len(params['weights'])
+    data = f"{export_name}Data"
+    out_scale = 2.0 ** -(weight_frac_bits + input_frac_bits)
+
+    with open(export_path, "w") as f:
+        f.write("#pragma once\n")
+        f.write(_PGM_COMPAT)
+        f.write(f"// Weights Q{15 - weight_frac_bits}.{weight_frac_bits}, inputs Q{15 - input_frac_bits}.{input_frac_bits} centered on OFFSETS\n")
+        f.write(f"namespace {data} {{\n")
+        f.write(_c_array('int16_t', 'WEIGHTS', params['weights'], lambda v: str(int(v))))
+        f.write(_c_array('float', 'OFFSETS', params['offsets'], _float_literal))
+        f.write("}\n")
+        f.write("namespace Eloquent {\n")
+        f.write("    namespace ML {\n")
+        f.write("        namespace Port {\n")
+        f.write(f"            class {export_name} {{\n")
+        f.write("                public:\n")
+        f.write("                    float predict(float *x) {\n")
+        f.write(f"                        int16_t xq[{n}];\n")
+        f.write("                        quantize(x, xq);\n")
+        f.write("                        return predict_q(xq);\n")
+        f.write("                    }\n\n")
+        f.write("                    float predict_q(const int16_t *xq) {\n")
+        f.write("                        int32_t acc = 0;\n")
+        f.write(f"                        for (uint8_t i = 0; i < {n}; i++) {{\n")
+        f.write(f"                            acc += (int32_t) xq[i] * (int16_t) pgm_read_word(&{data}::WEIGHTS[i]);\n")
+        f.write("                        }\n")
+        f.write(f"                        return (float) acc * {_float_literal(out_scale)} + {_float_literal(params['intercept'])};\n")
+        f.write("                    }\n\n")
+        f.write("                    void quantize(const float *x, int16_t *xq) {\n")
+        f.write(f"                        for (uint8_t i = 0; i < {n}; i++) {{\n")
+        f.write(f"                            float v = (x[i] - pgm_read_float(&{data}::OFFSETS[i])) * {_float_literal(1 << input_frac_bits)};\n")
+        f.write("                            v = v >= 0.0f ? floorf(v + 0.5f) : ceilf(v - 0.5f);\n")
+        f.write("                            xq[i] = v > 32767.0f ? 32767 : (v < -32767.0f ? -32767 : (int16_t) v);\n")
+        f.write("                        }\n")
+        f.write("                    }\n")
+        f.write("            };\n")
+        f.write("        }\n")
+        f.write("    }\n")
+        f.write("}\n")
+    return params
+
+
+def accuracy_report(model, params, X_test, scaler=None):
+    """
+    Deviation of the fixed-point model from the float model on the raw
+    features X_test (scaled with scaler for the float model when given).
+    Returns: Dictionary with max_abs and rmse deviations
+    """
+    X_test = np.asarray(X_test, dtype=np.float64)
+    expected = model.predict(scaler.transform(X_test) if scaler is not None else X_test)
+    deviation = predict_fixed_point(params, X_test).astype(np.float64) - expected
+    return {
+        'max_abs': float(np.abs(deviation).max()),
+        'rmse': float(np.sqrt(np.mean(deviation ** 2)))
+    }
+
+
+_HARNESS = """#include <stdio.h>
+#include <stdlib.h>
+#include <math.h>
+#include "{header}"
+
+int main(int argc, char **argv) {{
+    FILE *in = fopen(argv[1], "rb");
+    FILE *out = fopen(argv[2], "wb");
+    Eloquent::ML::Port::{name} model;
+    float x[{n_features}];
+    while (fread(x, sizeof(float), {n_features}, in) == {n_features}) {{
+        float y = model.predict(x);
+        fwrite(&y, sizeof(float), 1, out);
+    }}
+    fclose(in);
+    fclose(out);
+    return 0;
+}}
+"""
+
+
+def compile_and_run(export_path, export_name, X, compiler="gcc"):
+    """
+    Builds a host executable around the exported header, feeds it the rows
+    of X as float32 and returns its float32 predictions.
+    """
+    if shutil.which(compiler) is None:
+        raise RuntimeError(f"{compiler} not found; cannot verify {export_path}")
+    X = np.ascontiguousarray(X, dtype=np.float32)
+    with tempfile.TemporaryDirectory() as tmp:
+        source = os.path.join(tmp, "harness.cpp")
+        binary = os.path.join(tmp, "harness")
+        inputs = os.path.join(tmp, "inputs.bin")
+        outputs = os.path.join(tmp, "outputs.bin")
+        with open(source, "w") as f:
+            f.write(_HARNESS.format(header=os.path.abspath(export_path), name=export_name, n_features=X.shape[1]))
+        X.tofile(inputs)
+        subprocess.run([compiler, "-x", "c++", "-O2", "-o", binary, source, "-lm"], check=True)
+        subprocess.run([binary, inputs, outputs], check=True)
+        return np.fromfile(outputs, dtype=np.float32)
+
+
+def verify_with_gcc(export_path, export_name, X, expected, tolerance=1e-4):
+    """
+    Raises AssertionError when the host build deviates by more than
+    tolerance (relative to the largest expected value); tolerance=None only
+    measures the deviation, e.g. for quantized exports.
+    """
+    predictions = compile_and_run(export_path, export_name, X)
+    expected = np.asarray(expected, dtype=np.float64)
+    deviation = np.abs(predictions.astype(np.float64) - expected)
+    max_deviation = float(deviation.max()) if len(deviation) else 0.0
+    if tolerance is None:
+        return max_deviation
+    # Float32 accumulation on the board: allow a relative tolerance
+    limit = tolerance * max(1.0, float(np.abs(expected).max()) if len(expected) else 1.0)
+    if max_deviation > limit:
+        raise AssertionError(
+            f"{export_path}: host build deviates from the Python model by {max_deviation:.6g} "
+            f"({int((deviation > limit).sum())} of {len(deviation)} rows above {limit:.2g})"
+        )
+    return max_deviation
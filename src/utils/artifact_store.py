@@ -0,0 +1,230 @@
+"""
+    Versioned store of the trained model bundles.
+
+    Every save writes one immutable bundle directory with everything needed
+    to score new readings, so the model and its preprocessing cannot drift
+    apart:
+
+        <path>/versions/v0007/
+            manifest.json   model name and class, feature list, metrics,
+                            train/test split, irrigation rules of the
+                            window features, predictor kind and the
+                            array index
+            arrays/*.npy    numeric tables of the CompiledPipeline: tree
+                            nodes or linear coefficients with the imputer
+                            and scaler folded in, and the imputer/scaler
+                            statistics for the estimator path
+            model.joblib    the fitted estimator, imputer and scaler, for
+                            code that needs the sklearn/XGBoost objects
+        <path>/CURRENT      {"version": ..., "history": [...]}
+
+    A bundle is written to a temporary directory and renamed into place, and
+    CURRENT is replaced atomically, so readers see either the previous or the
+    new model, never a mix. promote() points CURRENT at a version and pushes
+    the previous one on the history that rollback() pops.
+
+    load() opens the arrays as read-only memory maps: the tables are not
+    parsed or copied, and inference worker processes that load the same
+    version share the pages of the OS cache. Scoring with a bundle needs
+    only NumPy; the pickled estimator is read on first access of .model.
+
+    Attributes (ArtifactStore):
+        path (str): Store directory
+        keep (int): Versions kept by prune(), besides CURRENT and its history
+
+    Methods (ArtifactStore):
+        save(model, model_name, imputer=None, scaler=None, features=None, metrics=None, split=None, rules=None):
+            split: how the test rows were chosen, e.g. {'scheme': 'hash',
+            'test_size': 0.2, 'seed': 42} (default scheme: 'random')
+            rules: IrrigationRules behind minutos_desde_rega (windowed models)
+            Returns: New version name (not promoted)
+        promote(version) / rollback():
+            Returns: Version now current
+        current():
+            Returns: Current version name, or None
+        versions():
+            Returns: Manifests of the stored versions, oldest first
+        load(version=None):
+            Returns: ModelBundle of the given (default: current) version
+
+    Methods (ModelBundle):
+        predict(X): Pipeline prediction from raw features ordered like FEATURES
+        predict_raw(timestamps, temperatura, humidade): Same from raw readings
+
+    Usage:
+        store = ArtifactStore("models/store/")
+        store.promote(store.save(model, "random_forest", imputer, scaler, FEATURES, metrics))
+        bundle = store.load()
+        y_pred = bundle.predict(X)
+"""
+
+import json
+import os
+import shutil
+import tempfile
+from datetime import datetime
+import numpy as np
+from utils.irrigation_rules import IrrigationRules
+from utils.pipeline import compile_pipeline, pipeline_from_arrays
+from utils.preprocessor import FEATURES
+
+
+class ModelBundle:
+    def __init__(self, path):
+        self.path = path
+        with open(os.path.join(path, "manifest.json")) as f:
+            self.manifest = json.load(f)
+        self.version = self.manifest['version']
+        self.model_name = self.manifest['model_name']
+        self.features = self.manifest['features']
+        self.metrics = self.manifest['metrics']
+        # Bundles saved before the split was recorded used train_test_split
+        self.split = self.manifest.get('split', {'scheme': 'random'})
+        rules = self.manifest.get('rules')
+        self.rules = IrrigationRules.from_dict(rules) if rules is not None else None
+        self.arrays = {
+            name: np.load(os.path.join(path, "arrays", f"{name}.npy"), mmap_mode='r')
+            for name in self.manifest['arrays']
+        }
+        self._objects = None
+        self.pipeline = pipeline_from_arrays(
+            self.arrays, self.manifest['predictor'], self.manifest['predictor_params'],
+            self.features, estimator_loader=lambda: self.model, rules=self.rules
+        )
+
+    def _load_objects(self):
+        if self._objects is None:
+            import joblib
+            self._objects = joblib.load(os.path.join(self.path, "model.joblib"))
+        return self._objects
+
+    @property
+    def model(self):
+        return self._load_objects()['model']
+
+    @property
+    def imputer(self):
+        return self._load_objects()['imputer']
+
+    @property
+    def scaler(self):
+        return self._load_objects()['scaler']
+
+    def predict(self, X):
+        return self.pipeline.predict(X)
+
+    def predict_raw(self, timestamps, temperatura, humidade):
+        return self.pipeline.predict_raw(timestamps, temperatura, humidade)
+
+
+def _write_json(path, data):
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(data, f, indent=2)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+class ArtifactStore:
+    def __init__(self, path, keep=10):
+        self.path = path
+        self.keep = keep
+        self.versions_path = os.path.join(path, "versions")
+        self.pointer_file = os.path.join(path, "CURRENT")
+
+    def _version_names(self):
+        if not os.path.isdir(self.versions_path):
+            return []
+        names = [name for name in os.listdir(self.versions_path) if name[:1] == 'v' and name[1:].isdigit()]
+        return sorted(names, key=lambda name: int(name[1:]))
+
+    def _pointer(self):
+        if not os.path.exists(self.pointer_file):
+            return {'version': None, 'history': []}
+        with open(self.pointer_file) as f:
+            return json.load(f)
+
+    def current(self):
+        return self._pointer()['version']
+
+    def versions(self):
+        manifests = []
+        for name in self._version_names():
+            with open(os.path.join(self.versions_path, name, "manifest.json")) as f:
+                manifests.append(json.load(f))
+        return manifests
+
+    def save(self, model, model_name, imputer=None, scaler=None, features=None, metrics=None, split=None, rules=None):
+        import joblib
+
+        os.makedirs(self.versions_path, exist_ok=True)
+        features = list(features) if features is not None else FEATURES
+        pipeline = compile_pipeline(model, imputer, scaler, features, rules)
+        arrays, params = pipeline.arrays()
+        tmp_path = tempfile.mkdtemp(prefix=".tmp-", dir=self.versions_path)
+        try:
+            os.makedirs(os.path.join(tmp_path, "arrays"))
+            for name, array in arrays.items():
+                np.save(os.path.join(tmp_path, "arrays", f"{name}.npy"), np.ascontiguousarray(array))
+            joblib.dump({'model': model, 'imputer': imputer, 'scaler': scaler}, os.path.join(tmp_path, "model.joblib"))
+            manifest = {
+                'model_name': model_name,
+                'model_class': type(model).__name__,
+                'created': datetime.now().isoformat(timespec='seconds'),
+                'features': features,
+                'metrics': {key: float(value) for key, value in (metrics or {}).items()},
+                'split': split or {'scheme': 'random'},
+                'rules': rules.to_dict() if rules is not None else None,
+                'predictor': pipeline.kind,
+                'predictor_params': params,
+                'arrays': {name: {'dtype': str(array.dtype), 'shape': list(array.shape)} for name, array in arrays.items()}
+            }
+            # Version numbers are claimed by the rename, so concurrent saves never collide
+            while True:
+                existing = self._version_names()
+                version = f"v{int(existing[-1][1:]) + 1 if existing else 1:04d}"
+                manifest['version'] = version
+                _write_json(os.path.join(tmp_path, "manifest.json"), manifest)
+                try:
+                    os.rename(tmp_path, os.path.join(self.versions_path, version))
+                    return version
+                except OSError:
+                    if not os.path.exists(os.path.join(self.versions_path, version)):
+                        raise
+        except BaseException:
+            shutil.rmtree(tmp_path, ignore_errors=True)
+            raise
+
+    def promote(self, version):
+        if version not in self._version_names():
+            raise ValueError(f"Unknown model version: {version}")
+        pointer = self._pointer()
+        if pointer['version'] != version:
+            history = pointer['history'] + ([pointer['version']] if pointer['version'] else [])
+            history = history[-self.keep:]
+            _write_json(self.pointer_file, {'version': version, 'history': history})
+        self.prune()
+        return version
+
+    def rollback(self):
+        pointer = self._pointer()
+        if not pointer['history']:
+            raise ValueError("No previous model version to roll back to")
+        version = pointer['history'][-1]
+        _write_json(self.pointer_file, {'version': version, 'history': pointer['history'][:-1]})
+        return version
+
+    def prune(self):
+        pointer = self._pointer()
+        names = self._version_names()
+        protected = set(names[-self.keep:]) | {pointer['version']} | set(pointer['history'])
+        for name in names:
+            if name not in protected:
+                shutil.rmtree(os.path.join(self.versions_path, name), ignore_errors=True)
+
+    def load(self, version=None):
+        version = version or self.current()
+        if version is None:
+            raise FileNotFoundError(f"No model has been promoted in {self.path}")
+        return ModelBundle(os.path.join(self.versions_path, version))
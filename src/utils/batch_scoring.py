@@ -0,0 +1,134 @@
+"""
+    Batch scoring of reading files of many nodes with the deployed model.
+
+    The input (a CSV file or stdin) needs data, temperatura and humidade
+    columns; any other column (node id, port, ...) is passed through to the
+    output as read, next to the predicted rega_necessaria_min (an input
+    rega_necessaria_min column is replaced). It is read in chunks of
+    chunk_rows rows and every chunk is scored in a worker process:
+    timestamps parsed, the feature matrix built with NumPy and the folded
+    model applied in batches of COMPILED_MAX_ROWS rows, then formatted as
+    CSV text. The workers load the current artifact store bundle, whose
+    tables are read-only memory maps, so they share one copy of the model
+    in the OS page cache (with the legacy pickles, every worker holds its
+    own copy). Chunks are written in input order.
+
+    At most 2 x workers chunks are in flight, so memory stays bounded by
+    the chunk size whatever the input size. With one worker, chunks are
+    scored in the calling process. Models with window features are not
+    supported: their readings need to be one series in time order (use
+    `main.py predict` per node).
+
+    Functions:
+        score_csv(source, output, model_path, store_path=None, chunk_rows=100_000, workers=-1, compiled_max_rows=2048):
+            Writes the predictions of source ('-' for stdin) to output ('-'
+            for stdout; files are written to a temporary name and renamed)
+            Returns: dict with rows, seconds, rows_per_s and workers
+        score_chunk(chunk):
+            Returns: CSV text of one chunk with the loaded model
+
+    Usage:
+        stats = score_csv("snapshot.csv", "predictions.csv", "models/", store_path="models/store/")
+"""
+
+import os
+import sys
+import time
+from collections import defaultdict, deque
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+from utils.inference_service import InferenceModel
+
+READING_COLUMNS = ('data', 'temperatura', 'humidade')
+OUTPUT_COLUMN = 'rega_necessaria_min'
+
+# Model of this process (worker initializer or score_csv)
+_model = None
+
+
+def _load_model(model_path, store_path, compiled_max_rows):
+    global _model
+    _model = InferenceModel(model_path, compiled_max_rows=compiled_max_rows, store_path=store_path)
+    return _model
+
+
+def _read_chunks(source, chunk_rows):
+    # Readings as float32, every other column kept as text
+    dtype = defaultdict(lambda: str, temperatura='float32', humidade='float32')
+    return pd.read_csv(sys.stdin if source == '-' else source, chunksize=chunk_rows, dtype=dtype)
+
+
+def output_columns(columns):
+    return [c for c in columns if c not in READING_COLUMNS[1:] and c != OUTPUT_COLUMN] + [OUTPUT_COLUMN]
+
+
+def score_chunk(chunk):
+    timestamps = pd.to_datetime(chunk['data']).to_numpy()
+    temperatura = chunk['temperatura'].to_numpy(dtype=np.float32)
+    humidade = chunk['humidade'].to_numpy(dtype=np.float32)
+    # Batches the compiled tables are scored in, never the unpickled estimator
+    step = _model.compiled_max_rows
+    predictions = np.concatenate([
+        _model.predict(timestamps[i:i + step], temperatura[i:i + step], humidade[i:i + step])
+        for i in range(0, len(chunk), step)
+    ]) if len(chunk) else np.empty(0)
+    out = chunk.drop(columns=[c for c in chunk.columns if c not in output_columns(chunk.columns)])
+    out[OUTPUT_COLUMN] = predictions
+    return out.to_csv(index=False, header=False, float_format='%.2f')
+
+
+def score_csv(source, output, model_path, store_path=None, chunk_rows=100_000, workers=-1, compiled_max_rows=2048):
+    model = _load_model(model_path, store_path, compiled_max_rows)
+    if model.pipeline.windowed:
+        raise ValueError("Batch scoring does not support models with window features; "
+                         "score each node's readings in time order with `main.py predict --input`")
+    if workers == -1:
+        workers = os.cpu_count() or 1
+    workers = max(1, workers)
+
+    start = time.perf_counter()
+    rows = 0
+    reader = _read_chunks(source, chunk_rows)
+    tmp_path = None if output == '-' else output + ".tmp"
+    f = sys.stdout if output == '-' else open(tmp_path, "w", newline='')
+    executor = None
+    try:
+        header = None
+        if workers > 1:
+            executor = ProcessPoolExecutor(workers, initializer=_load_model,
+                                           initargs=(model_path, store_path, compiled_max_rows))
+        pending = deque()
+        for chunk in reader:
+            if header is None:
+                missing = [c for c in READING_COLUMNS if c not in chunk.columns]
+                if missing:
+                    raise ValueError(f"Input is missing the columns {missing}")
+                header = output_columns(chunk.columns)
+                f.write(",".join(header) + "\n")
+            rows += len(chunk)
+            if executor is None:
+                f.write(score_chunk(chunk))
+                continue
+            pending.append(executor.submit(score_chunk, chunk))
+            # Bounded memory: wait for the oldest chunk before reading more
+            if len(pending) >= 2 * workers:
+                f.write(pending.popleft().result())
+        while pending:
+            f.write(pending.popleft().result())
+        if header is None:
+            f.write(",".join(READING_COLUMNS[:1] + (OUTPUT_COLUMN,)) + "\n")
+    except BaseException:
+        if tmp_path is not None:
+            f.close()
+            os.remove(tmp_path)
+        raise
+    finally:
+        if executor is not None:
+            executor.shutdown(cancel_futures=True)
+        if f is not sys.stdout:
+            f.close()
+    if tmp_path is not None:
+        os.replace(tmp_path, output)
+    elapsed = time.perf_counter() - start
+    return {'rows': rows, 'seconds': elapsed, 'rows_per_s': rows / elapsed if elapsed else 0.0, 'workers': workers}
@@ -6,30 +6,190 @@
         TEST_SIZE (float): Proportion of data used for testing (0.2)
         MODEL_PATH (str): Directory for saving trained models
         DATA_PATH (str): Directory for input data files
+        CV_FOLDS (int): Number of cross-validation folds (5)
+        N_JOBS (int): Worker count for parallel training, -1 uses all cores
+        PARALLEL_BACKEND (str): joblib backend, 'loky' (processes) or 'threading'
+        CHUNK_SIZE (int): Rows per chunk when streaming the CSV files
+        FEATURE_CACHE (bool): Reuse preprocessed features of unchanged CSV files
+        CACHE_PATH (str): Directory of the preprocessed feature cache
+        SERVE_HOST / SERVE_PORT: Address of the inference service (src/serve.py)
+        BATCH_WINDOW_MS (float): Time window for merging concurrent requests
+        MAX_BATCH_SIZE (int): Maximum rows scored in one model call
+        COMPILED_MAX_ROWS (int): Largest batch scored with the compiled NumPy
+                                 tree predictor (0 disables it)
+        SCORE_CHUNK_ROWS (int): Rows read and scored at a time by `main.py score`
+        SCORE_WORKERS (int): Worker processes of `main.py score` (-1 = all cores)
+        ARDUINO_TREE_BACKEND (str): 'm2cgen' (nested if/else .cpp) or 'progmem'
+                                    (compact PROGMEM node tables .h) for trees
+        ARDUINO_QUANTIZE_THRESHOLDS (bool): int16 threshold ranks in 'progmem'
+        ARDUINO_LINEAR_MODE (str): 'float' (variadic dot product) or 'fixed'
+                                   (int16 weights/inputs, int32 accumulator)
+        ARDUINO_WEIGHT_FRAC_BITS (int): Fractional bits of the fixed-point weights
+        ARDUINO_INPUT_FRAC_BITS (int): Fractional bits of the fixed-point inputs
+        RELABEL (bool): Recompute rega_necessaria_min with the irrigation rules
+                        while loading instead of using the logged labels
+        HUMIDADE_LIMITE (float): No irrigation at or above this humidity
+        IRRIGATION_RULES (str): Optional JSON file with the rule tables
+                                (see utils/irrigation_rules.py)
+        TUNING_PATH (str): Directory of the persisted hyperparameter search
+        TUNING_SPACES (dict): Parameter grid searched per model (--tune)
+        TUNING_CANDIDATES (int): Candidates sampled per model when the grid
+                                 is larger
+        TUNING_MAX_MODEL_SIZE (int): Largest trees x depth accepted by the
+                                     search (None: no limit)
+        ARTIFACT_STORE_PATH (str): Directory of the versioned model bundles
+        ARTIFACT_KEEP_VERSIONS (int): Bundles kept besides the current one and
+                                      its rollback history
+        ARTIFACT_AUTO_PROMOTE (bool): Make every newly trained bundle current
+        PLOTS (bool): Render the evaluation figures (off for headless retrains)
+        PLOT_WORKERS (int): Background processes rendering figures (0: inline)
+        PLOT_MAX_POINTS (int): Scatter points per model before sampling
+        PLOT_DENSE_MODE (str): Above PLOT_MAX_POINTS, 'sample' the scatter
+                               plot or draw a 'hexbin' density per model
+        BOOTSTRAP_SAMPLES (int): Bootstrap replicates for confidence intervals
+                                 of the test metrics (0 disables them)
+        BOOTSTRAP_ALPHA (float): 1 - confidence level of the intervals
+        INCREMENTAL_PATH (str): Directory of the incremental training state
+        INCREMENTAL_MIN_ROWS (int): New rows needed before an update runs
+        INCREMENTAL_RF_TREES (int): Trees added to the random forest per update
+        INCREMENTAL_FULL_EVERY (int): Updates between scheduled full retrains
+        INCREMENTAL_DRIFT_THRESHOLD (float): Full retrain when the best model's
+                                             RMSE on new rows exceeds this
+                                             multiple of its test RMSE
+        OUT_OF_CORE (bool): Stream the training data instead of loading it
+                            (utils/out_of_core.py, also `train --out-of-core`)
+        MEMORY_BUDGET_MB (int): Peak memory the out-of-core training sizes
+                                its samples and batches for
+        WINDOW_MINUTES (int): Length of the rolling window features added to
+                              every reading (utils/window_features.py);
+                              0 disables them
+        DOWNSAMPLE_SECONDS (int): Keep the first reading of every time bucket
+                                  of this length, per file (0 disables it)
+        DOWNSAMPLE_TOLERANCE (float): Keep a reading only when temperatura or
+                                      humidade moves to another band of this
+                                      width or the target changes (0 drops
+                                      exact repeats, None disables it);
+                                      utils/downsampling.py
+        INSTRUMENT (bool): Time every pipeline stage and log it as JSON lines
+        INSTRUMENT_MEMORY (bool): Also trace the peak Python allocations of
+                                  each stage (tracemalloc, slower)
+        METRICS_FILE (str): Stage metrics file written at the end of a run,
+                            Prometheus text (.prom) or JSON (.json); None: off
+        PROFILE_STAGES (list): Stages run under the profiler ('all': every stage)
+        PROFILER (str): 'cprofile' (.prof files) or 'pyinstrument' (.html)
+        PROFILE_PATH (str): Directory of the stage profiles
+        MODELS (dict): Estimator factories per model name; nothing is imported
+                       or instantiated until build_models() is called
+        MODELS_NAMES (dict): Class name of each model in the exported code
+
+    Methods:
+        build_models(names=None):
+            Returns: {model name: new unfitted estimator}
+
+    Functions:
+        estimator(module, class_name, **params):
+            Returns: Factory creating the estimator on demand
 """
-from sklearn.ensemble import RandomForestRegressor
-from sklearn.tree import DecisionTreeRegressor
-from sklearn.linear_model import LinearRegression
-from sklearn.svm import SVR
-from xgboost import XGBRegressor
+import importlib
+
+
+def estimator(module, class_name, **params):
+    """
+    Factory of an unfitted estimator. The estimator's library is imported
+    when the factory is called, not when the configuration is loaded.
+    """
+    def factory():
+        return getattr(importlib.import_module(module), class_name)(**params)
+    factory.class_name = class_name
+    return factory
+
 
 class Config:
     RANDOM_STATE = 42
     TEST_SIZE = 0.2
     MODEL_PATH = '/models/'
     DATA_PATH = '/data/'
+    CV_FOLDS = 5
+    N_JOBS = -1
+    PARALLEL_BACKEND = 'loky'
+    CHUNK_SIZE = 100_000
+    FEATURE_CACHE = True
+    CACHE_PATH = '/data/.cache/'
+    SERVE_HOST = '127.0.0.1'
+    SERVE_PORT = 8765
+    BATCH_WINDOW_MS = 2.0
+    MAX_BATCH_SIZE = 1024
+    COMPILED_MAX_ROWS = 2048
+    SCORE_CHUNK_ROWS = 100_000
+    SCORE_WORKERS = -1
+    ARDUINO_TREE_BACKEND = 'm2cgen'
+    ARDUINO_QUANTIZE_THRESHOLDS = False
+    ARDUINO_LINEAR_MODE = 'float'
+    ARDUINO_WEIGHT_FRAC_BITS = 10
+    ARDUINO_INPUT_FRAC_BITS = 8
+    RELABEL = False
+    HUMIDADE_LIMITE = 40
+    IRRIGATION_RULES = None
+    TUNING_PATH = '/models/tuning/'
+    TUNING_CANDIDATES = 27
+    TUNING_MAX_MODEL_SIZE = None
+    TUNING_SPACES = {
+        'random_forest': {
+            'n_estimators': [10, 25, 50, 100],
+            'max_depth': [4, 6, 8, None],
+            'min_samples_leaf': [1, 3, 5]
+        },
+        'xgboost': {
+            'n_estimators': [10, 25, 50, 100],
+            'max_depth': [2, 3, 4, 6],
+            'learning_rate': [0.05, 0.1, 0.3]
+        },
+        'decision_tree': {
+            'max_depth': [3, 5, 8, None],
+            'min_samples_leaf': [1, 3, 5],
+            'max_leaf_nodes': [10, 20, 50, None]
+        }
+    }
+    ARTIFACT_STORE_PATH = '/models/store/'
+    ARTIFACT_KEEP_VERSIONS = 10
+    ARTIFACT_AUTO_PROMOTE = True
+    PLOTS = True
+    PLOT_WORKERS = 1
+    PLOT_MAX_POINTS = 5000
+    PLOT_DENSE_MODE = 'sample'
+    BOOTSTRAP_SAMPLES = 0
+    BOOTSTRAP_ALPHA = 0.05
+    INCREMENTAL_PATH = '/models/incremental/'
+    INCREMENTAL_MIN_ROWS = 100
+    INCREMENTAL_RF_TREES = 10
+    INCREMENTAL_FULL_EVERY = 10
+    INCREMENTAL_DRIFT_THRESHOLD = 1.5
+    WINDOW_MINUTES = 0
+    DOWNSAMPLE_SECONDS = 0
+    DOWNSAMPLE_TOLERANCE = None
+    OUT_OF_CORE = False
+    MEMORY_BUDGET_MB = 2048
+    INSTRUMENT = False
+    INSTRUMENT_MEMORY = False
+    METRICS_FILE = None
+    PROFILE_STAGES = []
+    PROFILER = 'cprofile'
+    PROFILE_PATH = '/models/profiles/'
     MODELS = {
-        'linear_regression': LinearRegression(),
-        'random_forest': RandomForestRegressor(
+        'linear_regression': estimator('sklearn.linear_model', 'LinearRegression'),
+        'random_forest': estimator(
+            'sklearn.ensemble', 'RandomForestRegressor',
             n_estimators=100,
             random_state=RANDOM_STATE
         ),
-        'xgboost': XGBRegressor(
+        'xgboost': estimator(
+            'xgboost', 'XGBRegressor',
             n_estimators=10,
             max_depth=3,
             learning_rate=0.1
         ),
-        'decision_tree': DecisionTreeRegressor(
+        'decision_tree': estimator(
+            'sklearn.tree', 'DecisionTreeRegressor',
             max_depth=3,
             min_samples_leaf=3,
             max_leaf_nodes=10,
@@ -41,4 +201,7 @@ class Config:
         'xgboost': 'XGBRegressor',
         'decision_tree': 'DecisionTreeRegressor',
         'linear_regression': 'LinearRegression'
-    }
\ No newline at end of file
+    }
+
+    def build_models(self, names=None):
+        return {name: factory() for name, factory in self.MODELS.items() if names is None or name in names}
@@ -0,0 +1,191 @@
+"""
+    Streaming ingestion of the Arduino logger CSV files.
+
+    The dados_*.csv files are read in chunks with compact dtypes and every
+    chunk goes through DataPreprocessor.preprocess on its own, so the full
+    concatenated raw frame is never materialized.
+
+    Attributes:
+        CSV_DTYPES (dict): Column dtypes used when reading the logger files
+        preprocessor: DataPreprocessor used on every chunk
+        data_path (str): Directory holding the CSV files
+        pattern (str): Glob pattern of the files to read ('dados_*.csv')
+        chunksize (int): Rows per chunk
+        cache: Optional FeatureCache; files whose cached feature matrix is
+               up to date are not parsed again
+        rules: Optional IrrigationRules; rega_necessaria_min is recomputed
+               from temperatura/humidade instead of read from the files
+               (include rules.to_dict() in the cache params)
+        windows: Optional WindowFeatures; its rolling features are added to
+                 every chunk, continuing across the chunks of a file and
+                 restarting with every file (include windows.minutes in the
+                 cache params)
+        downsampler: Optional Downsampler; drops repeated / within-tolerance
+                     readings of every file (one node), after the window
+                     features so these still see every reading (include
+                     downsampler.to_dict() in the cache params); its
+                     rows_in / rows_out count the last pass over the files
+
+    Methods:
+        files():
+            Returns: Sorted list of matching CSV files
+
+        iter_chunks():
+            Yields: Preprocessed DataFrame per chunk
+
+        iter_arrays(timestamps=False, cached=True):
+            Yields: (X float32 array, y array) per chunk, ordered like
+            DataPreprocessor.prepare_features. With a cache, one pair per
+            file is yielded and only new or modified files are processed;
+            cached=False bypasses it, so no more than chunksize rows are
+            held at once. With timestamps, (X, y, datetime64[ns] timestamps)
+
+        iter_file_arrays(timestamps=False):
+            Yields: (path, X, y) with the full feature matrix of every file,
+            through the cache when enabled; with timestamps, (path, X, y, t)
+
+        load_arrays():
+            Returns: (X, y) NumPy arrays holding every chunk
+
+        partial_fit(estimator):
+            Feeds every chunk to an incremental learner (estimator.partial_fit)
+            Returns: The fitted estimator
+
+    Usage:
+        loader = StreamingCSVLoader(preprocessor, data_path)
+        X, y = loader.load_arrays()
+"""
+
+import glob
+import os
+import numpy as np
+import pandas as pd
+from utils import instrumentation
+
+CSV_DTYPES = {
+    'temperatura': 'float32',
+    'humidade': 'float32',
+    'rega_necessaria_min': 'int16'
+}
+
+
+class StreamingCSVLoader:
+    def __init__(self, preprocessor, data_path, pattern='dados_*.csv', chunksize=100_000, cache=None, rules=None, windows=None,
+                 downsampler=None):
+        self.preprocessor = preprocessor
+        self.data_path = data_path
+        self.pattern = pattern
+        self.chunksize = chunksize
+        self.cache = cache
+        self.rules = rules
+        self.windows = windows
+        self.downsampler = downsampler
+        self.n_rows = 0
+
+    def files(self):
+        return sorted(glob.glob(os.path.join(self.data_path, self.pattern)))
+
+    def read_file(self, path):
+        # Raw chunks of a single file, dates parsed while reading
+        return pd.read_csv(
+            path,
+            chunksize=self.chunksize,
+            dtype=CSV_DTYPES,
+            parse_dates=['data']
+        )
+
+    def _start_pass(self):
+        # Row counts and the downsampling report cover one pass over the files
+        self.n_rows = 0
+        if self.downsampler is not None:
+            self.downsampler.reset_counts()
+
+    def iter_chunks(self):
+        self._start_pass()
+        for path in self.files():
+            yield from self._iter_file_chunks(path)
+
+    def _iter_file_chunks(self, path):
+        reader = iter(self.read_file(path))
+        if self.windows is not None:
+            # Every file is its own series
+            self.windows.reset()
+        if self.downsampler is not None:
+            self.downsampler.reset()
+        while True:
+            # Parsing and preprocessing are timed separately (per chunk, summary only)
+            with instrumentation.stage('read_csv', log=False):
+                chunk = next(reader, None)
+            if chunk is None:
+                break
+            with instrumentation.stage('preprocess', log=False):
+                if self.rules is not None:
+                    # Bulk relabeling with the current irrigation rules
+                    chunk = chunk.assign(rega_necessaria_min=self.rules.label(
+                        chunk['temperatura'].to_numpy(), chunk['humidade'].to_numpy()))
+                df = self.preprocessor.preprocess(chunk)
+                if self.windows is not None:
+                    features = self.windows.transform(df['timestamp'], df['temperatura'], df['humidade'])
+                    df = df.assign(**dict(zip(self.windows.names, features.T)))
+                if self.downsampler is not None:
+                    keep = self.downsampler.mask(df['timestamp'], df['temperatura'], df['humidade'],
+                                                 df['rega_necessaria_min'])
+                    if not keep.all():
+                        df = df[keep]
+            self.n_rows += len(df)
+            yield df
+
+    def _iter_file_arrays(self, path):
+        for df in self._iter_file_chunks(path):
+            X, y = self.preprocessor.prepare_features(df)
+            yield X.to_numpy(dtype=np.float32), y.to_numpy(), df['timestamp'].to_numpy().astype('datetime64[ns]')
+
+    def iter_file_arrays(self, timestamps=False):
+        """Yields: (path, X, y) with the full feature matrix of every file."""
+        self._start_pass()
+        files = self.files()
+        for path in files:
+            with instrumentation.stage('feature_cache', log=False):
+                cached = self.cache.load(path, timestamps) if self.cache is not None else None
+            if cached is not None:
+                X, y, self.preprocessor.feature_columns = cached[:3]
+                t = cached[3] if timestamps else None
+                self.n_rows += len(y)
+            else:
+                # Taken before reading: rows appended meanwhile make the entry stale
+                source = self.cache.snapshot(path) if self.cache is not None else None
+                parts = list(self._iter_file_arrays(path))
+                if not parts:
+                    continue
+                X, y, t = (np.concatenate([p[i] for p in parts]) for i in range(3))
+                if self.cache is not None:
+                    # Timestamps are always stored, so load(path, timestamps=True) reuses the entry
+                    self.cache.store(path, X, y, self.preprocessor.feature_columns, timestamps=t, source=source)
+            yield (path, X, y, t) if timestamps else (path, X, y)
+        if self.cache is not None:
+            self.cache.prune(files)
+
+    def iter_arrays(self, timestamps=False, cached=True):
+        if self.cache is None or not cached:
+            self._start_pass()
+            for path in self.files():
+                for X, y, t in self._iter_file_arrays(path):
+                    yield (X, y, t) if timestamps else (X, y)
+            return
+
+        for _, *arrays in self.iter_file_arrays(timestamps):
+            yield tuple(arrays)
+
+    def load_arrays(self):
+        X_parts, y_parts = [], []
+        for X, y in self.iter_arrays():
+            X_parts.append(X)
+            y_parts.append(y)
+        if not X_parts:
+            raise FileNotFoundError(f"No files matching {self.pattern} in {self.data_path}")
+        return np.concatenate(X_parts), np.concatenate(y_parts)
+
+    def partial_fit(self, estimator):
+        for X, y in self.iter_arrays():
+            estimator.partial_fit(X, y)
+        return estimator
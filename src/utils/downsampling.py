@@ -0,0 +1,111 @@
+"""
+    Deduplication and downsampling of high-frequency sensor readings.
+
+    The logger files can hold a reading every 2 seconds that mostly repeats
+    the previous one (e.g. 24.3,64.5 for minutes). A reading is kept when
+    its key differs from the key of the previous reading of the same node
+    (collector file / port):
+        - bucket_seconds: the time bucket, floor(timestamp / bucket_seconds);
+          keeps the first reading of every bucket
+        - tolerance: temperatura and humidade rounded to multiples of
+          tolerance, and the target when given; keeps a reading that moves
+          to another band or changes the target. tolerance=0 compares the
+          exact values (only repeats are dropped)
+    With both, a reading is kept when either changes, so the bucket acts
+    as a heartbeat for slow-moving values. The first reading of a node and
+    readings without a timestamp are always kept; a NaN value equals NaN.
+
+    mask() marks a whole batch with a handful of array operations and
+    carries the last key over to the next batch, so a history processed
+    chunk by chunk, a live feed processed batch by batch and keep() on one
+    reading at a time drop exactly the same readings.
+
+    Attributes:
+        bucket_seconds (int): Time bucket length, 0 without buckets
+        tolerance (float): Band width of the readings, None without
+        rows_in / rows_out (int): Readings seen and kept since creation or
+                                  the last reset_counts()
+
+    Methods:
+        mask(timestamps, temperatura, humidade, target=None):
+            Returns: bool array, True for the readings to keep
+        keep(timestamp, temperatura, humidade, target=None):
+            Returns: True when one reading is kept
+        reset(): Starts a new node (the next reading is kept)
+        reset_counts(): Zeroes rows_in / rows_out
+        reduction(): Share of the readings dropped
+
+    Usage:
+        downsampler = Downsampler(bucket_seconds=60, tolerance=0.2)
+        df = df[downsampler.mask(df['data'], df['temperatura'], df['humidade'], df['rega_necessaria_min'])]
+"""
+
+import numpy as np
+
+
+class Downsampler:
+    def __init__(self, bucket_seconds=0, tolerance=None):
+        if bucket_seconds < 0:
+            raise ValueError(f"bucket_seconds must be >= 0, got {bucket_seconds}")
+        if tolerance is not None and tolerance < 0:
+            raise ValueError(f"tolerance must be >= 0 or None, got {tolerance}")
+        self.bucket_seconds = int(bucket_seconds)
+        self.tolerance = tolerance
+        self.reset_counts()
+        self.reset()
+
+    @property
+    def enabled(self):
+        return self.bucket_seconds > 0 or self.tolerance is not None
+
+    def to_dict(self):
+        return {'bucket_seconds': self.bucket_seconds, 'tolerance': self.tolerance}
+
+    def reset(self):
+        self._last = None
+
+    def reset_counts(self):
+        self.rows_in = 0
+        self.rows_out = 0
+
+    def reduction(self):
+        return 1 - self.rows_out / self.rows_in if self.rows_in else 0.0
+
+    def _keys(self, timestamps, temperatura, humidade, target):
+        ts = np.asarray(timestamps)
+        if ts.dtype.kind != 'M':
+            ts = ts.astype('datetime64[ns]')
+        nat = np.isnat(ts)
+        columns = []
+        if self.bucket_seconds:
+            ns = ts.astype('datetime64[ns]').astype(np.int64)
+            columns.append((ns // (self.bucket_seconds * 1_000_000_000)).astype(np.float64))
+        if self.tolerance is not None:
+            for values in (temperatura, humidade):
+                values = np.asarray(values, dtype=np.float64)
+                columns.append(np.rint(values / self.tolerance) if self.tolerance else values)
+            if target is not None:
+                columns.append(np.asarray(target, dtype=np.float64))
+        return np.column_stack(columns), nat
+
+    def mask(self, timestamps, temperatura, humidade, target=None):
+        n = len(temperatura)
+        keep = np.ones(n, dtype=bool)
+        if self.enabled and n:
+            keys, nat = self._keys(timestamps, temperatura, humidade, target)
+            rows = np.flatnonzero(~nat)
+            keys = keys[rows]
+            if len(rows):
+                previous = np.vstack([keys[:1] if self._last is None else self._last, keys[:-1]])
+                changed = ((keys != previous) & ~(np.isnan(keys) & np.isnan(previous))).any(axis=1)
+                if self._last is None:
+                    changed[0] = True
+                keep[rows] = changed
+                self._last = keys[-1:].copy()
+        self.rows_in += n
+        self.rows_out += int(keep.sum())
+        return keep
+
+    def keep(self, timestamp, temperatura, humidade, target=None):
+        # The batch path on one reading, so both always agree
+        return bool(self.mask([timestamp], [temperatura], [humidade], None if target is None else [target])[0])
@@ -0,0 +1,170 @@
+"""
+    On-disk cache of preprocessed feature matrices, one entry per source CSV.
+
+    Every entry is stored in a columnar binary file (Feather when pyarrow is
+    installed, otherwise a NumPy .npz with one array per column), optionally
+    with the reading timestamps (int64 nanoseconds), and recorded
+    in manifest.json under the absolute path of the source file together with
+    its size, mtime and SHA-1 content hash. An entry is reused when size and
+    mtime are unchanged, or when the file was only touched and its content
+    hash still matches; new or modified files are rebuilt.
+
+    Attributes:
+        cache_path (str): Directory holding the manifest and cached matrices
+        params (dict): Extra key material (e.g. preprocessing settings); a
+                       change invalidates every entry
+        format (str): 'feather' or 'npz'
+        hits / misses (int): Lookup counters
+
+    Methods:
+        load(path, timestamps=False):
+            Returns: (X, y, feature_columns) for an up-to-date entry, or None;
+            with timestamps, (X, y, feature_columns, timestamps), and None
+            when the entry was stored without them
+
+        snapshot(path):
+            Returns: (size, mtime_ns, sha1) of a source file; take it before
+            reading the file, so rows appended while it is processed
+            invalidate the entry instead of going missing from it
+
+        store(path, X, y, feature_columns, timestamps=None, source=None):
+            Writes the feature matrix of a source file and updates the
+            manifest with source, the snapshot taken before reading it
+
+        prune(paths):
+            Drops entries whose source file is not in paths
+
+    Usage:
+        cache = FeatureCache("data/.cache/")
+        cached = cache.load("data/dados_arduino_reais.csv")
+"""
+
+import hashlib
+import json
+import os
+import numpy as np
+import pandas as pd
+
+try:
+    import pyarrow  # noqa: F401
+    HAS_PYARROW = True
+except ImportError:
+    HAS_PYARROW = False
+
+TARGET_COLUMN = "rega_necessaria_min"
+TIMESTAMP_COLUMN = "timestamp"
+
+
+def file_sha1(path, block_size=1 << 20):
+    digest = hashlib.sha1()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class FeatureCache:
+    def __init__(self, cache_path, params=None, format=None):
+        self.cache_path = cache_path
+        # Normalized through JSON so it compares equal to the stored copy
+        self.params = json.loads(json.dumps(params or {}))
+        self.format = format or ("feather" if HAS_PYARROW else "npz")
+        self.manifest_path = os.path.join(cache_path, "manifest.json")
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(cache_path, exist_ok=True)
+        self.manifest = self._read_manifest()
+
+    def _read_manifest(self):
+        if not os.path.exists(self.manifest_path):
+            return {}
+        with open(self.manifest_path) as f:
+            return json.load(f)
+
+    def _write_manifest(self):
+        tmp_path = self.manifest_path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(self.manifest, f, indent=2)
+        os.replace(tmp_path, self.manifest_path)
+
+    def _entry_file(self, key):
+        name = hashlib.sha1(key.encode()).hexdigest()[:16]
+        return os.path.join(self.cache_path, f"{name}.{self.format}")
+
+    def _is_current(self, key, entry, stat):
+        if entry.get("params") != self.params or entry.get("format") != self.format:
+            return False
+        if not os.path.exists(entry["file"]) or entry["size"] != stat.st_size:
+            return False
+        if entry["mtime_ns"] == stat.st_mtime_ns:
+            return True
+        # Touched but maybe not modified: fall back to the content hash
+        if entry["sha1"] == file_sha1(key):
+            entry["mtime_ns"] = stat.st_mtime_ns
+            self._write_manifest()
+            return True
+        return False
+
+    def load(self, path, timestamps=False):
+        key = os.path.abspath(path)
+        entry = self.manifest.get(key)
+        if entry is None or (timestamps and not entry.get("timestamps")) or not self._is_current(key, entry, os.stat(key)):
+            self.misses += 1
+            return None
+        self.hits += 1
+
+        columns = entry["columns"]
+        if self.format == "feather":
+            table = pd.read_feather(entry["file"])
+            X = table[columns].to_numpy(dtype=np.float32)
+            y = table[TARGET_COLUMN].to_numpy()
+            t = table[TIMESTAMP_COLUMN].to_numpy() if timestamps else None
+        else:
+            with np.load(entry["file"]) as arrays:
+                X = np.column_stack([arrays[c] for c in columns]).astype(np.float32, copy=False)
+                y = arrays[TARGET_COLUMN]
+                t = arrays[TIMESTAMP_COLUMN] if timestamps else None
+        if timestamps:
+            return X, y, columns, t.view('datetime64[ns]')
+        return X, y, columns
+
+    def snapshot(self, path):
+        stat = os.stat(path)
+        return stat.st_size, stat.st_mtime_ns, file_sha1(path)
+
+    def store(self, path, X, y, feature_columns, timestamps=None, source=None):
+        key = os.path.abspath(path)
+        size, mtime_ns, sha1 = source if source is not None else self.snapshot(key)
+        entry_file = self._entry_file(key)
+        tmp_file = entry_file + ".tmp"
+
+        columns = {c: np.ascontiguousarray(X[:, i]) for i, c in enumerate(feature_columns)}
+        columns[TARGET_COLUMN] = np.asarray(y)
+        if timestamps is not None:
+            columns[TIMESTAMP_COLUMN] = np.asarray(timestamps, dtype='datetime64[ns]').view(np.int64)
+        if self.format == "feather":
+            pd.DataFrame(columns).to_feather(tmp_file)
+        else:
+            with open(tmp_file, "wb") as f:
+                np.savez(f, **columns)
+        os.replace(tmp_file, entry_file)
+
+        self.manifest[key] = {
+            "size": size,
+            "mtime_ns": mtime_ns,
+            "sha1": sha1,
+            "params": self.params,
+            "format": self.format,
+            "columns": list(feature_columns),
+            "timestamps": timestamps is not None,
+            "file": entry_file
+        }
+        self._write_manifest()
+
+    def prune(self, paths):
+        keep = {os.path.abspath(p) for p in paths}
+        for key in [k for k in self.manifest if k not in keep]:
+            entry = self.manifest.pop(key)
+            if os.path.exists(entry["file"]):
+                os.remove(entry["file"])
+        self._write_manifest()
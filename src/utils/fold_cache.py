@@ -0,0 +1,64 @@
+"""
+    Cross-validation folds computed and materialized once for every model.
+
+    The split indices (by default KFold, the folds cross_val_score(cv=5)
+    uses for regressors) are computed once, and the training and validation
+    rows of every fold are copied once into contiguous float32 arrays that
+    all models share. With the 'loky' backend joblib memory-maps these arrays
+    into the workers instead of pickling a copy per task.
+
+    Attributes:
+        X (np.ndarray): Contiguous float32 copy of the training features
+        y (np.ndarray): Training target
+        splits (list): (train_idx, val_idx) of every fold
+        build_time (float): Seconds spent materializing the folds
+
+    Methods:
+        fold(i):
+            Returns: (X_fit, y_fit, X_val, y_val) contiguous arrays of fold i
+
+        matches(X, y):
+            Returns: True if the cache was built from these X and y objects
+
+        assemble(predictions):
+            Returns: Out-of-fold predictions (one per row) from the
+            per-fold validation predictions
+
+    Usage:
+        folds = FoldCache(X_train, y_train, n_splits=5)
+        X_fit, y_fit, X_val, y_val = folds.fold(0)
+"""
+
+import time
+import numpy as np
+from sklearn.model_selection import KFold
+
+
+class FoldCache:
+    def __init__(self, X, y, n_splits=5, splits=None):
+        start = time.perf_counter()
+        self._source = (X, y)
+        self.X = np.ascontiguousarray(X, dtype=np.float32)
+        self.y = np.ascontiguousarray(y)
+        self.splits = list(splits) if splits is not None else list(KFold(n_splits=n_splits).split(self.X))
+        self._folds = [
+            (self.X[train_idx], self.y[train_idx], self.X[val_idx], self.y[val_idx])
+            for train_idx, val_idx in self.splits
+        ]
+        self.build_time = time.perf_counter() - start
+
+    def __len__(self):
+        return len(self.splits)
+
+    def fold(self, i):
+        return self._folds[i]
+
+    def matches(self, X, y):
+        return self._source[0] is X and self._source[1] is y
+
+    def assemble(self, predictions):
+        """predictions: list of validation predictions, one array per fold"""
+        oof = np.empty(len(self.y), dtype=np.float64)
+        for (_, val_idx), fold_predictions in zip(self.splits, predictions):
+            oof[val_idx] = fold_predictions
+        return oof
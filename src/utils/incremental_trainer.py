@@ -0,0 +1,282 @@
+"""
+    Incremental retraining as new sensor rows arrive.
+
+    A watermark in state.json records how many rows of every dados_*.csv
+    file have already been used for training, with a SHA-1 digest of those
+    rows (features and target). Each run only consumes the
+    rows past the watermark and updates the saved models in place:
+        xgboost            keeps boosting from the saved booster
+        random_forest      adds INCREMENTAL_RF_TREES trees fitted on the new rows
+                           (warm_start)
+        linear_regression  is solved again from running sufficient statistics
+                           (means and centered cross products of all rows seen)
+        decision_tree      only changes on a full retrain
+
+    New rows are first scored with the current models (prequential
+    validation). A full retrain on the whole history replaces the update
+    when no state exists, when a file shrank, disappeared or its used rows
+    changed (rewritten, relabeled, other preprocessing settings), every
+    INCREMENTAL_FULL_EVERY updates, or when the RMSE of the best model on the
+    new rows exceeds INCREMENTAL_DRIFT_THRESHOLD times its last test RMSE.
+
+    The test split is the one of the last full retrain: the state keeps how
+    many rows of every file it was drawn from (split_rows), and updates only
+    learn from rows past the watermark, so its test rows stay unseen. After
+    an update every model is scored on it again and the best one is picked
+    from these scores.
+
+    Attributes:
+        config: Config instance
+        trainer: ModelTrainer used for full retrains
+        state_path (str): Directory holding state.json, linear_stats.npz and
+                          one pickle per model
+        state (dict): Watermark, update counter and baseline metrics
+        models (dict): Current models, in Config.MODELS order
+
+    Methods:
+        run(loader):
+            Full retrain or incremental update, whichever is due
+            Returns: Dictionary with 'mode' ('full', 'incremental' or 'none'),
+            'reason', 'rows', 'results' (test metrics per model), the
+            'X_test'/'y_test' rows the metrics come from, 'split_rows' and,
+            after a full retrain, the 'X_train'/'y_train' split; after an
+            update, 'prequential' holds the RMSE of the models before it on
+            the new rows
+
+        full_retrain(files, reason):
+            Trains every model from scratch and resets the state
+
+        update(new_X, new_y, watermark, digests, X_test, y_test):
+            Applies one incremental update with the rows past the watermark
+            and scores the updated models on the test split
+
+    Functions:
+        prefix_digest(X, y, rows):
+            Returns: SHA-1 of the first rows of a file, as stored with the watermark
+        linear_stats(X, y) / merge_linear_stats(a, b) / solve_linear_stats(stats, model):
+            Sufficient statistics of least squares, combined pairwise
+
+    Usage:
+        incremental = IncrementalTrainer(config, ModelTrainer(config), "models/incremental/")
+        outcome = incremental.run(StreamingCSVLoader(preprocessor, data_path, cache=cache))
+"""
+
+import hashlib
+import json
+import os
+from datetime import datetime
+import joblib
+import numpy as np
+from sklearn.base import clone
+from sklearn.metrics import mean_squared_error
+
+
+def prefix_digest(X, y, rows):
+    """SHA-1 of the first rows of a file's feature matrix and target."""
+    digest = hashlib.sha1()
+    digest.update(np.ascontiguousarray(X[:rows], dtype=np.float32).data)
+    digest.update(np.ascontiguousarray(y[:rows], dtype=np.float64).data)
+    return digest.hexdigest()
+
+
+def linear_stats(X, y):
+    """Returns: (n, mean_x, mean_y, Cxx, Cxy) with centered cross products."""
+    X = np.asarray(X, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    mean_x, mean_y = X.mean(axis=0), y.mean()
+    Xc = X - mean_x
+    return len(y), mean_x, mean_y, Xc.T @ Xc, Xc.T @ (y - mean_y)
+
+
+def merge_linear_stats(a, b):
+    # Pairwise combination of centered statistics (Chan et al.)
+    n_a, mx_a, my_a, cxx_a, cxy_a = a
+    n_b, mx_b, my_b, cxx_b, cxy_b = b
+    n = n_a + n_b
+    dx, dy = mx_b - mx_a, my_b - my_a
+    weight = n_a * n_b / n
+    return (
+        n,
+        mx_a + dx * n_b / n,
+        my_a + dy * n_b / n,
+        cxx_a + cxx_b + np.outer(dx, dx) * weight,
+        cxy_a + cxy_b + dx * dy * weight
+    )
+
+
+def solve_linear_stats(stats, model):
+    """Sets coef_/intercept_ of a LinearRegression to the least-squares fit."""
+    _, mean_x, mean_y, cxx, cxy = stats
+    # Minimum-norm solution, like LinearRegression on collinear features
+    coef = np.linalg.lstsq(cxx, cxy, rcond=None)[0]
+    model.coef_ = coef
+    model.intercept_ = float(mean_y - mean_x @ coef)
+    model.n_features_in_ = len(coef)
+    return model
+
+
+class IncrementalTrainer:
+    def __init__(self, config, trainer, state_path):
+        self.config = config
+        self.trainer = trainer
+        self.state_path = state_path
+        self.state_file = os.path.join(state_path, "state.json")
+        self.stats_file = os.path.join(state_path, "linear_stats.npz")
+        self.state = self._read_state()
+        self.models = {}
+        self.linear_stats = None
+        if self.state is not None:
+            self._load_models()
+
+    def _read_state(self):
+        if not os.path.exists(self.state_file):
+            return None
+        with open(self.state_file) as f:
+            return json.load(f)
+
+    def _model_file(self, name):
+        return os.path.join(self.state_path, f"{name}.pkl")
+
+    def _load_models(self):
+        for name in self.config.MODELS:
+            if not os.path.exists(self._model_file(name)):
+                # Incomplete state: start over
+                self.state = None
+                return
+            self.models[name] = joblib.load(self._model_file(name))
+        if 'linear_regression' in self.models:
+            with np.load(self.stats_file) as stats:
+                self.linear_stats = (int(stats['n']), stats['mean_x'], float(stats['mean_y']), stats['cxx'], stats['cxy'])
+
+    def _save(self):
+        os.makedirs(self.state_path, exist_ok=True)
+        for name, model in self.models.items():
+            joblib.dump(model, self._model_file(name))
+        if self.linear_stats is not None:
+            n, mean_x, mean_y, cxx, cxy = self.linear_stats
+            np.savez(self.stats_file, n=n, mean_x=mean_x, mean_y=mean_y, cxx=cxx, cxy=cxy)
+        # State last: an interrupted save leaves the previous watermark behind
+        tmp_file = self.state_file + ".tmp"
+        with open(tmp_file, "w") as f:
+            json.dump(self.state, f, indent=2)
+        os.replace(tmp_file, self.state_file)
+
+    def _rmse(self, model, X, y):
+        return float(np.sqrt(mean_squared_error(y, np.maximum(0, model.predict(X)))))
+
+    def _new_rows(self, files):
+        """
+        Returns: (X, y, watermark, digests) with the rows past the stored
+        watermark, or None when a file shrank, disappeared or its rows
+        below the watermark changed (full retrain needed)
+        """
+        watermark = self.state['watermark']
+        digests = self.state.get('digests', {})
+        if any(path not in files for path in watermark):
+            return None
+        X_parts, y_parts, new_watermark, new_digests = [], [], {}, {}
+        for path, (X, y) in files.items():
+            seen = watermark.get(path, 0)
+            if len(y) < seen:
+                return None
+            # Same or more rows, but the rows already learned from may differ
+            if seen and digests.get(path) != prefix_digest(X, y, seen):
+                return None
+            X_parts.append(X[seen:])
+            y_parts.append(y[seen:])
+            new_watermark[path] = len(y)
+            new_digests[path] = prefix_digest(X, y, len(y))
+        return np.concatenate(X_parts), np.concatenate(y_parts), new_watermark, new_digests
+
+    def run(self, loader):
+        files = {os.path.abspath(path): (X, y) for path, X, y in loader.iter_file_arrays()}
+        if not files:
+            raise FileNotFoundError(f"No files matching {loader.pattern} in {loader.data_path}")
+
+        if self.state is None:
+            return self.full_retrain(files, "no incremental state")
+        if 'split_rows' not in self.state:
+            return self.full_retrain(files, "no test split in the incremental state")
+        new_rows = self._new_rows(files)
+        if new_rows is None:
+            return self.full_retrain(files, "source files were rewritten")
+        new_X, new_y, watermark, digests = new_rows
+        if len(new_y) < self.config.INCREMENTAL_MIN_ROWS:
+            print(f"Incremental | {len(new_y)} new rows, waiting for {self.config.INCREMENTAL_MIN_ROWS}")
+            return {'mode': 'none', 'reason': "not enough new rows", 'rows': len(new_y), 'results': {}}
+        if self.state['updates'] >= self.config.INCREMENTAL_FULL_EVERY:
+            return self.full_retrain(files, f"scheduled after {self.state['updates']} updates")
+
+        # Prequential validation: score the new rows before learning from them
+        best = self.state['best_model']
+        drift = self._rmse(self.models[best], new_X, new_y) / max(self.state['baseline_rmse'], 1e-9)
+        print(f"Incremental | {len(new_y)} new rows | {best} drift ratio: {drift:.2f}")
+        if drift > self.config.INCREMENTAL_DRIFT_THRESHOLD:
+            return self.full_retrain(files, f"validation drift {drift:.2f}")
+        X_test, y_test = self._test_split(files)
+        return self.update(new_X, new_y, watermark, digests, X_test, y_test)
+
+    def _test_split(self, files):
+        # Rows the last full retrain was split from, in the same file order
+        rows = self.state['split_rows']
+        X = np.concatenate([X[:rows.get(path, 0)] for path, (X, _) in files.items()])
+        y = np.concatenate([y[:rows.get(path, 0)] for path, (_, y) in files.items()])
+        _, X_test, _, y_test = self.trainer.split_data(X, y)
+        return X_test, y_test
+
+    def full_retrain(self, files, reason):
+        print(f"Incremental | Full retrain: {reason}")
+        X = np.concatenate([X for X, _ in files.values()])
+        y = np.concatenate([y for _, y in files.values()])
+        X_train, X_test, y_train, y_test = self.trainer.split_data(X, y)
+        self.models = self.trainer.train_models(X_train, y_train)
+
+        results = {name: {'rmse': self._rmse(model, X_test, y_test)} for name, model in self.models.items()}
+        best = min(results, key=lambda name: results[name]['rmse'])
+        self.linear_stats = linear_stats(X_train, y_train) if 'linear_regression' in self.models else None
+        self.state = {
+            'watermark': {path: len(y) for path, (_, y) in files.items()},
+            'split_rows': {path: len(y) for path, (_, y) in files.items()},
+            'digests': {path: prefix_digest(X, y, len(y)) for path, (X, y) in files.items()},
+            'updates': 0,
+            'last_full_retrain': datetime.now().isoformat(timespec='seconds'),
+            'best_model': best,
+            'baseline_rmse': results[best]['rmse']
+        }
+        self._save()
+        return {
+            'mode': 'full', 'reason': reason, 'rows': len(y), 'results': results,
+            'X_train': X_train, 'X_test': X_test, 'y_train': y_train, 'y_test': y_test,
+            'split_rows': self.state['split_rows']
+        }
+
+    def update(self, new_X, new_y, watermark, digests, X_test, y_test):
+        prequential = {}
+        for name, model in self.models.items():
+            # Prequential RMSE of the model before the update
+            prequential[name] = {'rmse': self._rmse(model, new_X, new_y)}
+            class_name = type(model).__name__
+            if class_name == 'XGBRegressor':
+                # Boost n_estimators more rounds on top of the saved booster
+                self.models[name] = clone(model).fit(new_X, new_y, xgb_model=model.get_booster())
+            elif class_name == 'RandomForestRegressor':
+                model.set_params(warm_start=True, n_estimators=len(model.estimators_) + self.config.INCREMENTAL_RF_TREES)
+                model.fit(new_X, new_y)
+            elif class_name == 'LinearRegression':
+                self.linear_stats = merge_linear_stats(self.linear_stats, linear_stats(new_X, new_y))
+                solve_linear_stats(self.linear_stats, model)
+            print(f"{name} | Prequential RMSE on new rows: {prequential[name]['rmse']:.2f}")
+
+        # The updated models, on the test rows none of them learned from
+        results = {name: {'rmse': self._rmse(model, X_test, y_test)} for name, model in self.models.items()}
+        best = min(results, key=lambda name: results[name]['rmse'])
+        self.state['best_model'] = best
+        self.state['baseline_rmse'] = results[best]['rmse']
+        self.state['watermark'] = watermark
+        self.state['digests'] = digests
+        self.state['updates'] += 1
+        self._save()
+        return {
+            'mode': 'incremental', 'reason': f"update {self.state['updates']}", 'rows': len(new_y), 'results': results,
+            'prequential': prequential, 'X_test': X_test, 'y_test': y_test, 'split_rows': self.state['split_rows']
+        }
@@ -0,0 +1,238 @@
+"""
+    Long-lived inference service for the irrigation model.
+
+    The model, imputer and scaler are loaded once at startup, from the
+    current version of the artifact store when one has been promoted
+    (memory-mapped NumPy tables, no sklearn import), otherwise from the
+    legacy pickles. Readings are accepted over HTTP/1.1 (TCP or Unix
+    socket) as JSON, either a single {"data", "temperatura", "humidade"}
+    object or a list of them, with an optional "node" (collector / port id). Requests arriving within
+    Config.BATCH_WINDOW_MS of each other are merged into one micro-batch and
+    scored with a single model call. The hot path is the CompiledPipeline
+    (utils/pipeline.py): NumPy feature matrix, imputer and scaler folded into
+    the model, no pandas. Tree ensembles and linear models are scored that
+    way for batches of up to Config.COMPILED_MAX_ROWS rows. For models with
+    rolling window features, the service keeps one WindowFeatures per node
+    and adds every reading with update(), so a node's readings, sent one
+    per request or in lists in time order, build up the same windows as in
+    training (readings without "node" share one series).
+
+    Endpoints:
+        POST /predict   body: reading or list of readings
+                        returns: {"predictions": [...]}
+        GET  /health    returns: {"status": "ok", "batches": n, "rows": n}
+
+    Classes:
+        InferenceModel: Loaded artifacts and the window state of every node;
+                        predict(timestamps, temperatura, humidade, nodes=None)
+        MicroBatcher: Merges concurrent submissions into batched model calls
+        InferenceService: asyncio HTTP front-end
+
+    Usage:
+        model = InferenceModel("models/", store_path="models/store/")
+        service = InferenceService(model, window_ms=2, max_batch=1024)
+        asyncio.run(service.serve(host="127.0.0.1", port=8765))
+"""
+
+import asyncio
+import json
+import logging
+import os
+import warnings
+from concurrent.futures import ThreadPoolExecutor
+import joblib
+import numpy as np
+from utils.artifact_store import ArtifactStore
+from utils.pipeline import compile_pipeline
+
+logger = logging.getLogger(__name__)
+
+# Models are fitted on DataFrames; the NumPy hot path has no column names
+warnings.filterwarnings("ignore", message="X does not have valid feature names")
+
+
+def parse_readings(payload):
+    """
+    Converts a JSON reading (or list of readings) into NumPy arrays.
+    Readings without 'data' are stamped with the current time.
+    Returns: (timestamps, temperatura, humidade, nodes)
+    """
+    readings = payload if isinstance(payload, list) else [payload]
+    if not readings:
+        raise ValueError("No readings")
+    if not all(isinstance(r, dict) for r in readings):
+        raise ValueError("Every reading must be a JSON object")
+    now = np.datetime64("now", "us")
+    timestamps = np.array([r.get("data") or now for r in readings], dtype="datetime64[us]")
+    temperatura = np.array([r["temperatura"] for r in readings], dtype=np.float32)
+    humidade = np.array([r["humidade"] for r in readings], dtype=np.float32)
+    if not all(isinstance(r.get("node"), (str, int, type(None))) for r in readings):
+        raise ValueError("A reading's node must be a string or an integer")
+    nodes = np.array([None if r.get("node") is None else str(r["node"]) for r in readings], dtype=object)
+    return timestamps, temperatura, humidade, nodes
+
+
+class InferenceModel:
+    def __init__(self, model_path, compiled_max_rows=2048, store_path=None):
+        store = ArtifactStore(store_path) if store_path else None
+        if store is not None and store.current() is not None:
+            # Promoted bundle: memory-mapped, already folded tables; the
+            # estimator is only unpickled for batches above compiled_max_rows
+            self.bundle = store.load()
+            self.pipeline = self.bundle.pipeline
+        else:
+            self.bundle = None
+            model = joblib.load(os.path.join(model_path, "best_model.pkl"))
+            imputer = joblib.load(os.path.join(model_path, "imputer.pkl"))
+            scaler = joblib.load(os.path.join(model_path, "scaler.pkl"))
+            # Only the transformers fitted during training are folded in
+            self.pipeline = compile_pipeline(model, imputer, scaler)
+        # Tree ensembles and linear models are scored with NumPy for small batches
+        self.compiled_max_rows = compiled_max_rows
+        # Running window features of every node, for windowed models
+        self.windows = {}
+
+    def _node_windows(self, node):
+        windows = self.windows.get(node)
+        if windows is None:
+            windows = self.windows[node] = self.pipeline.window_features()
+        return windows
+
+    def predict(self, timestamps, temperatura, humidade, nodes=None):
+        # With nodes, every reading continues the window of its node;
+        # otherwise the readings are one series of their own
+        windows = [self._node_windows(node) for node in nodes] if nodes is not None and self.pipeline.windowed else None
+        return np.maximum(0, self.pipeline.predict_raw(timestamps, temperatura, humidade,
+                                                       max_compiled_rows=self.compiled_max_rows, windows=windows))
+
+
+class MicroBatcher:
+    def __init__(self, predict_fn, window_ms=2.0, max_batch=1024):
+        self.predict_fn = predict_fn
+        self.window = window_ms / 1000
+        self.max_batch = max_batch
+        self.queue = asyncio.Queue()
+        # A single worker thread keeps model calls off the event loop
+        self.executor = ThreadPoolExecutor(max_workers=1)
+        self.batches = 0
+        self.rows = 0
+
+    async def submit(self, timestamps, temperatura, humidade, nodes):
+        future = asyncio.get_running_loop().create_future()
+        await self.queue.put(((timestamps, temperatura, humidade, nodes), future))
+        return await future
+
+    async def _collect(self):
+        batch = [await self.queue.get()]
+        n_rows = len(batch[0][0][0])
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.window
+        while n_rows < self.max_batch:
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            try:
+                item = await asyncio.wait_for(self.queue.get(), timeout)
+            except asyncio.TimeoutError:
+                break
+            batch.append(item)
+            n_rows += len(item[0][0])
+        return batch
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = await self._collect()
+            arrays = [np.concatenate(parts) for parts in zip(*(readings for readings, _ in batch))]
+            try:
+                # Submissions are scored in arrival order, so every node's windows advance in order
+                predictions = await loop.run_in_executor(self.executor, self.predict_fn, *arrays)
+            except Exception as e:
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+
+            self.batches += 1
+            self.rows += len(predictions)
+            start = 0
+            for (readings, future) in batch:
+                end = start + len(readings[0])
+                if not future.done():
+                    future.set_result(predictions[start:end])
+                start = end
+
+
+class InferenceService:
+    def __init__(self, model, window_ms=2.0, max_batch=1024):
+        self.model = model
+        self.window_ms = window_ms
+        self.max_batch = max_batch
+        self.batcher = None
+
+    async def _respond(self, writer, status, body):
+        payload = json.dumps(body).encode()
+        reason = {200: "OK", 400: "Bad Request", 404: "Not Found", 500: "Internal Server Error"}[status]
+        writer.write(
+            f"HTTP/1.1 {status} {reason}\r\n"
+            f"Content-Type: application/json\r\n"
+            f"Content-Length: {len(payload)}\r\n\r\n".encode() + payload
+        )
+        await writer.drain()
+
+    async def _handle_request(self, method, path, body):
+        if method == "GET" and path == "/health":
+            return 200, {"status": "ok", "batches": self.batcher.batches, "rows": self.batcher.rows}
+        if method == "POST" and path == "/predict":
+            try:
+                arrays = parse_readings(json.loads(body))
+            except (ValueError, KeyError, TypeError) as e:
+                return 400, {"error": f"Invalid readings: {e}"}
+            predictions = await self.batcher.submit(*arrays)
+            return 200, {"predictions": predictions.tolist()}
+        return 404, {"error": f"Unknown endpoint {method} {path}"}
+
+    async def handle_connection(self, reader, writer):
+        # Keep-alive: serve requests on the connection until the client closes it
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                method, path, _ = request_line.decode().split(" ", 2)
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    key, _, value = line.decode().partition(":")
+                    headers[key.strip().lower()] = value.strip()
+                body = await reader.readexactly(int(headers.get("content-length", 0)))
+
+                try:
+                    status, response = await self._handle_request(method, path, body)
+                except Exception as e:
+                    logger.exception("Prediction failed")
+                    status, response = 500, {"error": str(e)}
+                await self._respond(writer, status, response)
+                if headers.get("connection", "").lower() == "close":
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    async def serve(self, host="127.0.0.1", port=8765, unix_socket=None):
+        self.batcher = MicroBatcher(self.model.predict, self.window_ms, self.max_batch)
+        batcher_task = asyncio.create_task(self.batcher.run())
+        if unix_socket:
+            server = await asyncio.start_unix_server(self.handle_connection, path=unix_socket)
+            logger.info(f"Inference service listening on unix:{unix_socket}")
+        else:
+            server = await asyncio.start_server(self.handle_connection, host, port)
+            logger.info(f"Inference service listening on http://{host}:{port}")
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            batcher_task.cancel()
@@ -1,21 +1,23 @@
-import pandas as pd
-import joblib  # ou podes usar pickle
-from preprocessor import DataPreprocessor
+import os
+import sys
+import numpy as np
 
-model = joblib.load("models/best_model.pkl")  # caminho para o teu modelo .pkl
+# Corre a partir da raiz do repositório: python src/utils/inferencia.py
+# Para muitas leituras (vários nós, ficheiros grandes): python src/main.py score --input leituras.csv --output previsoes.csv
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-dados_novos = pd.DataFrame({
-    "data": ["2025-05-16 03:13:00"],
-    "temperatura": [29.8],
-    "humidade": [25.2]
-})
+from utils.config import Config
+from utils.inference_service import InferenceModel
 
-preprocessor = DataPreprocessor()
-df_processado = preprocessor.preprocess(dados_novos)
+config = Config()
+# Versão atual do artifact store, ou os .pkl antigos; as features, o imputer
+# e o scaler vêm do mesmo pipeline usado no treino e no serviço
+model = InferenceModel(config.MODEL_PATH.lstrip('/\\'), store_path=config.ARTIFACT_STORE_PATH.lstrip('/\\'))
 
-basic_features = ["temperatura", "humidade","ano", "dia_sin", "dia_cos","mes_sin", "mes_cos", "hora_sin", "hora_cos"]
+predicoes = model.predict(
+    np.array(["2025-05-16 03:13:00"], dtype="datetime64[us]"),
+    np.array([29.8], dtype=np.float32),
+    np.array([25.2], dtype=np.float32)
+)
 
-X_novo = df_processado[basic_features]
-predicoes = model.predict(X_novo)
-
-print(f" Tempo de rega previsto: {predicoes[0]:.2f} minutos")
\ No newline at end of file
+print(f" Tempo de rega previsto: {predicoes[0]:.2f} minutos")
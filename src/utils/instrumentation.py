@@ -0,0 +1,305 @@
+"""
+    Per-stage timers, memory snapshots and opt-in profiling of the pipeline.
+
+    Code marks its stages with the module functions, which do nothing until
+    an Instrumentation is configured (one global lookup and a shared
+    nullcontext per call, so stages can stay in hot loops):
+
+        with instrumentation.stage('load_data'):
+            ...
+        instrumentation.record('rows_loaded', n)
+
+    When configured, every stage accumulates its calls, wall and CPU time,
+    the RSS at its end and the process peak RSS; with trace_memory, also the
+    peak of the Python allocations during the stage, above what was allocated
+    when it started (tracemalloc, which slows allocations down, so it is a
+    separate switch). Stages can nest; a stage's times include its nested
+    stages. Each completed stage is logged as one JSON line
+    ({"event": "stage", ...}); stages entered per chunk are opened with
+    log=False and only appear in the summary.
+
+    Stages listed in profile (or 'all') run under cProfile, or pyinstrument
+    with profiler='pyinstrument', and close() writes one <stage>.prof (or
+    .html) file per stage to profile_path. A profiled stage nested in
+    another profiled stage is covered by the outer profile.
+
+    Attributes (Instrumentation):
+        stages (dict): Per-stage totals, in first-entry order
+        values (list): Values recorded with record()
+
+    Methods (Instrumentation):
+        stage(name, log=True): Context manager timing one stage run
+        record(name, value, **labels): Stores a value (row count, metric, ...)
+        summary(): Logs the stages, slowest first
+        write_metrics(path): Prometheus text (.prom/.txt) or JSON file, written atomically
+        close(): Stops tracemalloc and writes the profiles
+
+    Functions:
+        configure(enabled=True, trace_memory=False, profile=(), profiler='cprofile', profile_path='models/profiles/'):
+            Returns: The Instrumentation now active (None when not enabled)
+        active():
+            Returns: The active Instrumentation, or None
+        stage(name, log=True) / record(name, value, **labels):
+            Same as the methods of the active instance; no-ops without one
+
+    Usage:
+        inst = instrumentation.configure(trace_memory=True, profile=['train_models'])
+        with instrumentation.stage('train_models'):
+            trainer.train_models(X_train, y_train)
+        inst.summary()
+        inst.write_metrics("models/metrics.prom")
+        inst.close()
+"""
+
+import contextlib
+import json
+import logging
+import os
+import re
+import sys
+import time
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+_NULL = contextlib.nullcontext()
+_active = None
+
+
+def rss_bytes():
+    """Current resident set size (process peak where it cannot be read)."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        return peak_rss_bytes()
+
+
+def peak_rss_bytes():
+    try:
+        import resource
+    except ImportError:  # Windows
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+class _StageRun:
+    def __init__(self, instrumentation, name, log):
+        self.instrumentation = instrumentation
+        self.name = name
+        self.log = log
+        self.traced_peak = 0
+
+    def __enter__(self):
+        self.instrumentation._enter(self)
+        return self
+
+    def __exit__(self, *exc):
+        self.instrumentation._exit(self)
+
+
+class Instrumentation:
+    def __init__(self, trace_memory=False, profile=(), profiler='cprofile', profile_path='models/profiles/'):
+        if profiler not in ('cprofile', 'pyinstrument'):
+            raise ValueError(f"Unknown profiler: {profiler}")
+        self.trace_memory = trace_memory
+        self.profile = set(profile or ())
+        self.profiler = profiler
+        self.profile_path = profile_path
+        self.stages = {}
+        self.values = []
+        self._open = []
+        self._profiles = {}
+        self._profiling = None
+        if trace_memory:
+            import tracemalloc
+            self._tracemalloc = tracemalloc
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+
+    def stage(self, name, log=True):
+        return _StageRun(self, name, log)
+
+    def record(self, name, value, **labels):
+        self.values.append({'name': name, 'value': float(value), 'labels': labels})
+
+    def _profiled(self, name):
+        return self._profiling is None and ('all' in self.profile or name in self.profile)
+
+    def _enter(self, run):
+        if self.trace_memory:
+            # The peak so far belongs to the enclosing stages; restart it for this one
+            peak = self._tracemalloc.get_traced_memory()[1]
+            for parent in self._open:
+                parent.traced_peak = max(parent.traced_peak, peak)
+            self._tracemalloc.reset_peak()
+            run.traced_start = self._tracemalloc.get_traced_memory()[0]
+        self._open.append(run)
+        if self._profiled(run.name):
+            self._start_profile(run.name)
+            self._profiling = run
+        run.cpu_start = time.process_time()
+        run.start = time.perf_counter()
+
+    def _exit(self, run):
+        wall = time.perf_counter() - run.start
+        cpu = time.process_time() - run.cpu_start
+        if self._profiling is run:
+            self._stop_profile(run.name)
+            self._profiling = None
+        self._open.remove(run)
+        traced = None
+        if self.trace_memory:
+            peak = max(run.traced_peak, self._tracemalloc.get_traced_memory()[1])
+            for parent in self._open:
+                parent.traced_peak = max(parent.traced_peak, peak)
+            traced = max(0, peak - run.traced_start)
+
+        stats = self.stages.setdefault(run.name, {
+            'calls': 0, 'wall_s': 0.0, 'cpu_s': 0.0, 'max_wall_s': 0.0,
+            'rss_bytes': None, 'peak_rss_bytes': None, 'traced_peak_bytes': None
+        })
+        stats['calls'] += 1
+        stats['wall_s'] += wall
+        stats['cpu_s'] += cpu
+        stats['max_wall_s'] = max(stats['max_wall_s'], wall)
+        stats['rss_bytes'] = rss_bytes()
+        stats['peak_rss_bytes'] = peak_rss_bytes()
+        if traced is not None:
+            stats['traced_peak_bytes'] = max(stats['traced_peak_bytes'] or 0, traced)
+
+        if run.log:
+            event = {'event': 'stage', 'stage': run.name, 'wall_s': round(wall, 6), 'cpu_s': round(cpu, 6)}
+            if stats['rss_bytes'] is not None:
+                event['rss_mb'] = round(stats['rss_bytes'] / 2**20, 1)
+            if traced is not None:
+                event['traced_peak_mb'] = round(traced / 2**20, 1)
+            logger.info(json.dumps(event))
+
+    def _start_profile(self, name):
+        profile = self._profiles.get(name)
+        if profile is None:
+            if self.profiler == 'pyinstrument':
+                try:
+                    from pyinstrument import Profiler
+                except ImportError as e:
+                    raise ImportError("profiler='pyinstrument' needs the pyinstrument package") from e
+                profile = Profiler()
+            else:
+                import cProfile
+                profile = cProfile.Profile()
+            self._profiles[name] = profile
+        if self.profiler == 'pyinstrument':
+            profile.start()
+        else:
+            profile.enable()
+
+    def _stop_profile(self, name):
+        if self.profiler == 'pyinstrument':
+            self._profiles[name].stop()
+        else:
+            self._profiles[name].disable()
+
+    def summary(self):
+        if not self.stages:
+            return
+        logger.info(f"{'stage':24} | {'calls':>5} | {'wall (s)':>9} | {'cpu (s)':>8} | {'RSS (MB)':>8} | {'traced peak (MB)':>16}")
+        for name, stats in sorted(self.stages.items(), key=lambda item: -item[1]['wall_s']):
+            rss = f"{stats['rss_bytes'] / 2**20:.0f}" if stats['rss_bytes'] is not None else "-"
+            traced = f"{stats['traced_peak_bytes'] / 2**20:.1f}" if stats['traced_peak_bytes'] is not None else "-"
+            logger.info(f"{name:24} | {stats['calls']:5} | {stats['wall_s']:9.3f} | {stats['cpu_s']:8.3f} | {rss:>8} | {traced:>16}")
+
+    def _prometheus(self):
+        series = [
+            ('rega_stage_seconds_total', 'counter', 'Wall time spent in the stage', 'wall_s'),
+            ('rega_stage_cpu_seconds_total', 'counter', 'CPU time of the process during the stage', 'cpu_s'),
+            ('rega_stage_calls_total', 'counter', 'Completed runs of the stage', 'calls'),
+            ('rega_stage_max_seconds', 'gauge', 'Longest single run of the stage', 'max_wall_s'),
+            ('rega_stage_rss_bytes', 'gauge', 'Resident set size at the end of the stage', 'rss_bytes'),
+            ('rega_stage_peak_rss_bytes', 'gauge', 'Process peak resident set size at the end of the stage', 'peak_rss_bytes'),
+            ('rega_stage_traced_peak_bytes', 'gauge', 'Peak Python allocations of the stage above its start (tracemalloc)', 'traced_peak_bytes'),
+        ]
+        lines = []
+        for metric, kind, help_text, key in series:
+            samples = [(name, stats[key]) for name, stats in self.stages.items() if stats[key] is not None]
+            if not samples:
+                continue
+            lines += [f"# HELP {metric} {help_text}", f"# TYPE {metric} {kind}"]
+            lines += [f'{metric}{{stage="{_escape(name)}"}} {value}' for name, value in samples]
+
+        by_name = {}
+        for value in self.values:
+            by_name.setdefault("rega_" + re.sub(r"[^a-zA-Z0-9_]", "_", value['name']), []).append(value)
+        for metric, values in by_name.items():
+            lines.append(f"# TYPE {metric} gauge")
+            for value in values:
+                labels = ",".join(f'{key}="{_escape(label)}"' for key, label in value['labels'].items())
+                lines.append(f"{metric}{{{labels}}} {value['value']}" if labels else f"{metric} {value['value']}")
+        return "\n".join(lines) + "\n"
+
+    def write_metrics(self, path):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        if path.endswith(".json"):
+            content = json.dumps({
+                'created': datetime.now().isoformat(timespec='seconds'),
+                'stages': self.stages,
+                'values': self.values
+            }, indent=2)
+        else:
+            content = self._prometheus()
+        # Replaced atomically, so a metrics collector never reads a partial file
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w") as f:
+            f.write(content)
+        os.replace(tmp_path, path)
+        return path
+
+    def close(self):
+        if self._profiling is not None:
+            self._stop_profile(self._profiling.name)
+            self._profiling = None
+        if self._profiles:
+            os.makedirs(self.profile_path, exist_ok=True)
+        for name, profile in self._profiles.items():
+            file_name = re.sub(r"[^a-zA-Z0-9_.-]", "_", name)
+            if self.profiler == 'pyinstrument':
+                path = os.path.join(self.profile_path, f"{file_name}.html")
+                with open(path, "w") as f:
+                    f.write(profile.output_html())
+            else:
+                path = os.path.join(self.profile_path, f"{file_name}.prof")
+                profile.dump_stats(path)
+            logger.info(f"Profile of stage {name} written to {path}")
+        self._profiles = {}
+        if self.trace_memory and self._tracemalloc.is_tracing():
+            self._tracemalloc.stop()
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def configure(enabled=True, trace_memory=False, profile=(), profiler='cprofile', profile_path='models/profiles/'):
+    global _active
+    if _active is not None:
+        _active.close()
+    _active = Instrumentation(trace_memory, profile, profiler, profile_path) if enabled else None
+    return _active
+
+
+def active():
+    return _active
+
+
+def stage(name, log=True):
+    if _active is None:
+        return _NULL
+    return _active.stage(name, log)
+
+
+def record(name, value, **labels):
+    if _active is not None:
+        _active.record(name, value, **labels)
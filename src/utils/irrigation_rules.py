@@ -0,0 +1,155 @@
+"""
+    Table-driven, vectorized version of calcular_tempo_rega.
+
+    The temperature and humidity bands of the labeling rule in
+    src/arduino/Arduino_ExportCSV.py are plain data: sorted band edges, one
+    factor per band and the factor used for missing (NaN) readings. Each
+    edge value belongs to the band above it unless it is listed in
+    'edge_in_lower' (humidity 80 is in the 60-80 band). Whole arrays are
+    binned (a compare per edge for small tables, np.searchsorted for large
+    ones) and the result is gathered from a precomputed table of every
+    (temperature band, humidity band) pair, with the humidity limit folded
+    in as an extra humidity edge. Relabeling years of history is a handful
+    of array operations instead of a Python call per reading.
+
+    The default tables reproduce the scalar rule exactly, NaN included:
+        temperatura  <15: -2  15-25: 0  25-30: 3  30-35: 5  35-40: 15  >=40 or NaN: 48
+        humidade     <20 or NaN: 5  20-40: 3  40-60: 0  60-80: -6  >80: -8
+        tempo_rega   max(0, base + fator_temperatura + fator_humidade)
+        label        tempo_rega when humidade < humidity_limit, else 0
+
+    Attributes:
+        temperature_bands / humidity_bands (dict): 'edges', 'factors',
+            'edge_in_lower' and 'missing' of each variable
+        base (int): Irrigation minutes in normal conditions (1)
+        humidity_limit (float): No irrigation at or above this humidity (40)
+
+    Methods:
+        tempo_rega(temperatura, humidade):
+            Returns: Array equal to calcular_tempo_rega for every reading
+
+        label(temperatura, humidade):
+            Returns: int16 rega_necessaria_min as written by the logger
+
+        to_dict() / from_dict(rules) / from_file(path):
+            Rule tables as JSON-compatible data
+
+    Usage:
+        rules = IrrigationRules(humidity_limit=35)
+        df['rega_necessaria_min'] = rules.label(df['temperatura'], df['humidade'])
+"""
+
+import json
+import numpy as np
+
+TEMPERATURE_BANDS = {
+    'edges': [15, 25, 30, 35, 40],
+    'factors': [-2, 0, 3, 5, 15, 48],
+    'edge_in_lower': [],
+    'missing': 48
+}
+
+HUMIDITY_BANDS = {
+    'edges': [20, 40, 60, 80],
+    'factors': [5, 3, 0, -6, -8],
+    'edge_in_lower': [80],
+    'missing': 5
+}
+
+
+def band_edges(bands):
+    """Returns: float64 edges where every band starts (value >= edge)."""
+    edges = np.asarray(bands['edges'], dtype=np.float64)
+    if len(bands['factors']) != len(edges) + 1:
+        raise ValueError(f"{len(edges)} band edges need {len(edges) + 1} factors, got {len(bands['factors'])}")
+    # An edge that belongs to the lower band starts the upper one just above it
+    in_lower = np.isin(edges, np.asarray(bands['edge_in_lower'], dtype=np.float64))
+    return np.where(in_lower, np.nextafter(edges, np.inf), edges)
+
+
+def band_index(values, edges):
+    """
+    Index of the band every value falls in; NaN gets len(edges) + 1, one
+    past the last band.
+    """
+    if len(edges) > 32:
+        index = np.searchsorted(edges, values, side='right')
+    else:
+        # A few compares per value beat a binary search on small tables
+        index = np.zeros(values.shape, dtype=np.uint8)
+        for edge in edges:
+            np.add(index, values >= edge, out=index, casting='unsafe')
+    return np.where(np.isnan(values), len(edges) + 1, index)
+
+
+def band_factors(values, bands):
+    """Returns: The factor of the band every value falls in."""
+    factors = np.append(bands['factors'], bands['missing'])
+    return factors[band_index(np.asarray(values, dtype=np.float64), band_edges(bands))]
+
+
+class IrrigationRules:
+    def __init__(self, temperature_bands=TEMPERATURE_BANDS, humidity_bands=HUMIDITY_BANDS, base=1, humidity_limit=40):
+        self.temperature_bands = temperature_bands
+        self.humidity_bands = humidity_bands
+        self.base = base
+        self.humidity_limit = humidity_limit
+        self._tables = {}
+
+    def _table(self, with_limit):
+        """
+        Result for every (temperature band, humidity band) pair, NaN bands
+        last. With the humidity limit, it becomes one more humidity edge and
+        every band at or above it yields 0.
+        """
+        if with_limit in self._tables:
+            return self._tables[with_limit]
+        t_edges = band_edges(self.temperature_bands)
+        h_edges = band_edges(self.humidity_bands)
+        if with_limit:
+            h_edges = np.union1d(h_edges, [self.humidity_limit])
+        lower = np.concatenate([[-np.inf], h_edges])
+        h_factors = np.append(band_factors(lower, self.humidity_bands), self.humidity_bands['missing'])
+        t_factors = np.append(self.temperature_bands['factors'], self.temperature_bands['missing'])
+
+        table = np.maximum(self.base + t_factors[:, None] + h_factors[None, :], 0)
+        if with_limit:
+            # NaN humidity compares False, like the scalar logger: no irrigation
+            irrigate = np.append(lower < self.humidity_limit, False)
+            table = table * irrigate
+        self._tables[with_limit] = (t_edges, h_edges, table)
+        return self._tables[with_limit]
+
+    def _evaluate(self, temperatura, humidade, with_limit):
+        t_edges, h_edges, table = self._table(with_limit)
+        t_index = band_index(np.asarray(temperatura, dtype=np.float64), t_edges)
+        h_index = band_index(np.asarray(humidade, dtype=np.float64), h_edges)
+        return table.take(t_index.astype(np.intp) * table.shape[1] + h_index)
+
+    def tempo_rega(self, temperatura, humidade):
+        return self._evaluate(temperatura, humidade, with_limit=False)
+
+    def label(self, temperatura, humidade):
+        return self._evaluate(temperatura, humidade, with_limit=True).astype(np.int16)
+
+    def to_dict(self):
+        return {
+            'temperature_bands': self.temperature_bands,
+            'humidity_bands': self.humidity_bands,
+            'base': self.base,
+            'humidity_limit': self.humidity_limit
+        }
+
+    @classmethod
+    def from_dict(cls, rules):
+        return cls(
+            rules.get('temperature_bands', TEMPERATURE_BANDS),
+            rules.get('humidity_bands', HUMIDITY_BANDS),
+            rules.get('base', 1),
+            rules.get('humidity_limit', 40)
+        )
+
+    @classmethod
+    def from_file(cls, path):
+        with open(path) as f:
+            return cls.from_dict(json.load(f))
@@ -0,0 +1,142 @@
+"""
+    Single-pass regression metrics with mergeable partial results.
+
+    RegressionStats accumulates, from the residuals of one chunk at a time,
+    everything the evaluation reports: the squared error of the raw
+    predictions (model.score), and the squared and absolute error of the
+    predictions clipped at 0 (RMSE, MAE, R² as evaluated by ModelEvaluator),
+    plus the count, mean and centered sum of squares of y_true for R².
+    Partial results of different chunks are combined exactly (Chan et al.),
+    so holdouts that do not fit in memory can be streamed chunk by chunk.
+
+    Bootstrap confidence intervals resample the residuals of a holdout; the
+    replicates are split into blocks with independent seeds and computed on
+    a joblib process pool.
+
+    Methods (RegressionStats):
+        update(y_true, y_pred): Adds one chunk
+        merge(other): Combines two partial results
+        result(): Returns: {'score', 'rmse', 'mae', 'r2', 'n'}
+
+    Functions:
+        regression_metrics(y_true, y_pred, chunk_size=None):
+            Returns: RegressionStats.result() of the whole arrays
+
+        bootstrap_ci(y_true, y_pred, n_boot=1000, alpha=0.05, n_jobs=-1, seed=42):
+            Returns: {metric: (low, high)} percentile intervals
+
+    Usage:
+        stats = RegressionStats()
+        for X, y in holdout_chunks:
+            stats.update(y, model.predict(X))
+        print(stats.result())
+"""
+
+import numpy as np
+from joblib import Parallel, delayed, cpu_count
+
+METRICS = ('score', 'rmse', 'mae', 'r2')
+
+
+class RegressionStats:
+    def __init__(self):
+        self.n = 0
+        self.mean_y = 0.0
+        self.ss_y = 0.0
+        self.sse_raw = 0.0
+        self.sse = 0.0
+        self.sae = 0.0
+
+    def update(self, y_true, y_pred):
+        y_true = np.asarray(y_true, dtype=np.float64).ravel()
+        y_pred = np.asarray(y_pred, dtype=np.float64).ravel()
+        if not len(y_true):
+            return self
+        chunk = RegressionStats()
+        chunk.n = len(y_true)
+        chunk.mean_y = float(y_true.mean())
+        centered = y_true - chunk.mean_y
+        residual = y_true - y_pred
+        chunk.ss_y = float(centered @ centered)
+        chunk.sse_raw = float(residual @ residual)
+        # Clipping at 0 only changes the residual of negative predictions
+        np.subtract(y_true, y_pred.clip(min=0), out=residual)
+        chunk.sse = float(residual @ residual)
+        chunk.sae = float(np.abs(residual, out=residual).sum())
+        return self.merge(chunk)
+
+    def merge(self, other):
+        if other.n == 0:
+            return self
+        n = self.n + other.n
+        delta = other.mean_y - self.mean_y
+        self.ss_y += other.ss_y + delta * delta * self.n * other.n / n
+        self.mean_y += delta * other.n / n
+        self.n = n
+        self.sse_raw += other.sse_raw
+        self.sse += other.sse
+        self.sae += other.sae
+        return self
+
+    def result(self):
+        if self.n == 0:
+            raise ValueError("No samples to evaluate")
+        return {
+            'score': _r2(self.sse_raw, self.ss_y),
+            'rmse': np.sqrt(self.sse / self.n),
+            'mae': self.sae / self.n,
+            'r2': _r2(self.sse, self.ss_y),
+            'n': self.n
+        }
+
+
+def _r2(sse, ss_y):
+    # Constant y_true: 1 for a perfect fit, 0 otherwise (as sklearn's r2_score)
+    if ss_y <= 0:
+        return 1.0 if sse == 0 else 0.0
+    return 1 - sse / ss_y
+
+
+def regression_metrics(y_true, y_pred, chunk_size=None):
+    y_true = np.asarray(y_true)
+    y_pred = np.asarray(y_pred)
+    stats = RegressionStats()
+    step = chunk_size or max(len(y_true), 1)
+    for start in range(0, len(y_true), step):
+        stats.update(y_true[start:start + step], y_pred[start:start + step])
+    return stats.result()
+
+
+def _bootstrap_block(y_true, residual_raw, residual, n_boot, seed):
+    rng = np.random.default_rng(seed)
+    n = len(y_true)
+    out = np.empty((n_boot, len(METRICS)))
+    for b in range(n_boot):
+        idx = rng.integers(0, n, n)
+        y = y_true.take(idx)
+        r_raw = residual_raw.take(idx)
+        r = residual.take(idx)
+        centered = y - y.mean()
+        ss_y = centered @ centered
+        sse = r @ r
+        out[b] = (_r2(r_raw @ r_raw, ss_y), np.sqrt(sse / n), np.abs(r).mean(), _r2(sse, ss_y))
+    return out
+
+
+def bootstrap_ci(y_true, y_pred, n_boot=1000, alpha=0.05, n_jobs=-1, seed=42):
+    y_true = np.ascontiguousarray(y_true, dtype=np.float64)
+    y_pred = np.asarray(y_pred, dtype=np.float64)
+    residual_raw = y_true - y_pred
+    residual = y_true - y_pred.clip(min=0)
+
+    n_workers = cpu_count() if n_jobs is None or n_jobs < 0 else max(1, n_jobs)
+    n_blocks = max(1, min(n_workers, n_boot))
+    sizes = [len(block) for block in np.array_split(np.arange(n_boot), n_blocks)]
+    seeds = np.random.SeedSequence(seed).spawn(n_blocks)
+    blocks = Parallel(n_jobs=n_blocks)(
+        delayed(_bootstrap_block)(y_true, residual_raw, residual, size, block_seed)
+        for size, block_seed in zip(sizes, seeds)
+    )
+    replicates = np.concatenate(blocks)
+    low, high = np.percentile(replicates, [100 * alpha / 2, 100 * (1 - alpha / 2)], axis=0)
+    return {metric: (float(low[i]), float(high[i])) for i, metric in enumerate(METRICS)}
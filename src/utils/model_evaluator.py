@@ -2,95 +2,109 @@
     Handles model evaluation and visualization of results.
     
     Methods:
-        evaluate_models(models, X_test, y_test):
-            Evaluates all models and computes performance metrics
+        evaluate_models(models, X_test, y_test, bootstrap=0, alpha=0.05):
+            Predicts each model once and computes all metrics in one pass
+            (utils/metrics.py)
             Returns: Dictionary containing for each model:
-                - Predictions
-                - Probabilities
-                - Confusion Matrix
-                - Classification Report
-                - ROC AUC Score
+                - score, rmse, mae, r2
+                - predictions (clipped at 0)
+                - ci: bootstrap (low, high) per metric, if bootstrap > 0
+
+        evaluate_stream(models, chunks):
+            Same metrics accumulated over (X, y) chunks of a holdout that
+            does not fit in memory
             
-        plot_results(results, y_test):
+        evaluate_oof(oof_predictions, y_train):
+            Cross-validation RMSE, MAE and R² from out-of-fold predictions
+            (ModelTrainer.oof_predictions) without repredicting, pooled over
+            the folds and clipped at 0 like the test metrics
+
+        plot_results(results, y_test, data_path="data/"):
             Creates visualization of model performance
-            - ROC curves for all models
-            - Confusion matrices
-            - Performance comparison plots
-    
+            - Actual vs predicted (sampled or hexbin above max_points)
+            - Error distribution per model
+
+    The plot methods hand the figures to a Reporter (utils/reporting.py),
+    which renders them in background processes or inline, or drops them
+    when plotting is disabled.
+
     Usage:
-        evaluator = ModelEvaluator()
+        evaluator = ModelEvaluator(Reporter(workers=1), max_points=5000)
         results = evaluator.evaluate_models(trained_models, X_test, y_test)
         evaluator.plot_results(results, y_test)
 """
 
-import matplotlib.pyplot as plt
-import seaborn as sns
-from sklearn.metrics import mean_squared_error, r2_score, mean_absolute_error
 import numpy as np
-import pandas as pd
+from utils.metrics import RegressionStats, regression_metrics, bootstrap_ci
+from utils.reporting import (
+    Reporter, dense_scatter_data, boxplot_stats,
+    render_correlation, render_predictions, render_error_boxplot, render_feature_importance
+)
 
 class ModelEvaluator:
-    def evaluate_models(self, models, X_test, y_test):
+    def __init__(self, reporter=None, max_points=5000, dense_mode='sample'):
+        # Without a reporter the figures are rendered inline
+        self.reporter = reporter if reporter is not None else Reporter(workers=0)
+        self.max_points = max_points
+        self.dense_mode = dense_mode
+
+    def evaluate_models(self, models, X_test, y_test, bootstrap=0, alpha=0.05):
+        # One predict per model; score (R² of the raw predictions) and the
+        # metrics of the clipped predictions come from the same pass
         results = {}
         for name, model in models.items():
             y_pred = model.predict(X_test)
-            y_pred = np.maximum(0, y_pred)  # Ensure non-negative
-            
+            metrics = regression_metrics(y_test, y_pred)
+
             results[name] = {
-                'score': model.score(X_test, y_test),
-                'rmse': np.sqrt(mean_squared_error(y_test, y_pred)),
-                'mae': mean_absolute_error(y_test, y_pred),
-                'r2': r2_score(y_test, y_pred),
-                'predictions': y_pred
+                'score': metrics['score'],
+                'rmse': metrics['rmse'],
+                'mae': metrics['mae'],
+                'r2': metrics['r2'],
+                'predictions': np.maximum(0, y_pred)  # Ensure non-negative
             }
+            if bootstrap:
+                results[name]['ci'] = bootstrap_ci(y_test, y_pred, n_boot=bootstrap, alpha=alpha)
+        return results
+
+    def evaluate_stream(self, models, chunks):
+        # Holdouts that do not fit in memory: (X, y) chunks, predictions discarded
+        stats = {name: RegressionStats() for name in models}
+        for X_chunk, y_chunk in chunks:
+            for name, model in models.items():
+                stats[name].update(y_chunk, model.predict(X_chunk))
+        return {name: stat.result() for name, stat in stats.items()}
+
+    def evaluate_oof(self, oof_predictions, y_train):
+        # Cross-validation metrics from the trainer's out-of-fold predictions,
+        # without predicting the training set again
+        results = {}
+        for name, y_pred in oof_predictions.items():
+            metrics = regression_metrics(y_train, y_pred)
+            results[name] = {key: metrics[key] for key in ('rmse', 'mae', 'r2')}
         return results
 
     def plot_correlation_matrix(self, data_path, df):
-        # Plot correlation matrix
+        # The matrix is small; only the drawing goes to the reporter
         corr_matrix = df.corr(numeric_only=True)
-        plt.figure(figsize=(12, 8))
-        sns.heatmap(corr_matrix, annot=True, fmt=".2f", cmap="coolwarm", square=True)
-        plt.title("Correlation Matrix")
-        plt.tight_layout()
-        plt.savefig(f"{data_path}correlation_matrix.png")
+        self.reporter.submit(render_correlation, f"{data_path}correlation_matrix.png", corr_matrix)
 
-    def plot_results(self, results, y_test):
+    def plot_results(self, results, y_test, data_path="data/"):
         # Helps visualize how well the model predicts the target.
-        plt.figure(figsize=(10, 6))
-        for name, result in results.items():
-            plt.scatter(y_test, result['predictions'], label=name, alpha=0.5)
-        plt.plot([y_test.min(), y_test.max()], [y_test.min(), y_test.max()], 'k--')
-        plt.xlabel("Actual")
-        plt.ylabel("Predicted")
-        plt.legend()
-        plt.title("Actual vs Predicted")
-        plt.grid(True)
-        plt.savefig(f"data/predictions.png")
-        
-        plt.figure(figsize=(10, 6))
-        residuals_data = [
-            pd.DataFrame({'Model': name, 'Error': y_test - result['predictions']})
-            for name, result in results.items()
-        ]
-        all_residuals = pd.concat(residuals_data)
-        sns.boxplot(data=all_residuals, x='Model', y='Error')
-        plt.title("Error Distribution per Model")
-        plt.axhline(0, color='k', linestyle='--')
-        plt.grid(True)
-        plt.savefig(f"data/boxplot.png")
+        # Large holdouts are reduced here, so the workers get at most
+        # max_points per model (except in 'hexbin' mode)
+        y_true = np.asarray(y_test)
+        predictions = {name: result['predictions'] for name, result in results.items()}
+        payload = dense_scatter_data(y_true, predictions, self.max_points, self.dense_mode)
+        self.reporter.submit(render_predictions, f"{data_path}predictions.png", payload)
+
+        residuals = {name: y_true - y_pred for name, y_pred in predictions.items()}
+        self.reporter.submit(render_error_boxplot, f"{data_path}boxplot.png", boxplot_stats(residuals, self.max_points))
 
-        
     def plot_feature_importance(self, data_path, trained_models, tree_models, feature_columns):
         for model_name in tree_models:
             if model_name in trained_models:
                 model = trained_models[model_name]
                 if hasattr(model, 'feature_importances_'):
-                    plt.figure(figsize=(10, 6))
-                    importances = model.feature_importances_
-                    indices = np.argsort(importances)
-                    plt.title(f'Feature Importance - {model_name}')
-                    plt.barh(range(len(indices)), importances[indices], color='b', align='center')
-                    plt.yticks(range(len(indices)), [feature_columns[i] for i in indices])
-                    plt.xlabel('Relative Importance')
-                    plt.tight_layout()
-                    plt.savefig(f"{data_path}{model_name}_feature_importance.png")
+                    self.reporter.submit(render_feature_importance, f"{data_path}{model_name}_feature_importance.png",
+                                         model_name, np.asarray(model.feature_importances_), list(feature_columns))
@@ -1,41 +1,71 @@
 """
-    Handles all data preprocessing steps including scaling and imputation.
-    
+    Handles model training and cross-validation.
+
     Attributes:
-        scaler: MinMaxScaler instance for feature scaling
-        imputer: SimpleImputer instance for handling missing values
-    
+        config: Config instance with the models and parallelism settings
+        models: Dictionary of estimators to train (Config.build_models())
+        timings: Per-model wall time of the full fit and of every CV fold,
+                 filled by train_models
+        oof_predictions: Per-model out-of-fold predictions of the training
+                         set, filled by train_models
+
     Methods:
-        preprocess(df):
-            Performs initial data cleaning and feature engineering
-            - Removes unnecessary columns
-            - Extracts time features
-            - Creates target variable
-            Returns: Preprocessed DataFrame
-            
-        prepare_features(df):
-            Separates features and target variables
-            Returns: (features DataFrame, target Series)
-            
-        fit_transform(X_train, X_test):
-            Applies scaling and imputation to training and test data
-            Returns: (transformed X_train, transformed X_test)
-    
+        split_data(X, y):
+            Splits features and target into train and test sets
+            Returns: (X_train, X_test, y_train, y_test)
+
+        fold_cache(X, y):
+            Returns: FoldCache with the CV folds of X, built once and reused
+            while the same X and y are passed
+
+        train_models(X_train, y_train):
+            Fits every model and runs K-fold cross-validation. Every
+            (model, fold) fit is scheduled as an independent task on a
+            joblib pool of Config.N_JOBS workers using Config.PARALLEL_BACKEND
+            ('loky' for processes, 'threading' for threads). Estimators that
+            expose n_jobs (RandomForest, XGBoost) get cpu_count // workers
+            threads each so the cores are not oversubscribed. All models
+            share the fold arrays of fold_cache; fold fits only return their
+            validation predictions, which are kept in oof_predictions.
+            Returns: Dictionary of fitted models
+
     Usage:
-        preprocessor = DataPreprocessor()
-        df = preprocessor.preprocess(raw_df)
-        X, y = preprocessor.prepare_features(df)
-        X_train_scaled, X_test_scaled = preprocessor.fit_transform(X_train, X_test)
+        trainer = ModelTrainer(config)
+        X_train, X_test, y_train, y_test = trainer.split_data(X, y)
+        trained_models = trainer.train_models(X_train, y_train)
+        print(trainer.timings['random_forest']['folds'])
 """
 
-from sklearn.model_selection import train_test_split, cross_val_score
+from sklearn.base import clone
+from sklearn.model_selection import train_test_split, KFold
 from sklearn.metrics import mean_squared_error
+from joblib import Parallel, delayed, cpu_count
 import numpy as np
+import time
+from utils.fold_cache import FoldCache
+from utils import instrumentation
+
+
+def _fit_task(name, fold, model, X_fit, y_fit, X_val=None):
+    """
+    Fits one (model, fold) pair. fold is None for the fit on the full
+    training set, which returns the fitted model; CV folds only return
+    their validation predictions.
+    """
+    start = time.perf_counter()
+    model.fit(X_fit, y_fit)
+    if fold is None:
+        return name, fold, model, None, time.perf_counter() - start
+    return name, fold, None, model.predict(X_val), time.perf_counter() - start
+
 
 class ModelTrainer:
     def __init__(self, config):
         self.config = config
-        self.models = config.MODELS
+        self.models = config.build_models()
+        self.timings = {}
+        self.oof_predictions = {}
+        self._fold_cache = None
 
     def split_data(self, X, y):
         return train_test_split(
@@ -44,21 +74,75 @@ class ModelTrainer:
             random_state=self.config.RANDOM_STATE
         )
 
+    def cv_splits(self, X):
+        # Same folds cross_val_score(cv=CV_FOLDS) uses for regressors
+        return list(KFold(n_splits=self.config.CV_FOLDS).split(X))
+
+    def fold_cache(self, X, y):
+        # Built once per training set and shared by every model (and the tuner)
+        if self._fold_cache is None or not self._fold_cache.matches(X, y):
+            self._fold_cache = FoldCache(X, y, splits=self.cv_splits(X))
+        return self._fold_cache
+
+    def _n_workers(self, n_tasks):
+        n_jobs = self.config.N_JOBS
+        n_cpus = cpu_count()
+        if n_jobs is None or n_jobs == 0:
+            n_jobs = 1
+        elif n_jobs < 0:
+            n_jobs = max(1, n_cpus + 1 + n_jobs)
+        return max(1, min(n_jobs, n_tasks))
+
+    def _with_thread_budget(self, model, threads):
+        # Give multi-threaded estimators their share of the cores
+        model = clone(model)
+        if 'n_jobs' in model.get_params():
+            model.set_params(n_jobs=threads)
+        return model
+
     def train_models(self, X_train, y_train):
-        trained_models = {}
+        with instrumentation.stage('fold_cache'):
+            folds = self.fold_cache(X_train, y_train)
+        n_tasks = len(self.models) * (len(folds) + 1)
+        n_workers = self._n_workers(n_tasks)
+        threads = max(1, cpu_count() // n_workers)
+
+        tasks = []
         for name, model in self.models.items():
-            model.fit(X_train, y_train)
-            
-            score = model.score(X_train, y_train)
-            print(f"{name} | Training Score: {score:.2f}")
-            
-            # Optional: Cross-validation
-            cv_scores = cross_val_score(
-                model, X_train, y_train, 
-                cv=5, scoring='neg_mean_squared_error'
-            )
-            rmse_cv = np.sqrt(-cv_scores.mean())
+            # The final model keeps the caller's X_train (and its column names)
+            tasks.append((name, None, self._with_thread_budget(model, threads), X_train, y_train, None))
+            for fold in range(len(folds)):
+                X_fit, y_fit, X_val, _ = folds.fold(fold)
+                tasks.append((name, fold, self._with_thread_budget(model, threads), X_fit, y_fit, X_val))
+
+        results = Parallel(n_jobs=n_workers, backend=self.config.PARALLEL_BACKEND)(
+            delayed(_fit_task)(*task) for task in tasks
+        )
+
+        trained_models = {}
+        fold_predictions = {name: [None] * len(folds) for name in self.models}
+        self.timings = {name: {'fit': 0.0, 'folds': [None] * len(folds)} for name in self.models}
+        for name, fold, model, predictions, elapsed in results:
+            if fold is None:
+                trained_models[name] = model
+                self.timings[name]['fit'] = elapsed
+            else:
+                fold_predictions[name][fold] = predictions
+                self.timings[name]['folds'][fold] = elapsed
+
+        print(f"CV folds materialized once in {folds.build_time:.3f}s and shared by {len(self.models)} models")
+        self.oof_predictions = {}
+        for name in self.models:
+            self.oof_predictions[name] = folds.assemble(fold_predictions[name])
+            fold_mse = [
+                mean_squared_error(folds.fold(i)[3], predictions)
+                for i, predictions in enumerate(fold_predictions[name])
+            ]
+            # As cross_val_score: mean of the per-fold MSE, raw predictions
+            rmse_cv = np.sqrt(np.mean(fold_mse))
             print(f"{name} | Training Cross Validation RMSE: {rmse_cv:.2f}")
-            
-            trained_models[name] = model
-        return trained_models
\ No newline at end of file
+            fold_times = ", ".join(f"{t:.2f}s" for t in self.timings[name]['folds'])
+            print(f"{name} | Fit: {self.timings[name]['fit']:.2f}s | CV folds: {fold_times}")
+
+        # Keep the insertion order of Config.MODELS
+        return {name: trained_models[name] for name in self.models}
@@ -0,0 +1,345 @@
+"""
+    Out-of-core training for datasets larger than memory.
+
+    The feature arrays are streamed from the loader, one CSV chunk
+    (loader.chunksize rows) at a time, once per pass and never
+    concatenated; the feature cache is bypassed, since its entries hold
+    whole files. A row belongs
+    to the test set when the hash of its timestamp (splitmix64, seeded with
+    RANDOM_STATE) falls below TEST_SIZE, so the split needs no shuffle of the
+    full set, does not depend on file order or chunk sizes, and repeated
+    readings of the same instant stay on the same side. Per model:
+        linear_regression  one pass of least-squares sufficient statistics
+                           (incremental_trainer.linear_stats), merged chunk
+                           by chunk and solved exactly
+        xgboost            trained from an ExtMemQuantileDMatrix fed by a
+                           DataIter over the training rows; the quantized
+                           pages are cached on disk under CACHE_PATH
+        random_forest      warm_start groups of trees, each group fitted on a
+                           fresh uniform sample of the training rows
+        decision_tree      fitted on the first random forest sample
+
+    The memory budget (MEMORY_BUDGET_MB) covers the whole process. What is
+    left after the RSS the trainer starts with, CHUNK_COPIES copies of a
+    chunk in flight and the fitted trees sizes the samples and the
+    XGBoost batches. Half of it goes to the first sample, which is kept for
+    the decision tree and the export calibration; once the first trees are
+    fitted, the next samples are shrunk so that the projected forest fits as
+    well. XGBoost keeps its gradients and predictions (about 12 bytes per
+    training row) in memory.
+
+    Attributes:
+        config: Config instance
+        loader: StreamingCSVLoader the chunks are streamed from
+        budget_bytes (int): Memory budget of the process
+        models: Dictionary of estimators to train (Config.build_models())
+        timings: Per-model wall time of the fit, filled by train_models
+        n_train / n_test (int): Rows on each side of the split, after scan()
+        train_sample: Uniform (X, y) sample of the training rows (at most
+                      export_rows), used to calibrate the fixed-point export
+        test_sample: Uniform (X, y) sample of the test rows (at most
+                     export_rows), filled by test_chunks()
+
+    Methods:
+        scan():
+            First pass: row counts, largest chunk and linear statistics
+
+        sample(rows, stream=0):
+            Returns: (X float32, y float64) uniform sample of about rows
+            training rows, one generator stream per sample
+
+        train_models():
+            Fits every model with the passes described above
+            Returns: Dictionary of fitted models
+
+        test_chunks():
+            Yields: (X, y) test rows per chunk, for ModelEvaluator.evaluate_stream
+
+    Functions:
+        hash_split(timestamps, test_size, seed):
+            Returns: Boolean mask of the test rows
+
+    Usage:
+        trainer = OutOfCoreTrainer(config, loader)
+        trained_models = trainer.train_models()
+        results = ModelEvaluator().evaluate_stream(trained_models, trainer.test_chunks())
+"""
+
+import math
+import os
+import tempfile
+import time
+import numpy as np
+from joblib import cpu_count
+from utils import instrumentation
+from utils.incremental_trainer import linear_stats, merge_linear_stats, solve_linear_stats
+
+# Per row and fitting thread: the tree builder's sample indices, bootstrap
+# weights, feature values and target copy
+TREE_BUILD_BYTES = 32
+# Copies of a chunk alive at once: the loaded table, its feature matrix,
+# the masked rows, the rows kept by a sample and the parser heap the
+# allocator keeps after a CSV chunk (measured on 1M-row files)
+CHUNK_COPIES = 6
+# Smallest sample, even when the forest alone exceeds the budget
+MIN_SAMPLE_ROWS = 1000
+# sklearn tree node record, plus its float64 value
+TREE_NODE_BYTES = 64 + 8
+
+
+def _mix(x):
+    # splitmix64 finalizer
+    x = (x ^ (x >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+    x = (x ^ (x >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+    return x ^ (x >> np.uint64(31))
+
+
+def hash_split(timestamps, test_size, seed):
+    """
+    A row's side depends only on its timestamp and the seed. NaT rows all
+    fall on the same side.
+    """
+    keys = np.asarray(timestamps, dtype='datetime64[ns]').view(np.uint64)
+    keys = keys + np.uint64((seed * 0x9E3779B97F4A7C15) % (1 << 64))
+    return (_mix(keys) >> np.uint64(11)) / float(1 << 53) < test_size
+
+
+def _batch_iter(make_batches, feature_names, cache_prefix):
+    """xgboost.DataIter over the batches of make_batches(), restarted on reset."""
+    import xgboost as xgb
+
+    class BatchIter(xgb.DataIter):
+        def __init__(self):
+            self._batches = None
+            super().__init__(cache_prefix=cache_prefix, release_data=True)
+
+        def next(self, input_data):
+            if self._batches is None:
+                self._batches = make_batches()
+            batch = next(self._batches, None)
+            if batch is None:
+                return False
+            input_data(data=batch[0], label=batch[1], feature_names=feature_names)
+            return True
+
+        def reset(self):
+            self._batches = None
+
+    return BatchIter()
+
+
+def _tree_bytes(tree):
+    return tree.tree_.node_count * TREE_NODE_BYTES
+
+
+class OutOfCoreTrainer:
+    def __init__(self, config, loader, budget_mb=None, export_rows=10_000):
+        self.config = config
+        self.loader = loader
+        self.budget_bytes = int((budget_mb or config.MEMORY_BUDGET_MB) * 2**20)
+        self.export_rows = export_rows
+        self.models = config.build_models()
+        self.timings = {}
+        self.n_train = self.n_test = self.max_chunk_rows = self.n_features = 0
+        self.train_sample = self.test_sample = None
+        self._linear_stats = None
+        self._first_sample = None
+        # The budget is accounted from the process as it is before any data
+        self._base_bytes = instrumentation.rss_bytes() or 0
+        self._model_bytes = 0
+
+    def _chunks(self):
+        # (X, y, test mask) per chunk
+        for X, y, t in self.loader.iter_arrays(timestamps=True, cached=False):
+            yield X, y, hash_split(t, self.config.TEST_SIZE, self.config.RANDOM_STATE)
+
+    def _train_chunks(self):
+        for X, y, test in self._chunks():
+            yield X[~test], y[~test]
+
+    def test_chunks(self):
+        fraction = min(1.0, self.export_rows / max(self.n_test, 1))
+        rng = np.random.default_rng([self.config.RANDOM_STATE, 0])
+        kept = []
+        for X, y, test in self._chunks():
+            X_test, y_test = X[test], y[test]
+            keep = rng.random(len(y_test)) < fraction
+            kept.append((X_test[keep], y_test[keep]))
+            yield X_test, y_test
+        if kept:
+            self.test_sample = (np.concatenate([X for X, _ in kept])[:self.export_rows],
+                                np.concatenate([y for _, y in kept])[:self.export_rows])
+
+    def scan(self):
+        self.n_train = self.n_test = self.max_chunk_rows = 0
+        linear = any(type(model).__name__ == 'LinearRegression' for model in self.models.values())
+        with instrumentation.stage('scan'):
+            for X, y, test in self._chunks():
+                self.n_features = X.shape[1]
+                self.max_chunk_rows = max(self.max_chunk_rows, len(y))
+                n_test = int(test.sum())
+                self.n_test += n_test
+                if n_test == len(y):
+                    continue
+                self.n_train += len(y) - n_test
+                if linear:
+                    stats = linear_stats(X[~test], y[~test])
+                    self._linear_stats = stats if self._linear_stats is None else merge_linear_stats(self._linear_stats, stats)
+        if not self.n_train:
+            raise FileNotFoundError(f"No training rows in {self.loader.data_path} ({self.loader.pattern})")
+        print(f"Out-of-core | {self.n_train:,} training rows | {self.n_test:,} test rows | "
+              f"largest chunk: {self.max_chunk_rows:,} rows")
+
+    def _available_bytes(self):
+        # Budget left once the process, a chunk in flight and the fitted
+        # trees are accounted for (float32 features, target, timestamp). A
+        # chunk is read with chunksize rows, before any downsampling
+        chunk_bytes = self.loader.chunksize * (4 * self.n_features + 16) * CHUNK_COPIES
+        held = sum(array.nbytes for array in self._first_sample) if self._first_sample is not None else 0
+        return self.budget_bytes - self._base_bytes - chunk_bytes - self._model_bytes - held
+
+    def _row_bytes(self, threads=1):
+        # float32 features, float64 target and the tree builder's arrays
+        return 4 * self.n_features + 8 + threads * TREE_BUILD_BYTES
+
+    def _threads(self, model):
+        if 'n_jobs' not in model.get_params():
+            return 1
+        # One model is fitted at a time, so it gets every configured worker
+        n_jobs = self.config.N_JOBS
+        model.set_params(n_jobs=n_jobs)
+        if n_jobs is None or n_jobs == 0:
+            return 1
+        return max(1, cpu_count() + 1 + n_jobs) if n_jobs < 0 else n_jobs
+
+    def sample(self, rows, stream=0):
+        rows = int(min(rows, self.n_train))
+        fraction = rows / self.n_train
+        rng = np.random.default_rng([self.config.RANDOM_STATE, stream])
+        # Preallocated, so the sample is never held twice
+        X_sample = np.empty((rows, self.n_features), dtype=np.float32)
+        y_sample = np.empty(rows, dtype=np.float64)
+        filled = 0
+        with instrumentation.stage('sample'):
+            for X, y in self._train_chunks():
+                if fraction < 1:
+                    keep = rng.random(len(y)) < fraction
+                    X, y = X[keep], y[keep]
+                n = min(len(y), rows - filled)
+                X_sample[filled:filled + n] = X[:n]
+                y_sample[filled:filled + n] = y[:n]
+                filled += n
+        return X_sample[:filled], y_sample[:filled]
+
+    def _first_sample_rows(self, threads):
+        # Half of what is left; the other half waits until the trees' size is known
+        available = self._available_bytes()
+        rows = available // 2 // self._row_bytes(threads)
+        if rows < 1:
+            raise ValueError(f"MEMORY_BUDGET_MB={self.budget_bytes / 2**20:.0f} leaves no room for a training sample "
+                             f"(process: {self._base_bytes / 2**20:.0f} MB, "
+                             f"chunks of {self.loader.chunksize:,} rows)")
+        return rows
+
+    def _fit_linear(self, model):
+        return solve_linear_stats(self._linear_stats, model)
+
+    def _fit_xgboost(self, model):
+        import xgboost as xgb
+        from sklearn.base import clone
+
+        params = {key: value for key, value in model.get_xgb_params().items() if value is not None}
+        params['tree_method'] = 'hist'
+        gradient_bytes = 12 * self.n_train
+        if gradient_bytes > self._available_bytes():
+            print(f"Out-of-core | xgboost gradients need {gradient_bytes / 2**20:.0f} MB, above the budget")
+        batch_rows = max(1, min(self.max_chunk_rows, self._available_bytes() // 2 // self._row_bytes()))
+
+        def batches():
+            for X, y in self._train_chunks():
+                for start in range(0, len(y), batch_rows):
+                    yield X[start:start + batch_rows], y[start:start + batch_rows]
+
+        cache_path = self.config.CACHE_PATH.lstrip('/\\')
+        os.makedirs(cache_path, exist_ok=True)
+        with tempfile.TemporaryDirectory(prefix="xgboost-", dir=cache_path) as pages:
+            with instrumentation.stage('xgboost_pages'):
+                data = xgb.ExtMemQuantileDMatrix(
+                    _batch_iter(batches, self.loader.preprocessor.feature_columns, os.path.join(pages, "pages")),
+                    max_bin=params.get('max_bin', 256)
+                )
+            booster = xgb.train(params, data, num_boost_round=model.n_estimators or 100)
+            del data
+        fitted = clone(model)
+        fitted.load_model(bytearray(booster.save_raw('ubj')))
+        return fitted
+
+    def _fit_tree(self, model):
+        if self._first_sample is None:
+            self._first_sample = self.sample(self._first_sample_rows(self._threads(model)), stream=1)
+        model.fit(*self._first_sample)
+        if hasattr(model, 'tree_'):
+            self._model_bytes += _tree_bytes(model)
+        return model
+
+    def _fit_forest(self, model):
+        total = model.get_params()['n_estimators']
+        threads = self._threads(model)
+        if self._first_sample is None:
+            self._first_sample = self.sample(self._first_sample_rows(threads), stream=1)
+        X_sample, y_sample = self._first_sample
+        # One group per sample, enough samples to cover the training rows once
+        n_groups = 1 if len(y_sample) >= self.n_train else min(total, math.ceil(self.n_train / len(y_sample)))
+        groups = [len(group) for group in np.array_split(np.arange(total), n_groups)]
+
+        model.set_params(warm_start=True, n_estimators=0)
+        for i, n_trees in enumerate(groups):
+            if i > 0:
+                X_sample, y_sample = self.sample(rows, stream=i + 1)
+            model.set_params(n_estimators=model.n_estimators + n_trees)
+            model.fit(X_sample, y_sample)
+            del X_sample, y_sample
+
+            # Next sample: what is left once the remaining trees are grown
+            fitted = len(model.estimators_)
+            tree_bytes = sum(_tree_bytes(tree) for tree in model.estimators_) / fitted
+            remaining = self._available_bytes() - tree_bytes * total
+            rows = max(MIN_SAMPLE_ROWS, int(remaining // self._row_bytes(threads)))
+            if remaining <= 0 and fitted < total:
+                print(f"Out-of-core | random forest of {total} trees is projected above the budget "
+                      f"({tree_bytes * total / 2**20:.0f} MB)")
+        model.set_params(warm_start=False)
+        self._model_bytes += sum(_tree_bytes(tree) for tree in model.estimators_)
+        print(f"Out-of-core | random forest: {total} trees in {len(groups)} groups of sampled rows")
+        return model
+
+    def train_models(self):
+        if not self.n_train:
+            self.scan()
+        trained_models = {}
+        for name, model in self.models.items():
+            class_name = type(model).__name__
+            start = time.perf_counter()
+            if class_name == 'LinearRegression':
+                trained_models[name] = self._fit_linear(model)
+            elif class_name == 'XGBRegressor':
+                trained_models[name] = self._fit_xgboost(model)
+            elif class_name == 'RandomForestRegressor':
+                trained_models[name] = self._fit_forest(model)
+            else:
+                # Other estimators are fitted on the first sample
+                trained_models[name] = self._fit_tree(model)
+            self.timings[name] = {'fit': time.perf_counter() - start, 'folds': []}
+            print(f"{name} | Out-of-core fit: {self.timings[name]['fit']:.2f}s")
+
+        if self._first_sample is None:
+            self._first_sample = self.sample(self.export_rows, stream=1)
+        X_sample, y_sample = self._first_sample
+        step = max(1, len(y_sample) // self.export_rows)
+        self.train_sample = (X_sample[::step][:self.export_rows].copy(), y_sample[::step][:self.export_rows].copy())
+        self._first_sample = None
+
+        peak = instrumentation.peak_rss_bytes()
+        if peak is not None:
+            print(f"Out-of-core | Peak RSS: {peak / 2**20:.0f} MB of a {self.budget_bytes / 2**20:.0f} MB budget")
+        return trained_models
@@ -0,0 +1,264 @@
+"""
+    Raw readings -> time features -> imputation -> scaling -> model, as one
+    fitted unit.
+
+    CompiledPipeline captures a fitted model together with the imputer and
+    scaler it was trained behind and the feature list, and folds the
+    preprocessing into the model once, at compile time:
+        - tree ensembles (tree_predictor.CompiledTreeEnsemble): every split
+          threshold on a scaled feature is replaced by the equivalent
+          threshold on the raw float32 feature (exact: the largest raw value
+          that the scaler maps to the left side), and the imputer's fill
+          value decides the direction NaN inputs take at every node
+        - linear regression: coef / scale and the shifted intercept, so the
+          whole pipeline is one dot product after NaN filling
+    Scoring then needs no preprocessing pass and no DataFrame:
+    predict_raw(timestamps, temperatura, humidade) builds the float32
+    feature matrix with NumPy and goes straight to the folded model. Models
+    trained with rolling window features get them from WindowFeatures over
+    the readings passed in (one series in time order, or one per starts
+    offset), or continue the running windows given per reading with
+    WindowFeatures.update (e.g. one per node of a live feed); the window
+    length is read from the feature names, and minutos_desde_rega follows
+    the irrigation rules the model was trained with.
+
+    Models that cannot be folded are scored with the estimator after the
+    same imputation and scaling as DataPreprocessor (float64, mean then
+    scale), which is also the path for batches above max_compiled_rows.
+
+    Attributes:
+        features (list): Model input columns, a subset of FEATURES and
+                         the window features
+        window_minutes (int): Window length of the window features, or None
+        rules: IrrigationRules of the window features (None: the defaults)
+        predictor: Folded NumPy predictor, or None
+        kind (str): 'tree', 'linear' or None
+        fill, mean, scale: Fitted imputer/scaler statistics (or None)
+
+    Methods:
+        predict_raw(timestamps, temperatura, humidade, max_compiled_rows=None, starts=None, windows=None):
+            windows: WindowFeatures each reading is added to, in order
+            Returns: Irrigation time predictions (not clipped)
+        window_features():
+            Returns: New WindowFeatures of the model's window and rules
+        predict(X, max_compiled_rows=None):
+            Same from a raw feature matrix ordered like FEATURES (then the
+            window features)
+        transform(X):
+            Returns: Imputed and scaled features, as sklearn computes them
+        arrays():
+            Returns: (numeric tables, scalar parameters) for the artifact store
+
+    Functions:
+        compile_pipeline(model, imputer=None, scaler=None, features=FEATURES):
+            Returns: CompiledPipeline
+        pipeline_from_arrays(arrays, kind, params, features, estimator_loader=None):
+            Returns: CompiledPipeline around stored (e.g. memory-mapped) tables
+
+    Usage:
+        pipeline = compile_pipeline(model, preprocessor.imputer, preprocessor.scaler, preprocessor.feature_columns)
+        y_pred = pipeline.predict_raw(timestamps, temperatura, humidade)
+"""
+
+import numpy as np
+from utils.preprocessor import FEATURES, build_feature_matrix
+from utils.tree_predictor import CompiledTreeEnsemble, compile_model
+from utils.window_features import WindowFeatures, window_feature_names, window_minutes
+
+# Tree tables the imputer and scaler are folded into
+FOLDED_TABLES = ('threshold', 'missing_left')
+
+
+def _scaled(x, mean, scale):
+    # DataPreprocessor frames mix float32 and int32 columns, so the imputer and
+    # scaler work in float64; tree estimators compare the float32 cast
+    return ((np.asarray(x, dtype=np.float64) - mean) / scale).astype(np.float32)
+
+
+def _ordered(x):
+    # float32 -> int64 keys in the same order as the values
+    bits = np.asarray(x, dtype=np.float32).view(np.int32).astype(np.int64)
+    return np.where(bits < 0, -(bits & 0x7fffffff), bits)
+
+
+def _from_ordered(keys):
+    bits = np.where(keys < 0, -keys | 0x80000000, keys)
+    return bits.astype(np.uint32).view(np.float32)
+
+
+def raw_thresholds(threshold, mean, scale):
+    """
+    Largest float32 raw value x with _scaled(x) <= threshold, per node, so
+    that x > raw  <=>  _scaled(x) > threshold for every float32 x. Found by
+    bisection over the ordered float32 bit patterns (_scaled is monotonic),
+    32 steps whatever the spacing of float32 values near the threshold.
+    """
+    threshold = np.asarray(threshold, dtype=np.float64)
+    mean = np.asarray(mean, dtype=np.float64)
+    scale = np.asarray(scale, dtype=np.float64)
+    largest = np.finfo(np.float32).max
+    with np.errstate(over='ignore', invalid='ignore'):
+        below = lambda keys: _scaled(_from_ordered(keys), mean, scale) <= threshold
+        low = np.full(len(threshold), _ordered(-largest))
+        high = np.full(len(threshold), _ordered(largest))
+        all_right, all_left = ~below(low), below(high)
+        while True:
+            open_ = (high - low > 1) & ~all_right & ~all_left
+            if not open_.any():
+                break
+            middle = (low + high) // 2
+            left = below(middle)
+            low = np.where(open_ & left, middle, low)
+            high = np.where(open_ & ~left, middle, high)
+    raw = _from_ordered(low).astype(np.float64)
+    raw[all_right] = -np.inf
+    raw[all_left] = np.inf
+    return raw
+
+
+class LinearPredictor:
+    def __init__(self, coef, intercept):
+        self.coef = coef
+        self.intercept = float(intercept)
+
+    def predict(self, X):
+        return np.asarray(X, dtype=np.float64) @ self.coef + self.intercept
+
+
+class CompiledPipeline:
+    def __init__(self, features, predictor=None, kind=None, fill=None, mean=None, scale=None,
+                 estimator=None, estimator_loader=None, rules=None):
+        self.features = list(features)
+        self.predictor = predictor
+        self.kind = kind
+        self.fill = fill
+        self.mean = mean
+        self.scale = scale
+        self._estimator = estimator
+        self._estimator_loader = estimator_loader
+        self.window_minutes = window_minutes(self.features)
+        self.rules = rules
+        inputs = FEATURES + (window_feature_names(self.window_minutes) if self.window_minutes else [])
+        columns = [inputs.index(feature) for feature in self.features]
+        self._columns = None if columns == list(range(len(inputs))) else np.asarray(columns)
+
+    @property
+    def windowed(self):
+        return self.window_minutes is not None
+
+    @property
+    def estimator(self):
+        if self._estimator is None and self._estimator_loader is not None:
+            self._estimator = self._estimator_loader()
+        return self._estimator
+
+    def transform(self, X):
+        X = np.array(X, dtype=np.float64)
+        if self.fill is not None:
+            missing = np.isnan(X)
+            if missing.any():
+                # Float32 columns are filled with the float32 statistic, as sklearn does
+                X[missing] = np.take(self.fill.astype(np.float32), np.nonzero(missing)[1])
+        if self.mean is not None:
+            X -= self.mean
+            X /= self.scale
+        return X
+
+    def predict(self, X, max_compiled_rows=None):
+        X = np.asarray(X)
+        if X.ndim == 1:
+            X = X.reshape(1, -1)
+        if self._columns is not None:
+            X = X[:, self._columns]
+        if self.predictor is None or (max_compiled_rows is not None and len(X) > max_compiled_rows):
+            return self.estimator.predict(self.transform(X))
+        if self.kind == 'linear' and self.fill is not None:
+            missing = np.isnan(X)
+            if missing.any():
+                X = np.where(missing, self.fill.astype(np.float32), X)
+        # Tree thresholds and NaN directions already include the imputer and scaler
+        return self.predictor.predict(X)
+
+    def predict_raw(self, timestamps, temperatura, humidade, max_compiled_rows=None, starts=None, windows=None):
+        X = build_feature_matrix(timestamps, temperatura, humidade)
+        if self.windowed:
+            if windows is not None:
+                features = np.array([w.update(*reading) for w, reading in zip(windows, zip(timestamps, temperatura, humidade))],
+                                    dtype=np.float32).reshape(len(X), -1)
+            else:
+                features = self.window_features().transform(timestamps, temperatura, humidade, starts)
+            X = np.hstack([X, features])
+        return self.predict(X, max_compiled_rows)
+
+    def window_features(self):
+        return WindowFeatures(self.window_minutes, self.rules)
+
+    def arrays(self):
+        arrays, params = {}, {}
+        if self.kind == 'tree':
+            tables, params = self.predictor.arrays()
+            arrays.update({f"tree_{key}": table for key, table in tables.items()})
+        elif self.kind == 'linear':
+            arrays['linear_coef'] = self.predictor.coef
+            params = {'intercept': self.predictor.intercept}
+        for name in ('fill', 'mean', 'scale'):
+            if getattr(self, name) is not None:
+                arrays[f"preprocess_{name}"] = getattr(self, name)
+        return arrays, params
+
+
+def _fold_trees(compiled, fill, mean, scale):
+    feature = compiled.feature
+    internal = ~compiled.is_leaf
+    node_feature = feature[internal]
+    threshold = compiled.threshold.copy()
+    missing_left = compiled.missing_left.copy()
+    if fill is not None:
+        # After imputation NaN is the fill value, so it goes where the fill value goes
+        filled = fill.astype(np.float32)[node_feature]
+        if mean is not None:
+            filled = _scaled(filled, mean[node_feature], scale[node_feature])
+        missing_left[internal] = ~(filled.astype(np.float32) > threshold[internal])
+    if mean is not None:
+        threshold[internal] = raw_thresholds(threshold[internal], mean[node_feature], scale[node_feature])
+    tables, params = compiled.arrays()
+    tables.update(zip(FOLDED_TABLES, (threshold, missing_left)))
+    return CompiledTreeEnsemble.from_arrays(tables, chunk_size=compiled.chunk_size, **params)
+
+
+def compile_pipeline(model, imputer=None, scaler=None, features=FEATURES, rules=None):
+    # Only transformers fitted during training are part of the pipeline
+    fill = np.asarray(imputer.statistics_, dtype=np.float64) if hasattr(imputer, 'statistics_') else None
+    mean = scale = None
+    if hasattr(scaler, 'mean_'):
+        mean = np.asarray(scaler.mean_, dtype=np.float64)
+        scale = np.asarray(scaler.scale_ if scaler.scale_ is not None else np.ones_like(mean), dtype=np.float64)
+
+    compiled = compile_model(model)
+    if compiled is not None:
+        predictor, kind = _fold_trees(compiled, fill, mean, scale), 'tree'
+    elif type(model).__name__ == 'LinearRegression':
+        coef = np.asarray(model.coef_, dtype=np.float64).ravel()
+        intercept = float(np.ravel(model.intercept_)[0])
+        if mean is not None:
+            coef, intercept = coef / scale, intercept - float(coef @ (mean / scale))
+        predictor, kind = LinearPredictor(coef, intercept), 'linear'
+    else:
+        predictor, kind = None, None
+    return CompiledPipeline(features, predictor, kind, fill, mean, scale, estimator=model, rules=rules)
+
+
+def pipeline_from_arrays(arrays, kind, params, features, estimator_loader=None, rules=None):
+    if kind == 'tree':
+        predictor = CompiledTreeEnsemble.from_arrays(
+            {key: arrays[f"tree_{key}"] for key in CompiledTreeEnsemble.TABLES}, **params
+        )
+    elif kind == 'linear':
+        predictor = LinearPredictor(arrays['linear_coef'], params['intercept'])
+    else:
+        predictor = None
+    return CompiledPipeline(
+        features, predictor, kind,
+        fill=arrays.get('preprocess_fill'), mean=arrays.get('preprocess_mean'), scale=arrays.get('preprocess_scale'),
+        estimator_loader=estimator_loader, rules=rules
+    )
@@ -14,61 +14,163 @@
             Returns: Preprocessed DataFrame
 
         prepare_features(df):
-            Separates features and target variables
+            Separates features and target variables; rolling window
+            columns (utils/window_features.py) follow FEATURES when present
             Returns: (features DataFrame, target Series)
 
         fit_transform(X_train, X_test):
             Applies scaling and imputation to training and test data
             Returns: (transformed X_train, transformed X_test)
+
+        compile(model):
+            Fuses the fitted imputer/scaler and feature list with the model
+            Returns: CompiledPipeline (utils/pipeline.py)
+
+    Functions:
+        time_components(timestamps):
+            Extracts year, month, day and hour once as NumPy arrays
+            Returns: (ano, mes, dia, hora, NaT mask)
+
+        encode_time_features(timestamps, out=None, components=None):
+            Fills a float32 matrix ordered like TIME_FEATURES in one batched
+            pass, without copying or mutating the input
+            Returns: (n, 7) float32 array
+
+        build_feature_matrix(timestamps, temperatura, humidade):
+            Returns: (n, 9) float32 array ordered like FEATURES
+
+    The functions only need NumPy; pandas and sklearn are imported by
+    DataPreprocessor when it is used.
 """
 
-from sklearn.preprocessing import StandardScaler
-from sklearn.impute import SimpleImputer
-import pandas as pd
 import numpy as np
+from utils.window_features import is_window_feature
+
+BASIC_FEATURES = ["temperatura", "humidade"]
+TIME_FEATURES = ["ano", "dia_sin", "dia_cos", "mes_sin", "mes_cos", "hora_sin", "hora_cos"]
+FEATURES = BASIC_FEATURES + TIME_FEATURES
+
+# (sin, cos) lookup tables indexed by day (1-31), month (1-12) and hour (0-23)
+_DIA_TABLE = np.column_stack([np.sin(2 * np.pi * np.arange(32) / 31), np.cos(2 * np.pi * np.arange(32) / 31)]).astype(np.float32)
+_MES_TABLE = np.column_stack([np.sin(2 * np.pi * np.arange(13) / 12), np.cos(2 * np.pi * np.arange(13) / 12)]).astype(np.float32)
+_HORA_TABLE = np.column_stack([np.sin(2 * np.pi * np.arange(24) / 24), np.cos(2 * np.pi * np.arange(24) / 24)]).astype(np.float32)
+
+
+def _calendar(days):
+    # Year, month and day of datetime64[D] values
+    years = days.astype('datetime64[Y]')
+    months = days.astype('datetime64[M]')
+    ano = (years.astype(np.int64) + 1970).astype(np.int32)
+    mes = ((months - years).astype(np.int64) + 1).astype(np.int32)
+    dia = ((days - months).astype(np.int64) + 1).astype(np.int32)
+    return ano, mes, dia
+
+
+def time_components(timestamps):
+    """
+    Year, month, day and hour of every timestamp, each extracted once.
+    Accepts datetime64 arrays, pandas datetime Series/Index or ISO strings.
+    The calendar conversion runs once per distinct day of the covered range
+    and is gathered back to the rows, so its cost does not grow with the
+    number of readings per day.
+    Returns: (ano, mes, dia, hora) int32 arrays and the NaT mask
+    """
+    ts = np.asarray(timestamps)
+    if ts.dtype.kind != 'M':
+        ts = ts.astype('datetime64[us]')
+    nat = np.isnat(ts)
+    hours = ts.astype('datetime64[h]').astype(np.int64)
+    if nat.any():
+        hours[nat] = 0
+    days = hours // 24
+    hora = (hours - days * 24).astype(np.int32)
+
+    valid_days = days[~nat] if nat.any() else days
+    first_day, last_day = (valid_days.min(), valid_days.max()) if len(valid_days) else (0, 0)
+    n_days = last_day - first_day + 1
+    if n_days <= max(len(days), 1024):
+        ano, mes, dia = _calendar(np.arange(first_day, last_day + 1).astype('datetime64[D]'))
+        day_index = days - first_day
+        if nat.any():
+            day_index[nat] = 0
+        ano, mes, dia = np.take(ano, day_index), np.take(mes, day_index), np.take(dia, day_index)
+    else:
+        ano, mes, dia = _calendar(days.astype('datetime64[D]'))
+    if nat.any():
+        for component in (ano, mes, dia, hora):
+            component[nat] = 0
+    return ano, mes, dia, hora, nat
+
+
+def encode_time_features(timestamps, out=None, components=None):
+    """
+    Cyclic time encodings ordered like TIME_FEATURES, written into a
+    preallocated (n, 7) float32 matrix. The sin/cos values come from lookup
+    tables, so every row costs one gather per time component. Already
+    extracted time_components can be passed to avoid a second extraction.
+    """
+    ano, mes, dia, hora, nat = components or time_components(timestamps)
+    if out is None:
+        out = np.empty((len(ano), len(TIME_FEATURES)), dtype=np.float32)
+    out[:, 0] = ano
+    out[:, 1:3] = np.take(_DIA_TABLE, dia, axis=0)
+    out[:, 3:5] = np.take(_MES_TABLE, mes, axis=0)
+    out[:, 5:7] = np.take(_HORA_TABLE, hora, axis=0)
+    if nat.any():
+        out[nat] = np.nan
+    return out
+
+
+def build_feature_matrix(timestamps, temperatura, humidade):
+    """Full model input, ordered like FEATURES, straight from raw readings."""
+    temperatura = np.asarray(temperatura)
+    out = np.empty((len(temperatura), len(FEATURES)), dtype=np.float32)
+    out[:, 0] = temperatura
+    out[:, 1] = humidade
+    encode_time_features(timestamps, out=out[:, 2:])
+    return out
+
 
 class DataPreprocessor:
     def __init__(self):
+        # Imported here so the NumPy feature functions load without sklearn
+        from sklearn.preprocessing import StandardScaler
+        from sklearn.impute import SimpleImputer
         self.scaler = StandardScaler()
         self.imputer = SimpleImputer(strategy='mean')
         self.feature_columns = None  
 
     def preprocess(self, df):
-        # Convert 'data' to datetime if not already
-        df['data'] = pd.to_datetime(df['data'])
+        import pandas as pd
+        # Convert 'data' to datetime if not already; the caller's frame is not modified
+        timestamps = pd.to_datetime(df['data'])
         
-        # Extract basic time features
-        df['ano'] = df['data'].dt.year
-        df['mes'] = df['data'].dt.month
-        df['dia'] = df['data'].dt.day
-        df['hora'] = df['data'].dt.hour
+        # Extract basic time features, each datetime component only once
+        components = time_components(timestamps)
+        ano, mes, dia, hora, nat = components
         
         # Cyclical encoding for time features
         ''' This tells the model:
             Hour 23 and 0 are close
             Hour 12 is opposite of hour 0 '''
             
-        df['mes_sin'] = np.sin(2 * np.pi * df['data'].dt.month / 12)
-        df['mes_cos'] = np.cos(2 * np.pi * df['data'].dt.month / 12)
-        df['dia_sin'] = np.sin(2 * np.pi * df['data'].dt.day / 31)
-        df['dia_cos'] = np.cos(2 * np.pi * df['data'].dt.day / 31)
-        df['hora_sin'] = np.sin(2 * np.pi * df['data'].dt.hour / 24)
-        df['hora_cos'] = np.cos(2 * np.pi * df['data'].dt.hour / 24)
+        encoded = encode_time_features(timestamps, components=components)
+        calendar = {'ano': ano, 'mes': mes, 'dia': dia, 'hora': hora}
+        if nat.any():
+            calendar = {k: np.where(nat, np.nan, v) for k, v in calendar.items()}
         
         # Keep original datetime for potential merging
-        df['timestamp'] = df['data']
-        df = df.drop(columns=['data'])
-        
-        return df
+        return df.drop(columns=['data']).assign(
+            **calendar,
+            mes_sin=encoded[:, 3], mes_cos=encoded[:, 4],
+            dia_sin=encoded[:, 1], dia_cos=encoded[:, 2],
+            hora_sin=encoded[:, 5], hora_cos=encoded[:, 6],
+            timestamp=timestamps
+        )
 
     def prepare_features(self, df):
-        # Define feature columns based on available columns
-        basic_features = ["temperatura", "humidade"]
-        time_features = ["ano", "dia_sin", "dia_cos","mes_sin", "mes_cos", "hora_sin", "hora_cos"]
-        
         # Combine all available features
-        all_features = basic_features + time_features
-        available_features = [f for f in all_features if f in df.columns]
+        available_features = [f for f in FEATURES if f in df.columns] + [c for c in df.columns if is_window_feature(c)]
         
         # Store feature columns for future use
         self.feature_columns = available_features
@@ -97,4 +199,13 @@ class DataPreprocessor:
         """Transform new data using pre-fitted scaler/imputer."""
         X_imputed = self.imputer.transform(X_new)
         X_scaled = self.scaler.transform(X_imputed)
-        return X_scaled
\ No newline at end of file
+        return X_scaled
+
+    def compile(self, model):
+        """
+        Fuses the fitted imputer/scaler (unfitted ones are skipped) and the
+        feature list with a model trained behind them.
+        Returns: CompiledPipeline with predict_raw(timestamps, temperatura, humidade)
+        """
+        from utils.pipeline import compile_pipeline
+        return compile_pipeline(model, self.imputer, self.scaler, self.feature_columns or FEATURES)
\ No newline at end of file
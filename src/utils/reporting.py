@@ -0,0 +1,211 @@
+"""
+    Background rendering of the evaluation figures.
+
+    The Reporter renders figures on a small process pool ('spawn' workers
+    with the Agg backend), so plotting overlaps with training and never
+    blocks the critical path; close() waits for the pending figures. With
+    workers=0 the figures are rendered inline, and a disabled Reporter
+    drops them (headless production retrains).
+
+    The render functions only receive what the figure needs: the caller
+    reduces large holdouts first (dense_scatter_data, boxplot_stats), so
+    the data shipped to the workers is bounded by max_points per model
+    whatever the size of the test set. Every figure is closed as soon as
+    it is saved.
+
+    Methods (Reporter):
+        submit(render, *args): Renders in the background (or inline)
+        close(): Waits for the pending figures
+            Returns: Paths of the saved figures
+
+    Functions:
+        dense_scatter_data(y_true, predictions, max_points, mode, seed=42):
+            Returns: Scatter payload, all points up to max_points, else a
+            uniform sample ('sample') or the full float32 arrays ('hexbin')
+
+        boxplot_stats(residuals, max_points, seed=42):
+            Returns: Exact box statistics per model, outliers capped at
+            max_points
+
+        render_correlation / render_predictions / render_error_boxplot /
+        render_feature_importance: Draw and save one figure
+            Returns: Saved path
+
+    Usage:
+        with Reporter(workers=1) as reporter:
+            reporter.submit(render_feature_importance, path, name, importances, columns)
+"""
+
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+def _pyplot():
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+    return plt
+
+
+def _init_worker():
+    _pyplot()
+
+
+def dense_scatter_data(y_true, predictions, max_points, mode='sample', seed=42):
+    y_true = np.asarray(y_true, dtype=np.float32)
+    n = len(y_true)
+    payload = {'n': n, 'mode': 'scatter', 'limits': (float(y_true.min()), float(y_true.max()))}
+    if n <= max_points:
+        idx = slice(None)
+    elif mode == 'hexbin':
+        payload['mode'] = 'hexbin'
+        idx = slice(None)
+    else:
+        payload['mode'] = 'sample'
+        idx = np.sort(np.random.default_rng(seed).choice(n, max_points, replace=False))
+    payload['y_true'] = y_true[idx]
+    payload['predictions'] = {name: np.asarray(y_pred, dtype=np.float32)[idx] for name, y_pred in predictions.items()}
+    return payload
+
+
+def boxplot_stats(residuals, max_points, seed=42):
+    from matplotlib.cbook import boxplot_stats as _boxplot_stats
+    rng = np.random.default_rng(seed)
+    stats = []
+    for name, errors in residuals.items():
+        stat = _boxplot_stats(np.asarray(errors, dtype=np.float64), labels=[name])[0]
+        if len(stat['fliers']) > max_points:
+            stat['fliers'] = rng.choice(stat['fliers'], max_points, replace=False)
+        stats.append(stat)
+    return stats
+
+
+def render_correlation(path, corr_matrix):
+    plt = _pyplot()
+    import seaborn as sns
+    fig = plt.figure(figsize=(12, 8))
+    try:
+        sns.heatmap(corr_matrix, annot=True, fmt=".2f", cmap="coolwarm", square=True)
+        plt.title("Correlation Matrix")
+        plt.tight_layout()
+        fig.savefig(path)
+    finally:
+        plt.close(fig)
+    return path
+
+
+def render_predictions(path, payload):
+    plt = _pyplot()
+    names = list(payload['predictions'])
+    low, high = payload['limits']
+    if payload['mode'] == 'hexbin':
+        fig, axes = plt.subplots(1, len(names), figsize=(5 * len(names), 5), squeeze=False, sharey=True)
+        try:
+            for ax, name in zip(axes[0], names):
+                ax.hexbin(payload['y_true'], payload['predictions'][name], gridsize=60, bins='log', mincnt=1)
+                ax.plot([low, high], [low, high], 'k--')
+                ax.set_title(name)
+                ax.set_xlabel("Actual")
+            axes[0][0].set_ylabel("Predicted")
+            fig.suptitle(f"Actual vs Predicted ({payload['n']:,} points)")
+            fig.savefig(path)
+        finally:
+            plt.close(fig)
+        return path
+
+    fig = plt.figure(figsize=(10, 6))
+    try:
+        for name in names:
+            plt.scatter(payload['y_true'], payload['predictions'][name], label=name, alpha=0.5)
+        plt.plot([low, high], [low, high], 'k--')
+        plt.xlabel("Actual")
+        plt.ylabel("Predicted")
+        plt.legend()
+        title = "Actual vs Predicted"
+        if payload['mode'] == 'sample':
+            title += f" (sample of {len(payload['y_true']):,} of {payload['n']:,} points)"
+        plt.title(title)
+        plt.grid(True)
+        fig.savefig(path)
+    finally:
+        plt.close(fig)
+    return path
+
+
+def render_error_boxplot(path, stats):
+    plt = _pyplot()
+    fig, ax = plt.subplots(figsize=(10, 6))
+    try:
+        ax.bxp(stats)
+        ax.set_xlabel("Model")
+        ax.set_ylabel("Error")
+        ax.set_title("Error Distribution per Model")
+        ax.axhline(0, color='k', linestyle='--')
+        ax.grid(True)
+        fig.savefig(path)
+    finally:
+        plt.close(fig)
+    return path
+
+
+def render_feature_importance(path, model_name, importances, feature_columns):
+    plt = _pyplot()
+    fig = plt.figure(figsize=(10, 6))
+    try:
+        indices = np.argsort(importances)
+        plt.title(f'Feature Importance - {model_name}')
+        plt.barh(range(len(indices)), importances[indices], color='b', align='center')
+        plt.yticks(range(len(indices)), [feature_columns[i] for i in indices])
+        plt.xlabel('Relative Importance')
+        plt.tight_layout()
+        fig.savefig(path)
+    finally:
+        plt.close(fig)
+    return path
+
+
+class Reporter:
+    def __init__(self, enabled=True, workers=1):
+        self.enabled = enabled
+        self.workers = workers
+        self._pool = None
+        self._pending = []
+        self.saved = []
+
+    def submit(self, render, *args):
+        if not self.enabled:
+            return
+        if self.workers <= 0:
+            self._record(render, lambda: render(*args))
+            return
+        if self._pool is None:
+            # spawn: the workers do not inherit the threads of the training libraries
+            self._pool = ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context("spawn"),
+                                             initializer=_init_worker)
+        self._pending.append((render, self._pool.submit(render, *args)))
+
+    def _record(self, render, result):
+        try:
+            self.saved.append(result())
+        except Exception:
+            # A figure is never worth failing a training run for
+            logger.exception(f"Figure {render.__name__} failed")
+
+    def close(self):
+        for render, future in self._pending:
+            self._record(render, future.result)
+        self._pending = []
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+        return self.saved
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,224 @@
+"""
+    Pure-NumPy predictor for fitted tree ensembles.
+
+    DecisionTreeRegressor, RandomForestRegressor and XGBRegressor models are
+    flattened into node tables shared by all trees (feature, threshold,
+    left, right, value) and evaluated with a vectorized traversal that moves
+    every (tree, row) pair one level down per step. This skips the input
+    validation of model.predict, which dominates single-row latency.
+
+    Every split is stored as "go left when x <= threshold" on float32
+    inputs, matching sklearn. XGBoost's "x < split" is converted to the
+    largest float32 below the split so the comparisons stay identical.
+    Nodes are renumbered breadth-first so the right child always follows the
+    left one (next node = left + went_right). For deep trees, (tree, row)
+    pairs leave the working set as soon as they reach a leaf.
+
+    Attributes:
+        feature, threshold, left, value: Node tables of all trees
+        right: left + 1 for internal nodes (derived)
+        missing_left: Direction taken by NaN inputs per node
+        is_leaf: Leaf mask; leaves point to themselves in left
+        roots: Index of the root node of every tree
+        max_depth: Depth of the deepest tree
+        scale, base: prediction = base + scale * sum of the leaf values
+
+    Methods:
+        predict(X):
+            Returns: Predictions for a 2-D array of features
+
+        arrays() / from_arrays(tables, max_depth, scale, base):
+            Node tables and scalars out / predictor around existing tables
+
+    Functions:
+        compile_model(model):
+            Returns: CompiledTreeEnsemble, or None for unsupported models
+
+    Usage:
+        compiled = compile_model(trained_models['random_forest'])
+        y_pred = compiled.predict(X_test)
+"""
+
+import json
+import numpy as np
+
+
+class CompiledTreeEnsemble:
+    # Depth above which finished (tree, row) pairs are compacted away
+    COMPACT_DEPTH = 10
+    TABLES = ('roots', 'left', 'feature', 'threshold', 'value', 'missing_left', 'is_leaf')
+
+    def __init__(self, trees, scale=1.0, base=0.0, chunk_size=8192):
+        """
+        trees: list of per-tree dicts with local node arrays 'feature',
+               'threshold', 'left', 'right', 'value', 'missing_left'
+               (leaves have left == right == -1)
+        """
+        # Renumber every tree breadth-first so that right == left + 1
+        tables = {k: [] for k in ('feature', 'threshold', 'value', 'missing_left', 'left')}
+        roots, offset, max_depth = [], 0, 0
+        for tree in trees:
+            order, depth = _breadth_first_order(tree['left'], tree['right'])
+            new_index = np.empty(len(order), dtype=np.int64)
+            new_index[order] = np.arange(len(order)) + offset
+            left = np.asarray(tree['left'])[order]
+            is_leaf = left == -1
+            for key in ('feature', 'threshold', 'value', 'missing_left'):
+                tables[key].append(np.asarray(tree[key])[order])
+            tables['left'].append(np.where(is_leaf, np.arange(len(order)) + offset, new_index[np.where(is_leaf, 0, left)]))
+            roots.append(offset)
+            offset += len(order)
+            max_depth = max(max_depth, depth)
+
+        self.roots = np.asarray(roots, dtype=np.intp)
+        self.left = np.concatenate(tables['left']).astype(np.intp)
+        self.feature = np.concatenate(tables['feature']).astype(np.intp)
+        self.threshold = np.concatenate(tables['threshold']).astype(np.float64)
+        self.value = np.concatenate(tables['value']).astype(np.float64)
+        self.missing_left = np.concatenate(tables['missing_left']).astype(bool)
+        self.is_leaf = self.left == np.arange(len(self.left))
+        # Leaves compare feature 0 against +inf, so they never move
+        self.feature[self.is_leaf] = 0
+        self.threshold[self.is_leaf] = np.inf
+        self.missing_left[self.is_leaf] = True
+
+        self.max_depth = max_depth
+        self.scale = float(scale)
+        self.base = float(base)
+        self.chunk_size = chunk_size
+
+    def arrays(self):
+        """Node tables and scalars, as stored by the artifact store."""
+        tables = {key: getattr(self, key) for key in self.TABLES}
+        return tables, {'max_depth': int(self.max_depth), 'scale': self.scale, 'base': self.base}
+
+    @classmethod
+    def from_arrays(cls, tables, max_depth, scale=1.0, base=0.0, chunk_size=8192):
+        """
+        Rebuilds a predictor around existing node tables (for example
+        read-only memory maps) without copying them.
+        """
+        compiled = cls.__new__(cls)
+        for key in cls.TABLES:
+            setattr(compiled, key, tables[key])
+        compiled.max_depth = max_depth
+        compiled.scale = float(scale)
+        compiled.base = float(base)
+        compiled.chunk_size = chunk_size
+        return compiled
+
+    @property
+    def right(self):
+        return np.where(self.is_leaf, self.left, self.left + 1)
+
+    @property
+    def n_trees(self):
+        return len(self.roots)
+
+    def _predict_chunk(self, X):
+        n_rows, n_features = X.shape
+        flat_X = X.ravel()
+        # One entry per (tree, row) pair
+        nodes = np.repeat(self.roots, n_rows)
+        pair_offsets = np.tile(np.arange(n_rows) * n_features, self.n_trees)
+        check_missing = np.isnan(flat_X).any()
+
+        def step(current, offsets):
+            x = flat_X.take(offsets + self.feature.take(current))
+            go_right = x > self.threshold.take(current)
+            if check_missing:
+                go_right |= np.isnan(x) & ~self.missing_left.take(current)
+            # Children are adjacent: the right child follows the left one
+            return self.left.take(current) + go_right
+
+        if self.max_depth <= self.COMPACT_DEPTH:
+            # Shallow trees: step every pair, leaves stay where they are
+            for _ in range(self.max_depth):
+                nodes = step(nodes, pair_offsets)
+        else:
+            # Deep trees: drop pairs from the working set once they reach a leaf
+            active = np.flatnonzero(~self.is_leaf.take(nodes))
+            while len(active):
+                following = step(nodes.take(active), pair_offsets.take(active))
+                nodes[active] = following
+                active = active[~self.is_leaf.take(following)]
+        leaf_values = self.value.take(nodes).reshape(self.n_trees, n_rows)
+        return self.base + self.scale * leaf_values.sum(axis=0)
+
+    def predict(self, X):
+        X = np.ascontiguousarray(X, dtype=np.float32)
+        if X.ndim == 1:
+            X = X.reshape(1, -1)
+        if len(X) <= self.chunk_size:
+            return self._predict_chunk(X)
+        return np.concatenate([
+            self._predict_chunk(X[start:start + self.chunk_size])
+            for start in range(0, len(X), self.chunk_size)
+        ])
+
+
+def _breadth_first_order(left, right):
+    """
+    Node indices level by level, children of a node stored next to each
+    other (left, right). Returns: (order, depth of the tree)
+    """
+    left, right = np.asarray(left), np.asarray(right)
+    levels, level = [], np.array([0])
+    while len(level):
+        levels.append(level)
+        internal = level[left[level] != -1]
+        level = np.column_stack([left[internal], right[internal]]).ravel()
+    return np.concatenate(levels), len(levels) - 1
+
+
+def _sklearn_tree(tree):
+    n_nodes = tree.node_count
+    missing_left = getattr(tree, 'missing_go_to_left', np.zeros(n_nodes, dtype=bool))
+    return {
+        'feature': tree.feature,
+        'threshold': tree.threshold,
+        'left': tree.children_left,
+        'right': tree.children_right,
+        'value': tree.value[:, 0, 0],
+        'missing_left': np.asarray(missing_left, dtype=bool)
+    }
+
+
+def _xgboost_trees(booster):
+    model = json.loads(booster.save_raw(raw_format='json'))['learner']
+    objective = model['objective']['name']
+    if objective not in ('reg:squarederror', 'reg:absoluteerror', 'reg:pseudohubererror'):
+        raise ValueError(f"Unsupported XGBoost objective for compilation: {objective}")
+    if model['gradient_booster']['name'] != 'gbtree':
+        raise ValueError("Only gbtree XGBoost models can be compiled")
+
+    trees = []
+    for tree in model['gradient_booster']['model']['trees']:
+        left = np.asarray(tree['left_children'])
+        split = np.asarray(tree['split_conditions'], dtype=np.float32)
+        is_leaf = left == -1
+        # x < split  <=>  x <= largest float32 below split
+        threshold = np.where(is_leaf, 0, np.nextafter(split, np.float32(-np.inf))).astype(np.float64)
+        trees.append({
+            'feature': np.asarray(tree['split_indices']),
+            'threshold': threshold,
+            'left': left,
+            'right': np.asarray(tree['right_children']),
+            'value': np.where(is_leaf, split, 0).astype(np.float64),
+            'missing_left': np.asarray(tree['default_left'], dtype=bool)
+        })
+    base_score = float(model['learner_model_param']['base_score'].strip('[]'))
+    return trees, base_score
+
+
+def compile_model(model, chunk_size=8192):
+    class_name = type(model).__name__
+    if class_name == 'DecisionTreeRegressor':
+        return CompiledTreeEnsemble([_sklearn_tree(model.tree_)], chunk_size=chunk_size)
+    if class_name == 'RandomForestRegressor':
+        trees = [_sklearn_tree(estimator.tree_) for estimator in model.estimators_]
+        return CompiledTreeEnsemble(trees, scale=1.0 / len(trees), chunk_size=chunk_size)
+    if class_name == 'XGBRegressor':
+        trees, base_score = _xgboost_trees(model.get_booster())
+        return CompiledTreeEnsemble(trees, base=base_score, chunk_size=chunk_size)
+    return None
@@ -0,0 +1,221 @@
+"""
+    Successive-halving hyperparameter search over Config.MODELS.
+
+    Every model with a space in Config.TUNING_SPACES gets a set of candidate
+    parameter combinations (the full grid, or TUNING_CANDIDATES sampled from
+    it). The resource of successive halving is the number of CV folds a
+    candidate is scored on, using the fold arrays of ModelTrainer.fold_cache:
+    rung r scores the survivors on the first min(eta**r, CV_FOLDS) folds and
+    keeps the best 1/eta by mean fold MSE, so hopeless candidates are
+    dropped after a single fold. Fold results carry over between rungs.
+    All (candidate, fold) fits of a rung run on a joblib process pool.
+
+    Candidates larger than TUNING_MAX_MODEL_SIZE (trees x depth, the
+    footprint driver of the exported Arduino code) are excluded: up front
+    when their parameters fix the size, otherwise once the fitted size is
+    known.
+
+    Every fold result is appended to TUNING_PATH/results.json under a
+    fingerprint of the training data, keyed by the searched parameters and
+    a digest of the other parameters of the Config.MODELS estimator, so an
+    interrupted search resumes where it stopped, a finished one is answered
+    from disk, and changing a fixed parameter starts over.
+
+    Attributes:
+        config: Config instance
+        trainer: ModelTrainer providing the CV splits and the worker budget
+        eta (int): Halving rate
+        results (dict): Persisted fold results
+
+    Methods:
+        search(X, y):
+            Returns: {model name: {'params', 'rmse', 'size', 'evaluated'}}
+
+        tuned_models(best):
+            Returns: Config.build_models() with the best parameters applied
+
+    Functions:
+        model_size(model):
+            Returns: Trees x depth of a fitted model (0 for linear models)
+
+    Usage:
+        tuner = HalvingTuner(config, trainer)
+        best = tuner.search(X_train, y_train)
+        trainer.models = tuner.tuned_models(best)
+"""
+
+import hashlib
+import itertools
+import json
+import os
+import random
+import time
+import numpy as np
+from joblib import Parallel, delayed, cpu_count
+from sklearn.base import clone
+from sklearn.metrics import mean_squared_error
+
+
+def model_size(model):
+    class_name = type(model).__name__
+    if class_name == 'DecisionTreeRegressor':
+        return int(model.tree_.max_depth)
+    if class_name == 'RandomForestRegressor':
+        return len(model.estimators_) * max(int(e.tree_.max_depth) for e in model.estimators_)
+    if class_name == 'XGBRegressor':
+        depth = model.get_params()['max_depth'] or 6
+        return int(model.get_booster().num_boosted_rounds()) * depth
+    return 0
+
+
+def declared_size(model):
+    """Size implied by the parameters alone, or None when only the fit tells."""
+    class_name = type(model).__name__
+    params = model.get_params()
+    if class_name == 'DecisionTreeRegressor':
+        return params['max_depth']
+    if class_name == 'RandomForestRegressor':
+        return params['n_estimators'] * params['max_depth'] if params['max_depth'] else None
+    if class_name == 'XGBRegressor':
+        return params['n_estimators'] * (params['max_depth'] or 6)
+    return 0
+
+
+def _score_task(name, key, fold, model, X_fit, y_fit, X_val, y_val):
+    start = time.perf_counter()
+    model.fit(X_fit, y_fit)
+    mse = mean_squared_error(y_val, model.predict(X_val))
+    # Only the score travels back from the worker, not the fitted model
+    return name, key, fold, float(mse), model_size(model), time.perf_counter() - start
+
+
+class HalvingTuner:
+    def __init__(self, config, trainer, eta=3):
+        self.config = config
+        self.trainer = trainer
+        self.eta = eta
+        self.results_path = os.path.join(config.TUNING_PATH.lstrip('/\\'), "results.json")
+        self.results = self._read_results()
+
+    def _read_results(self):
+        if not os.path.exists(self.results_path):
+            return {}
+        with open(self.results_path) as f:
+            return json.load(f)
+
+    def _write_results(self):
+        os.makedirs(os.path.dirname(self.results_path), exist_ok=True)
+        tmp_path = self.results_path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(self.results, f, indent=2)
+        os.replace(tmp_path, self.results_path)
+
+    def _fingerprint(self, X, y):
+        digest = hashlib.sha1(np.ascontiguousarray(X, dtype=np.float32).tobytes())
+        digest.update(np.ascontiguousarray(y).tobytes())
+        digest.update(f"{self.config.CV_FOLDS}".encode())
+        return digest.hexdigest()[:16]
+
+    def candidates(self, name):
+        space = self.config.TUNING_SPACES.get(name)
+        if not space:
+            return {}
+        grid = [dict(zip(space, values)) for values in itertools.product(*space.values())]
+        if len(grid) > self.config.TUNING_CANDIDATES:
+            grid = random.Random(self.config.RANDOM_STATE).sample(grid, self.config.TUNING_CANDIDATES)
+        base = self.config.MODELS[name]()
+        # Scores also depend on the parameters that are not searched (n_jobs is set per task)
+        fixed = {key: value for key, value in clone(base).get_params(deep=False).items()
+                 if key not in space and key != 'n_jobs'}
+        base_digest = hashlib.sha1(json.dumps(fixed, sort_keys=True, default=repr).encode()).hexdigest()[:12]
+        max_size = self.config.TUNING_MAX_MODEL_SIZE
+        candidates = {}
+        for params in grid:
+            size = declared_size(clone(base).set_params(**params))
+            if max_size is None or size is None or size <= max_size:
+                candidates[f"{json.dumps(params, sort_keys=True)} {base_digest}"] = params
+        return candidates
+
+    def _run_folds(self, store, pending, folds):
+        """Fits the pending (name, key, params, fold) tasks and records them."""
+        if not pending:
+            return
+        n_workers = self.trainer._n_workers(len(pending))
+        threads = max(1, cpu_count() // n_workers)
+        tasks = (
+            delayed(_score_task)(
+                name, key, fold,
+                self.trainer._with_thread_budget(self.config.MODELS[name](), threads).set_params(**params),
+                *folds.fold(fold)
+            )
+            for name, key, params, fold in pending
+        )
+        parallel = Parallel(n_jobs=n_workers, backend=self.config.PARALLEL_BACKEND, return_as="generator_unordered")
+        for name, key, fold, mse, size, elapsed in parallel(tasks):
+            store[name].setdefault(key, {})[str(fold)] = {'mse': mse, 'size': size, 'seconds': elapsed}
+            # Persist as results come in, so an interrupted search resumes here
+            self._write_results()
+
+    def _score(self, fold_results, n_folds):
+        scored = [fold_results[str(f)] for f in range(n_folds) if str(f) in fold_results]
+        max_size = self.config.TUNING_MAX_MODEL_SIZE
+        if max_size is not None and any(r['size'] > max_size for r in scored):
+            return np.inf
+        return float(np.mean([r['mse'] for r in scored]))
+
+    def search(self, X, y):
+        folds = self.trainer.fold_cache(X, y)
+        store = self.results.setdefault(self._fingerprint(X, y), {})
+        survivors = {}
+        for name in self.config.MODELS:
+            candidates = self.candidates(name)
+            if candidates:
+                store.setdefault(name, {})
+                survivors[name] = candidates
+        searched = {name: set(candidates) for name, candidates in survivors.items()}
+
+        rung = 0
+        winners = {}
+        while survivors:
+            n_folds = min(self.eta ** rung, len(folds))
+            # One pool for the rung of every model
+            pending = [
+                (name, key, params, fold)
+                for name, candidates in survivors.items()
+                for key, params in candidates.items()
+                for fold in range(n_folds)
+                if str(fold) not in store[name].get(key, {})
+            ]
+            self._run_folds(store, pending, folds)
+
+            for name in list(survivors):
+                scores = {key: self._score(store[name][key], n_folds) for key in survivors[name]}
+                ranked = sorted(scores, key=scores.get)
+                print(f"{name} | Rung {rung}: {len(ranked)} candidates on {n_folds} folds | "
+                      f"best RMSE {np.sqrt(scores[ranked[0]]):.3f}")
+                if n_folds == len(folds):
+                    winners[name] = (ranked[0], survivors.pop(name)[ranked[0]], scores[ranked[0]])
+                else:
+                    keep = max(1, len(ranked) // self.eta)
+                    survivors[name] = {key: survivors[name][key] for key in ranked[:keep]}
+            rung += 1
+
+        best = {}
+        for name, (key, params, mse) in winners.items():
+            if np.isinf(mse):
+                print(f"{name} | No candidate fits TUNING_MAX_MODEL_SIZE, keeping the configured model")
+                continue
+            best[name] = {
+                'params': params,
+                'rmse': float(np.sqrt(mse)),
+                'size': max(r['size'] for r in store[name][key].values()),
+                'evaluated': len(searched[name] & set(store[name]))
+            }
+            print(f"{name} | Best parameters: {params} | CV RMSE: {best[name]['rmse']:.3f} | size: {best[name]['size']}")
+        return best
+
+    def tuned_models(self, best):
+        models = {}
+        for name, model in self.config.build_models().items():
+            models[name] = model.set_params(**best[name]['params']) if name in best else model
+        return models
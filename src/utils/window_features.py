@@ -0,0 +1,320 @@
+"""
+    Rolling features of the sensor time series, computed incrementally.
+
+    For every reading, over the readings of the last `minutes` minutes up to
+    and including it (same series):
+        <variable>_media_<m>m       mean of temperatura / humidade
+        <variable>_min_<m>m / _max_<m>m
+        <variable>_tendencia_<m>m   least-squares slope, per minute
+        minutos_desde_rega          minutes since the last earlier reading
+                                    the irrigation rule (IrrigationRules)
+                                    would irrigate, or since the series began
+
+    Two paths compute the same values:
+        update(timestamp, temperatura, humidade): one reading, O(1)
+            amortized (ring buffer of the window with running sums, monotonic
+            deques for min/max); for the live serial feed, one instance per port
+        transform(timestamps, temperatura, humidade, starts=None): a batch,
+            vectorized (prefix sums, a level-by-level sparse table for
+            min/max), continuing from and updating the same state, so a
+            history can be processed chunk by chunk
+    Both work on integers: readings quantized to the logger resolution (0.1)
+    and timestamps in whole seconds. Window sums are exact (the int64 prefix
+    sums wrap around, their differences do not) and every float comes from
+    the same final operations, so both paths return bitwise identical
+    float32 values. This holds while (rows per window x window seconds)^2
+    stays below 3.6e19, e.g. 12 hours of 1-second readings.
+
+    A reading earlier than the previous one starts a new series (empty
+    window), as does reset(). Readings without a timestamp get NaN features
+    and do not enter the window; a missing temperatura/humidade is left out
+    of its variable's window. Empty windows give NaN mean/min/max and a zero
+    slope.
+
+    Attributes:
+        minutes (int): Window length
+        names (list): Feature names, in column order
+        rules: IrrigationRules behind minutos_desde_rega
+
+    Functions:
+        window_feature_names(minutes):
+            Returns: Feature names for a window length
+        window_minutes(features):
+            Returns: Window length of a feature list, or None without window features
+        is_window_feature(name):
+            Returns: True for a name produced by window_feature_names
+
+    Usage:
+        windows = WindowFeatures(minutes=10)
+        X_window = windows.transform(df['timestamp'], df['temperatura'], df['humidade'])
+        live = WindowFeatures(minutes=10)
+        row = live.update(timestamp, temperatura, humidade)
+"""
+
+import re
+from bisect import bisect_right
+from collections import deque
+import numpy as np
+from utils.irrigation_rules import IrrigationRules
+
+VARIABLES = ("temperatura", "humidade")
+STATISTICS = ("media", "min", "max", "tendencia")
+SINCE_IRRIGATION = "minutos_desde_rega"
+_WINDOW_NAME = re.compile(rf"^(?:{'|'.join(VARIABLES)})_(?:{'|'.join(STATISTICS)})_(\d+)m$")
+_EMPTY_MIN = np.iinfo(np.int64).max
+_EMPTY_MAX = np.iinfo(np.int64).min
+
+
+def window_feature_names(minutes):
+    return [f"{variable}_{statistic}_{minutes}m" for variable in VARIABLES for statistic in STATISTICS] + [SINCE_IRRIGATION]
+
+
+def window_minutes(features):
+    for feature in features:
+        match = _WINDOW_NAME.match(feature)
+        if match:
+            return int(match.group(1))
+    return None
+
+
+def is_window_feature(name):
+    return name == SINCE_IRRIGATION or _WINDOW_NAME.match(name) is not None
+
+
+def _seconds(timestamps):
+    # Whole seconds since the epoch and the NaT mask
+    ts = np.asarray(timestamps)
+    if ts.dtype.kind != 'M':
+        ts = ts.astype('datetime64[us]')
+    nat = np.isnat(ts)
+    seconds = ts.astype('datetime64[s]').astype(np.int64)
+    if nat.any():
+        seconds[nat] = 0
+    return seconds, nat
+
+
+def _range_reduce(values, start, end, ufunc):
+    """
+    ufunc (np.minimum / np.maximum) of values[start[i]:end[i] + 1] for every
+    i. Level k of the sparse table reduces runs of 2^k values; it answers
+    the windows of length [2^k, 2^(k+1)) and is then replaced by level k + 1,
+    so memory stays O(n).
+    """
+    length = end - start + 1
+    level = np.frexp(length)[1] - 1
+    result = np.empty(len(length), dtype=values.dtype)
+    table, width, k = values, 1, 0
+    while True:
+        rows = np.flatnonzero(level == k)
+        if len(rows):
+            result[rows] = ufunc(table[start[rows]], table[end[rows] - width + 1])
+        if width * 2 > length.max():
+            return result
+        table = ufunc(table[:-width], table[width:])
+        width, k = width * 2, k + 1
+
+
+def _window_sum(values, start, end):
+    # Exact window sums from wrapping prefix sums
+    prefix = np.concatenate(([0], np.cumsum(values)))
+    return prefix[end + 1] - prefix[start]
+
+
+class WindowFeatures:
+    def __init__(self, minutes=10, rules=None, resolution=0.1):
+        self.minutes = int(minutes)
+        self.seconds = self.minutes * 60
+        self.rules = rules or IrrigationRules()
+        self.scale = round(1 / resolution)
+        # Slope in quantized units per second -> readings per minute
+        self._slope_factor = 60.0 / self.scale
+        self.names = window_feature_names(self.minutes)
+        # Band edges and label table of the rules, for single readings
+        t_edges, h_edges, table = self.rules._table(with_limit=True)
+        self._edges = (t_edges.tolist(), h_edges.tolist())
+        self._irrigation_table = table > 0
+        self.reset()
+
+    def reset(self):
+        # Window rows (seq, t, temperatura, humidade), None for a missing value
+        self._rows = deque()
+        # Per variable: count, sum t, sum t², sum v, sum t·v (Python ints, exact)
+        self._sums = [[0, 0, 0, 0, 0] for _ in VARIABLES]
+        self._low = [deque() for _ in VARIABLES]
+        self._high = [deque() for _ in VARIABLES]
+        self._seq = 0
+        self._last_t = self._start_t = self._irrigated_t = None
+
+    def _quantize(self, values):
+        values = np.asarray(values, dtype=np.float32)
+        missing = np.isnan(values)
+        quantized = np.rint(np.where(missing, 0, values).astype(np.float64) * self.scale).astype(np.int64)
+        return quantized, ~missing
+
+    def _irrigates(self, temperatura, humidade):
+        return self.rules.label(np.asarray(temperatura, dtype=np.float32), np.asarray(humidade, dtype=np.float32)) > 0
+
+    def _irrigates_one(self, temperatura, humidade):
+        # Same band lookup as IrrigationRules.label, without the array overhead
+        index = [len(edges) + 1 if value != value else bisect_right(edges, value)
+                 for value, edges in zip((temperatura, humidade), self._edges)]
+        return bool(self._irrigation_table[index[0], index[1]])
+
+    def _push(self, t, values):
+        self._rows.append((self._seq, t) + tuple(values))
+        for c, v in enumerate(values):
+            if v is None:
+                continue
+            sums = self._sums[c]
+            sums[0] += 1
+            sums[1] += t
+            sums[2] += t * t
+            sums[3] += v
+            sums[4] += t * v
+            low, high = self._low[c], self._high[c]
+            while low and low[-1][1] >= v:
+                low.pop()
+            low.append((self._seq, v))
+            while high and high[-1][1] <= v:
+                high.pop()
+            high.append((self._seq, v))
+        self._seq += 1
+
+    def _evict(self, t):
+        while self._rows and self._rows[0][1] <= t - self.seconds:
+            seq, t_old, *values = self._rows.popleft()
+            for c, v in enumerate(values):
+                if v is None:
+                    continue
+                sums = self._sums[c]
+                sums[0] -= 1
+                sums[1] -= t_old
+                sums[2] -= t_old * t_old
+                sums[3] -= v
+                sums[4] -= t_old * v
+                for extreme in (self._low[c], self._high[c]):
+                    if extreme and extreme[0][0] == seq:
+                        extreme.popleft()
+
+    def update(self, timestamp, temperatura, humidade):
+        """Returns: float32 array of the features of one reading (names order)."""
+        seconds, nat = _seconds(np.asarray([timestamp]))
+        if nat[0]:
+            return np.full(len(self.names), np.nan, dtype=np.float32)
+        t = int(seconds[0])
+        if self._last_t is not None and t < self._last_t:
+            self.reset()
+        if self._start_t is None:
+            self._start_t = t
+
+        # float32 readings, quantized as in _quantize (round() is half-to-even like np.rint)
+        readings = (float(np.float32(temperatura)), float(np.float32(humidade)))
+        values = [None if value != value else round(value * self.scale) for value in readings]
+        self._evict(t)
+        self._push(t, values)
+
+        features = []
+        for c in range(len(VARIABLES)):
+            n, s1, s2, sv, stv = self._sums[c]
+            if n:
+                den = n * s2 - s1 * s1
+                features += [
+                    float(sv) / float(n * self.scale),
+                    float(self._low[c][0][1]) / float(self.scale),
+                    float(self._high[c][0][1]) / float(self.scale),
+                    float(n * stv - s1 * sv) * self._slope_factor / float(den) if den else 0.0
+                ]
+            else:
+                features += [np.nan, np.nan, np.nan, 0.0]
+        reference = self._irrigated_t if self._irrigated_t is not None else self._start_t
+        features.append(float(t - reference) / 60.0)
+
+        if self._irrigates_one(*readings):
+            self._irrigated_t = t
+        self._last_t = t
+        return np.array(features, dtype=np.float32)
+
+    def transform(self, timestamps, temperatura, humidade, starts=None):
+        """
+        Features of a batch of readings in time order, continuing the
+        current window. starts: offsets of rows that begin a new series
+        (e.g. one per node), resetting the window before them.
+        Returns: (n, len(names)) float32 array
+        """
+        seconds, nat = _seconds(timestamps)
+        temperatura = np.asarray(temperatura, dtype=np.float32)
+        humidade = np.asarray(humidade, dtype=np.float32)
+        out = np.full((len(seconds), len(self.names)), np.nan, dtype=np.float32)
+
+        bounds = sorted({0, len(seconds), *(int(s) for s in (starts if starts is not None else ()))})
+        for a, b in zip(bounds[:-1], bounds[1:]):
+            if starts is not None and a in starts:
+                self.reset()
+            rows = a + np.flatnonzero(~nat[a:b])
+            if not len(rows):
+                continue
+            t = seconds[rows]
+            # A step back in time starts a new series
+            breaks = [0, *(np.flatnonzero(t[1:] < t[:-1]) + 1), len(t)]
+            for i, j in zip(breaks[:-1], breaks[1:]):
+                if i > 0 or (self._last_t is not None and t[0] < self._last_t):
+                    self.reset()
+                segment = rows[i:j]
+                out[segment] = self._transform_segment(t[i:j], temperatura[segment], humidade[segment])
+        return out
+
+    def _transform_segment(self, t, temperatura, humidade):
+        # The window rows held by the state come first
+        held = list(self._rows)
+        p = len(held)
+        if self._start_t is None:
+            self._start_t = int(t[0])
+        T = np.concatenate([np.array([row[1] for row in held], dtype=np.int64), t])
+        start = np.searchsorted(T, t - self.seconds, side='right')
+        end = np.arange(p, p + len(t))
+
+        features = np.empty((len(t), len(self.names)), dtype=np.float64)
+        quantized = []
+        for c, values in enumerate((temperatura, humidade)):
+            q, present = self._quantize(values)
+            V = np.concatenate([np.array([row[2 + c] or 0 for row in held], dtype=np.int64), q])
+            ok = np.concatenate([np.array([row[2 + c] is not None for row in held], dtype=bool), present])
+            quantized.append((V, ok))
+
+            w = ok.astype(np.int64)
+            v = V * w
+            n = _window_sum(w, start, end)
+            s1 = _window_sum(T * w, start, end)
+            s2 = _window_sum(T * T * w, start, end)
+            sv = _window_sum(v, start, end)
+            stv = _window_sum(T * v, start, end)
+            den = n * s2 - s1 * s1
+            num = n * stv - s1 * sv
+
+            empty = n == 0
+            low = _range_reduce(np.where(ok, V, _EMPTY_MIN), start, end, np.minimum)
+            high = _range_reduce(np.where(ok, V, _EMPTY_MAX), start, end, np.maximum)
+            with np.errstate(divide='ignore', invalid='ignore'):
+                features[:, 4 * c] = np.where(empty, np.nan, sv.astype(np.float64) / (n * self.scale).astype(np.float64))
+                features[:, 4 * c + 1] = np.where(empty, np.nan, low.astype(np.float64) / float(self.scale))
+                features[:, 4 * c + 2] = np.where(empty, np.nan, high.astype(np.float64) / float(self.scale))
+                features[:, 4 * c + 3] = np.where(den != 0, num.astype(np.float64) * self._slope_factor / den.astype(np.float64), 0.0)
+
+        # Last irrigating reading strictly before each row
+        irrigates = self._irrigates(temperatura, humidade)
+        last = np.maximum.accumulate(np.where(irrigates, np.arange(len(t)), -1))
+        previous = np.concatenate(([-1], last[:-1]))
+        initial = self._irrigated_t if self._irrigated_t is not None else self._start_t
+        reference = np.where(previous >= 0, t[previous.clip(0)], initial)
+        features[:, -1] = (t - reference).astype(np.float64) / 60.0
+
+        # The state keeps the rows still inside the window of the last reading
+        start_t, irrigated_t = self._start_t, (int(t[last[-1]]) if last[-1] >= 0 else self._irrigated_t)
+        tail = np.flatnonzero(T > t[-1] - self.seconds)
+        self.reset()
+        columns = [T[tail].tolist()] + [np.where(ok[tail], V[tail], 0).tolist() for V, ok in quantized]
+        present = [ok[tail].tolist() for _, ok in quantized]
+        for k, row_t in enumerate(columns[0]):
+            self._push(row_t, [columns[1 + c][k] if present[c][k] else None for c in range(len(VARIABLES))])
+        self._start_t, self._irrigated_t, self._last_t = start_t, irrigated_t, int(t[-1])
+        return features.astype(np.float32)